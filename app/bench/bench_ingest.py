@@ -0,0 +1,279 @@
+"""
+Benchmark offline de ingesta (ingest.py + ingest_scrape.py).
+
+- Levanta fixture_server.py con feeds RSS/Atom y páginas Plone sintéticas
+  (tamaño y latencia configurables).
+- Crea un schema de Postgres desechable con la misma estructura que
+  public.sources / public.items (constraints e índices incluidos) y ejecuta
+  los scripts con PGOPTIONS=-c search_path=<schema>, así no tocan datos reales.
+- Cada script se lanza dos veces: "cold" (BD vacía) y "warm" (todo ya visto).
+- Informa entradas/s, peticiones HTTP, bytes, round-trips a BD y RSS pico.
+
+Uso (dentro del contenedor app):
+    python app/bench/bench_ingest.py --feeds 9 --entries 200 --articles 50 --latency-ms 80
+    python app/bench/bench_ingest.py --max-concurrency 1     # comparar con descarga secuencial
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List
+
+import psycopg
+import yaml
+
+from fixture_server import FixtureConfig, start_server
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, "..", "src")
+REPO_SOURCES = os.path.join(HERE, "..", "..", "sources.yaml")
+
+
+def clone_table(cur: psycopg.Cursor, schema: str, table: str) -> None:
+    """
+    Copia estructura, constraints (con su nombre: ON CONSTRAINT uniq_item) e
+    índices de public.<table> a <schema>.<table>. Las FKs se omiten.
+    """
+    cur.execute(
+        f"CREATE TABLE {schema}.{table} "
+        f"(LIKE public.{table} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING GENERATED)"
+    )
+
+    # columnas serial: secuencia propia para no consumir ids de public
+    cur.execute(
+        """
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema='public' AND table_name=%s AND column_default LIKE 'nextval(%%'
+        """,
+        (table,),
+    )
+    for (col,) in cur.fetchall():
+        seq = f"{schema}.{table}_{col}_seq"
+        cur.execute(f"CREATE SEQUENCE {seq} OWNED BY {schema}.{table}.{col}")
+        cur.execute(f"ALTER TABLE {schema}.{table} ALTER COLUMN {col} SET DEFAULT nextval('{seq}')")
+
+    cur.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'c', 'x')
+        """,
+        (f"public.{table}",),
+    )
+    for name, definition in cur.fetchall():
+        cur.execute(f'ALTER TABLE {schema}.{table} ADD CONSTRAINT "{name}" {definition}')
+
+    cur.execute(
+        """
+        SELECT pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        WHERE i.indrelid = %s::regclass
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+        """,
+        (f"public.{table}",),
+    )
+    for (indexdef,) in cur.fetchall():
+        cur.execute(re.sub(rf" ON (public\.)?{table} ", f" ON {schema}.{table} ", indexdef, count=1))
+
+
+def create_bench_schema(db: str) -> str:
+    schema = f"bench_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(db) as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"CREATE SCHEMA {schema}")
+            for table in ("sources", "items"):
+                clone_table(cur, schema, table)
+        conn.commit()
+    return schema
+
+
+def drop_bench_schema(db: str, schema: str) -> None:
+    with psycopg.connect(db) as conn:
+        conn.execute(f"DROP SCHEMA {schema} CASCADE")
+        conn.commit()
+
+
+def count_items(db: str, schema: str) -> Dict[str, int]:
+    with psycopg.connect(db) as conn:
+        rows = conn.execute(f"SELECT source_type, count(*) FROM {schema}.items GROUP BY 1").fetchall()
+    return {t: n for t, n in rows}
+
+
+def write_bench_sources(path: str, base_urls: List[str], args: argparse.Namespace) -> None:
+    """
+    sources.yaml de benchmark: `defaults` del repo + topic ai con N feeds RSS/Atom
+    repartidos entre dos hosts (127.0.0.1 / localhost) y topic plone con los scrapes.
+    """
+    with open(REPO_SOURCES, "r", encoding="utf-8") as f:
+        defaults = (yaml.safe_load(f) or {}).get("defaults", {})
+
+    ingest = dict(defaults.get("ingest", {}))
+    ingest.update(
+        max_items_per_source=args.entries,
+        max_concurrency=args.max_concurrency,
+        max_per_host=args.max_per_host,
+    )
+    defaults = dict(defaults, ingest=ingest)
+
+    feeds = []
+    for i in range(args.feeds):
+        base = base_urls[i % len(base_urls)]
+        fmt = "atom" if i % 3 == 2 else "rss"
+        feeds.append(
+            {
+                "id": f"bench_feed_{i}",
+                "type": "rss",
+                "url": f"{base}/feeds/feed{i}.xml?entries={args.entries}&format={fmt}",
+                "tags": ["bench"],
+            }
+        )
+
+    cfg = {
+        "version": 1,
+        "defaults": defaults,
+        "topics": {
+            "ai": {"ingest": {"stream_parse": args.stream}, "sources": feeds},
+            "plone": {
+                "sources": [
+                    {
+                        "id": "bench_plone_news",
+                        "type": "scrape",
+                        "url": f"{base_urls[0]}/plone.org/news-and-events",
+                        "parser": "plone_news_events",
+                        "tags": ["bench"],
+                    },
+                    {
+                        "id": "bench_plone_security",
+                        "type": "scrape",
+                        "url": f"{base_urls[0]}/plone.org/security",
+                        "parser": "plone_security",
+                        "tags": ["bench"],
+                    },
+                    {
+                        "id": "bench_plone_restapi",
+                        "type": "scrape",
+                        "url": f"{base_urls[1]}/plone.org/news-and-events",
+                        "api_url": f"{base_urls[1]}/plone.org/++api++/news-and-events",
+                        "parser": "plone_restapi",
+                        "tags": ["bench"],
+                    },
+                    {
+                        "id": "bench_plone_sitemap",
+                        "type": "scrape",
+                        "url": f"{base_urls[1]}/plone.org/",
+                        "sitemap_url": f"{base_urls[1]}/plone.org/sitemap.xml",
+                        "include": ["/plone.org/security/"],
+                        "parser": "sitemap",
+                        "tags": ["bench"],
+                    },
+                ]
+            },
+        },
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(cfg, f, sort_keys=False)
+
+
+def run_script(script: str, script_args: List[str], db: str, schema: str) -> Dict[str, Any]:
+    fd, stats_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    env = dict(os.environ)
+    env["PGOPTIONS"] = f"{env.get('PGOPTIONS', '')} -c search_path={schema}".strip()
+    env["BENCH_STATS_OUT"] = stats_path
+    env["DATABASE_URL"] = db
+
+    cmd = [sys.executable, os.path.join(HERE, "instrumented_run.py"), os.path.join(SRC, script)] + script_args
+    proc = subprocess.run(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        with open(stats_path, "r", encoding="utf-8") as f:
+            stats = json.load(f)
+    except (OSError, ValueError):
+        stats = {}
+    finally:
+        os.unlink(stats_path)
+
+    stats["returncode"] = proc.returncode
+    stats["output_tail"] = proc.stdout[-2000:]
+    return stats
+
+
+def report(label: str, stats: Dict[str, Any], http: Dict[str, Any], entries: int, inserted: int) -> None:
+    wall = stats.get("wall_seconds") or float("nan")
+    print(
+        f"  {label:<18} wall={wall:7.2f}s  entries/s={entries / wall:9.0f}  inserted={inserted:6d}  "
+        f"http={http['requests']:5d} ({http['bytes'] / 1024:8.0f} KiB)  "
+        f"db_rt={stats.get('db_roundtrips', 0):6d}  peak_rss={stats.get('peak_rss_mb', 0):6.0f} MiB"
+    )
+    if stats.get("returncode"):
+        print(f"    ❌ exit code {stats['returncode']}\n{stats.get('output_tail', '')}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=os.environ.get("DATABASE_URL"))
+    ap.add_argument("--feeds", type=int, default=9)
+    ap.add_argument("--entries", type=int, default=200)
+    ap.add_argument("--articles", type=int, default=50)
+    ap.add_argument("--latency-ms", type=float, default=50.0)
+    ap.add_argument("--body-kb", type=float, default=4.0)
+    ap.add_argument("--max-concurrency", type=int, default=8)
+    ap.add_argument("--max-per-host", type=int, default=2)
+    ap.add_argument("--stream", action="store_true", help="Activa stream_parse en los feeds de benchmark")
+    ap.add_argument("--keep-schema", action="store_true")
+    args = ap.parse_args()
+
+    if not args.db:
+        raise SystemExit("DATABASE_URL not set. Provide --db or set env DATABASE_URL.")
+
+    fixture = FixtureConfig(
+        entries=args.entries,
+        articles=args.articles,
+        latency_ms=args.latency_ms,
+        body_kb=args.body_kb,
+    )
+    server, http_stats = start_server("127.0.0.1", 0, fixture)
+    port = server.server_address[1]
+    base_urls = [f"http://127.0.0.1:{port}", f"http://localhost:{port}"]
+
+    schema = create_bench_schema(args.db)
+    print(f"Fixture server: {base_urls[0]} | schema: {schema}")
+    print(
+        f"feeds={args.feeds} entries={args.entries} articles={args.articles} latency={args.latency_ms}ms "
+        f"max_concurrency={args.max_concurrency} max_per_host={args.max_per_host} stream={args.stream}"
+    )
+
+    sources_path = os.path.join(tempfile.mkdtemp(prefix="bench_"), "sources.yaml")
+    write_bench_sources(sources_path, base_urls, args)
+
+    runs = [
+        ("ingest.py", ["--topic", "ai", "--force"], "rss", args.feeds * args.entries),
+        ("ingest_scrape.py", ["--topic", "plone", "--force"], "scrape", 4 * args.articles),
+    ]
+
+    try:
+        for script, script_args, kind, entries in runs:
+            print(f"\n{script}")
+            for phase in ("cold", "warm"):
+                before = count_items(args.db, schema).get(kind, 0)
+                http_stats.reset()
+                t0 = time.perf_counter()
+                stats = run_script(script, script_args + ["--sources", sources_path], args.db, schema)
+                stats.setdefault("wall_seconds", time.perf_counter() - t0)
+                inserted = count_items(args.db, schema).get(kind, 0) - before
+                report(f"{phase}", stats, http_stats.snapshot(), entries, inserted)
+    finally:
+        server.shutdown()
+        if args.keep_schema:
+            print(f"\nSchema kept: {schema}")
+        else:
+            drop_bench_schema(args.db, schema)
+
+
+if __name__ == "__main__":
+    main()
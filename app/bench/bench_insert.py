@@ -0,0 +1,101 @@
+"""
+Benchmark de escritura de items: bucle insert_item (un round-trip por fila)
+frente a insert_items (executemany en pipeline mode).
+
+Uso (dentro del contenedor app):
+    python app/bench/bench_insert.py --rows 200 --repeat 3
+
+Todo se hace en transacciones que se deshacen con ROLLBACK: no deja filas en `items`.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import timedelta
+from typing import Any, Callable, Dict, List
+
+import psycopg
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from ingest import insert_item, insert_items, utcnow  # noqa: E402
+
+
+BENCH_TOPIC = "__bench__"
+
+
+def make_rows(n: int, content_chars: int) -> List[Dict[str, Any]]:
+    run = uuid.uuid4().hex[:8]
+    now = utcnow()
+    body = ("lorem ipsum dolor sit amet " * (content_chars // 27 + 1))[:content_chars]
+    rows = []
+    for i in range(n):
+        url = f"https://bench.invalid/{run}/entry-{i}"
+        rows.append(
+            dict(
+                topic=BENCH_TOPIC,
+                source_id="__bench_source__",
+                source_type="rss",
+                title=f"Bench entry {i}",
+                url=url,
+                canonical_url=url,
+                published_at=now - timedelta(minutes=i),
+                content_text=f"{i} {body}",
+                tags=["bench"],
+                raw={"feed_url": "https://bench.invalid/feed", "entry": {"id": url, "title": f"Bench entry {i}"}},
+            )
+        )
+    return rows
+
+
+def loop_insert(conn: psycopg.Connection, rows: List[Dict[str, Any]]) -> int:
+    return sum(1 for r in rows if insert_item(conn, **r))
+
+
+def bulk_insert(conn: psycopg.Connection, rows: List[Dict[str, Any]]) -> int:
+    return sum(insert_items(conn, rows))
+
+
+def run_once(conn: psycopg.Connection, fn: Callable, rows: List[Dict[str, Any]]) -> float:
+    t0 = time.perf_counter()
+    inserted = fn(conn, rows)
+    elapsed = time.perf_counter() - t0
+    conn.rollback()
+    if inserted != len(rows):
+        raise SystemExit(f"{fn.__name__}: expected {len(rows)} inserts, got {inserted}")
+    return elapsed
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=os.environ.get("DATABASE_URL"))
+    ap.add_argument("--rows", type=int, default=200)
+    ap.add_argument("--content-chars", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    if not args.db:
+        raise SystemExit("DATABASE_URL not set. Provide --db or set env DATABASE_URL.")
+
+    with psycopg.connect(args.db) as conn:
+        conn.execute("SET TIME ZONE 'UTC'")
+        conn.commit()
+
+        print(f"rows={args.rows} content_chars={args.content_chars} repeat={args.repeat}")
+        results = {}
+        for fn in (loop_insert, bulk_insert):
+            best = None
+            for _ in range(args.repeat):
+                rows = make_rows(args.rows, args.content_chars)
+                elapsed = run_once(conn, fn, rows)
+                best = elapsed if best is None else min(best, elapsed)
+            results[fn.__name__] = best
+            print(f"  {fn.__name__:<12} best={best * 1000:8.1f} ms  {args.rows / best:10.0f} rows/s")
+
+        speedup = results["loop_insert"] / results["bulk_insert"]
+        print(f"  speedup bulk vs loop: x{speedup:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Micro-benchmark de los backends HTML de scrape/plone.py sobre páginas Plone guardadas.
+
+Compara extract_plone_article_soup (BeautifulSoup "html.parser", varias
+pasadas) con extract_plone_article en cada backend instalado (selectolax,
+lxml, html.parser) e informa páginas/s y coincidencia con la referencia.
+
+Origen de las páginas (por prioridad):
+  --dir DIR     ficheros *.html de un directorio
+  --db URL      HTML guardado de items scrapeados (raw.html o raw_blobs)
+  (nada)        artículos sintéticos de fixture_server.py
+
+Uso (dentro del contenedor app):
+    python app/bench/bench_plone_parsers.py --db "$DATABASE_URL" --limit 200 --repeat 5
+    python app/bench/bench_plone_parsers.py --dir /tmp/plone_pages
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from typing import Callable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from scrape.html_backend import available_backends  # noqa: E402
+from scrape.plone import extract_plone_article, extract_plone_article_soup  # noqa: E402
+
+
+Page = Tuple[str, str]  # (url, html)
+
+
+def pages_from_dir(path: str, limit: int) -> List[Page]:
+    out = []
+    for fn in sorted(glob.glob(os.path.join(path, "*.html")))[:limit]:
+        with open(fn, "r", encoding="utf-8", errors="replace") as f:
+            out.append((fn, f.read()))
+    return out
+
+
+def pages_from_db(db: str, limit: int) -> List[Page]:
+    import psycopg
+
+    from raw_store import resolve_html
+
+    out = []
+    with psycopg.connect(db) as conn:
+        rows = conn.execute(
+            """
+            SELECT url, raw FROM items
+            WHERE source_type='scrape' AND raw IS NOT NULL
+            ORDER BY fetched_at DESC
+            LIMIT %s
+            """,
+            (limit,),
+        ).fetchall()
+        for url, raw in rows:
+            html = resolve_html(conn, raw)
+            if html:
+                out.append((url, html))
+    return out
+
+
+def pages_from_fixture(limit: int, body_kb: float) -> List[Page]:
+    from fixture_server import FixtureConfig, render_article
+
+    cfg = FixtureConfig(body_kb=body_kb)
+    return [
+        (f"http://127.0.0.1/plone.org/news-and-events/item-{i}", render_article("news-and-events", i, cfg))
+        for i in range(limit)
+    ]
+
+
+def bench(fn: Callable[[str, str], tuple], pages: List[Page], repeat: int) -> Tuple[float, List[tuple]]:
+    results = [fn(html, url) for url, html in pages]  # calentamiento + resultados
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for url, html in pages:
+            fn(html, url)
+        best = min(best, time.perf_counter() - t0)
+    return best, results
+
+
+def agreement(results: List[tuple], reference: List[tuple]) -> Tuple[float, float, float]:
+    n = max(len(reference), 1)
+    title = sum(r[0] == ref[0] for r, ref in zip(results, reference)) / n
+    date = sum(r[1] == ref[1] for r, ref in zip(results, reference)) / n
+    text = sum(r[2] == ref[2] for r, ref in zip(results, reference)) / n
+    return title, date, text
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dir", default=None, help="Directorio con páginas *.html guardadas")
+    ap.add_argument("--db", default=None, help="Lee el HTML de items scrapeados (DATABASE_URL)")
+    ap.add_argument("--limit", type=int, default=200)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--body-kb", type=float, default=8.0, help="Tamaño de las páginas sintéticas")
+    args = ap.parse_args()
+
+    if args.dir:
+        pages, origin = pages_from_dir(args.dir, args.limit), args.dir
+    elif args.db:
+        pages, origin = pages_from_db(args.db, args.limit), "db"
+    else:
+        pages, origin = pages_from_fixture(args.limit, args.body_kb), "fixture"
+    if not pages:
+        raise SystemExit("No pages to benchmark.")
+
+    total_kb = sum(len(html) for _, html in pages) / 1024
+    print(f"pages={len(pages)} ({total_kb:.0f} KiB) from {origin} | repeat={args.repeat} (best run)")
+
+    ref_secs, reference = bench(extract_plone_article_soup, pages, args.repeat)
+    print(f"  {'bs4 html.parser (old)':<24} {len(pages) / ref_secs:9.0f} pages/s   x1.00")
+
+    for backend in available_backends():
+
+        def run(html: str, url: str, backend: Optional[str] = backend) -> tuple:
+            return extract_plone_article(html, url, backend)
+
+        secs, results = bench(run, pages, args.repeat)
+        title, date, text = agreement(results, reference)
+        print(
+            f"  {backend:<24} {len(pages) / secs:9.0f} pages/s   x{ref_secs / secs:4.2f}   "
+            f"same title={title:6.1%} date={date:6.1%} text={text:6.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
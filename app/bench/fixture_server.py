@@ -0,0 +1,372 @@
+"""
+Servidor HTTP local con feeds y páginas Plone sintéticas para benchmarks offline.
+
+Rutas:
+  /feeds/<name>.xml?entries=N&format=rss|atom     feed con N entradas (más recientes primero)
+  /plone.org/news-and-events                      listing con `articles` enlaces
+  /plone.org/news-and-events/item-<i>             artículo estilo Plone (h1, time, meta, JSON-LD)
+  /plone.org/security, /plone.org/security/...    igual para avisos de seguridad
+  /plone.org/++api++/<section>/@search            stand-in de plone.restapi @search (mismos artículos):
+                                                  sort_on=effective, b_start/b_size, effective.query
+                                                  + effective.range=min, fullobjects; forma de respuesta
+                                                  de plone.restapi (items, items_total, batching)
+  /plone.org/sitemap.xml                          sitemap index -> sitemap-<section>.xml (urlset con lastmod)
+  /__stats                                        JSON con peticiones y bytes servidos
+  /__reset                                        pone a cero los contadores
+
+El contenido es determinista (mismas URLs y fechas en cada pasada) para poder
+medir también la pasada "en caliente", donde casi todo ya está en BD.
+Las rutas llevan "plone.org" en el path porque los discover_* de scrape/plone.py
+filtran por esa cadena.
+
+Uso independiente:
+    python app/bench/fixture_server.py --port 8765 --latency-ms 50
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+
+BASE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+LOREM = (
+    "Plone is a mature open source content management system built on Python. "
+    "This release fixes several issues in the REST API and improves Volto performance. "
+)
+
+
+class FixtureConfig:
+    def __init__(
+        self,
+        entries: int = 200,
+        articles: int = 50,
+        latency_ms: float = 0.0,
+        body_kb: float = 4.0,
+        entry_interval_hours: float = 6.0,
+    ):
+        self.entries = entries
+        self.articles = articles
+        self.latency_ms = latency_ms
+        self.body_kb = body_kb
+        self.entry_interval_hours = entry_interval_hours
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.bytes = 0
+            self.by_kind: Dict[str, int] = {}
+
+    def add(self, kind: str, size: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.bytes += size
+            self.by_kind[kind] = self.by_kind.get(kind, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"requests": self.requests, "bytes": self.bytes, "by_kind": dict(self.by_kind)}
+
+
+def _body_text(i: int, body_kb: float) -> str:
+    n = max(1, int(body_kb * 1024 / len(LOREM)))
+    return f"Item {i}. " + LOREM * n
+
+
+def _article_title(section: str, i: int) -> str:
+    """Título HTML; uno de cada tres lleva entidades con nombre y numéricas (lxml corta el texto en ellas)."""
+    if i % 3 == 1:
+        return f"{section} item {i}: Caf&eacute; &amp; r&#233;sum&eacute; for Plone&rsquo;s 6.1"
+    return f"{section} item {i}"
+
+
+def _article_body(i: int, body_kb: float) -> str:
+    text = _body_text(i, body_kb)
+    if i % 3 == 1:
+        text = "Un caf&eacute; d&eacute;licieux. It&#8217;s &ldquo;fine&rdquo; &mdash; na&#xEF;ve. " + text
+    return text
+
+
+def _entry_time(i: int, cfg: FixtureConfig) -> datetime:
+    return BASE_TIME - timedelta(hours=cfg.entry_interval_hours * i)
+
+
+def render_rss(name: str, base: str, n: int, cfg: FixtureConfig) -> str:
+    items = []
+    for i in range(n):
+        link = f"{base}/posts/{name}/{i}"
+        items.append(
+            "<item>"
+            f"<title>{name} entry {i}</title>"
+            f"<link>{link}</link>"
+            f"<guid>{link}</guid>"
+            f"<pubDate>{format_datetime(_entry_time(i, cfg))}</pubDate>"
+            f"<description>&lt;p&gt;{_body_text(i, cfg.body_kb)}&lt;/p&gt;</description>"
+            "<category>bench</category>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<rss version="2.0"><channel>'
+        f"<title>Bench feed {name}</title><link>{base}/</link><description>bench</description>"
+        + "".join(items)
+        + "</channel></rss>"
+    )
+
+
+def render_atom(name: str, base: str, n: int, cfg: FixtureConfig) -> str:
+    entries = []
+    for i in range(n):
+        link = f"{base}/posts/{name}/{i}"
+        ts = _entry_time(i, cfg).isoformat()
+        entries.append(
+            "<entry>"
+            f"<title>{name} release {i}</title>"
+            f'<link rel="alternate" href="{link}"/>'
+            f"<id>{link}</id><updated>{ts}</updated><published>{ts}</published>"
+            f'<content type="html">&lt;p&gt;{_body_text(i, cfg.body_kb)}&lt;/p&gt;</content>'
+            "</entry>"
+        )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<feed xmlns="http://www.w3.org/2005/Atom">'
+        f"<title>Bench atom {name}</title><id>{base}/feeds/{name}</id><updated>{BASE_TIME.isoformat()}</updated>"
+        + "".join(entries)
+        + "</feed>"
+    )
+
+
+def render_listing(section: str, base: str, cfg: FixtureConfig) -> str:
+    links = "".join(
+        f'<li><a href="{base}/plone.org/{section}/item-{i}">{_article_title(section, i)}</a></li>'
+        for i in range(cfg.articles)
+    )
+    return (
+        f"<html><head><title>{section}</title></head><body>"
+        f'<nav><a href="{base}/plone.org/">Home</a></nav>'
+        f"<main><h1>{section}</h1><ul>{links}</ul></main></body></html>"
+    )
+
+
+def render_article(section: str, i: int, cfg: FixtureConfig) -> str:
+    ts = _entry_time(i, cfg).isoformat()
+    jsonld = json.dumps({"@context": "https://schema.org", "@type": "NewsArticle", "datePublished": ts})
+    return (
+        "<html><head>"
+        f"<title>{_article_title(section, i)} — Plone.org</title>"
+        f'<meta property="article:published_time" content="{ts}">'
+        f'<script type="application/ld+json">{jsonld}</script>'
+        "<style>body { font-family: sans-serif }</style>"
+        "</head><body>"
+        "<header><nav>Plone.org · Download · Documentation · Community</nav></header>"
+        f'<main><article><h1>{_article_title(section, i)}</h1><time datetime="{ts}">{ts[:10]}</time>'
+        f"<p>{_article_body(i, cfg.body_kb)}</p><script>var tracking = 1;</script></article></main>"
+        "<footer>The Plone® Open Source CMS/WCM is © 2000-2026 by the Plone Foundation</footer>"
+        "</body></html>"
+    )
+
+
+def render_restapi_search(section: str, base: str, qs: Dict[str, str], cfg: FixtureConfig) -> str:
+    api = f"{base}/plone.org/++api++/{section}"
+    since = qs.get("effective.query") if qs.get("effective.range") == "min" else None
+    since_dt = datetime.fromisoformat(since.replace("Z", "+00:00")) if since else None
+
+    matches = [i for i in range(cfg.articles) if since_dt is None or _entry_time(i, cfg) >= since_dt]
+    if qs.get("sort_order") in ("ascending", None) and qs.get("sort_on") == "effective":
+        matches.reverse()  # i=0 es el más reciente
+
+    b_size = int(qs.get("b_size", 25))
+    b_start = int(qs.get("b_start", 0))
+    fullobjects = qs.get("fullobjects") not in (None, "0", "false")
+
+    items = []
+    for i in matches[b_start:b_start + b_size]:
+        ts = _entry_time(i, cfg).isoformat()
+        obj: Dict[str, Any] = {
+            "@id": f"{api}/item-{i}",
+            "@type": "News Item",
+            "title": f"{section} item {i}",
+            "description": f"Summary of {section} item {i}",
+            "review_state": "published",
+            "effective": ts,
+            "modified": ts,
+            "Subject": ["bench"],
+        }
+        if fullobjects:
+            obj["text"] = {
+                "content-type": "text/html",
+                "data": f"<p>{_body_text(i, cfg.body_kb)}</p>",
+                "encoding": "utf-8",
+            }
+        items.append(obj)
+
+    data: Dict[str, Any] = {"@id": f"{api}/@search", "items": items, "items_total": len(matches)}
+    if len(matches) > b_size:
+        # plone.restapi solo incluye `batching` cuando hay más de un lote
+        def page(start: int) -> str:
+            return f"{api}/@search?" + urlencode(dict(qs, b_start=start))
+
+        last = ((len(matches) - 1) // b_size) * b_size
+        data["batching"] = {"@id": page(b_start), "first": page(0), "last": page(last)}
+        if b_start + b_size < len(matches):
+            data["batching"]["next"] = page(b_start + b_size)
+        if b_start > 0:
+            data["batching"]["prev"] = page(max(0, b_start - b_size))
+    return json.dumps(data)
+
+
+def render_sitemap_index(base: str, cfg: FixtureConfig) -> str:
+    newest = _entry_time(0, cfg).isoformat()
+    maps = "".join(
+        f"<sitemap><loc>{base}/plone.org/sitemap-{section}.xml</loc><lastmod>{newest}</lastmod></sitemap>"
+        for section in ("news-and-events", "security")
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{maps}</sitemapindex>'
+    )
+
+
+def render_sitemap(section: str, base: str, cfg: FixtureConfig) -> str:
+    urls = "".join(
+        f"<url><loc>{base}/plone.org/{section}/item-{i}</loc><lastmod>{_entry_time(i, cfg).isoformat()}</lastmod></url>"
+        for i in range(cfg.articles)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+    )
+
+
+def make_handler(cfg: FixtureConfig, stats: Stats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt: str, *args: Any) -> None:
+            pass
+
+        def _send(self, status: int, body: str, ctype: str, kind: str, etag: Optional[str] = None) -> None:
+            data = body.encode("utf-8")
+            if etag and self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                stats.add(kind + ":304", 0)
+                return
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            if etag:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(data)
+            stats.add(kind, len(data))
+
+        def do_GET(self) -> None:
+            parts = urlsplit(self.path)
+            qs = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+            path = parts.path.rstrip("/")
+            base = f"http://{self.headers.get('Host')}"
+
+            if path == "/__stats":
+                self._send(200, json.dumps(stats.snapshot()), "application/json", "__stats")
+                return
+            if path == "/__reset":
+                stats.reset()
+                self._send(200, "{}", "application/json", "__reset")
+                return
+
+            latency = float(qs.get("latency_ms", cfg.latency_ms))
+            if latency > 0:
+                time.sleep(latency / 1000.0)
+
+            body, ctype, kind = self.route(path, qs, base)
+            if body is None:
+                self._send(404, "not found", "text/plain", "404")
+                return
+            etag = qs.get("etag")
+            self._send(200, body, ctype, kind, etag=f'"{etag}"' if etag else None)
+
+        def route(self, path: str, qs: Dict[str, str], base: str) -> Tuple[Optional[str], str, str]:
+            if path.startswith("/feeds/") and path.endswith(".xml"):
+                name = path[len("/feeds/"):-len(".xml")]
+                n = int(qs.get("entries", cfg.entries))
+                if qs.get("format") == "atom":
+                    return render_atom(name, base, n, cfg), "application/atom+xml", "feed"
+                return render_rss(name, base, n, cfg), "application/rss+xml", "feed"
+
+            if path == "/plone.org/sitemap.xml":
+                return render_sitemap_index(base, cfg), "application/xml", "sitemap"
+
+            for section in ("news-and-events", "security"):
+                if path == f"/plone.org/sitemap-{section}.xml":
+                    return render_sitemap(section, base, cfg), "application/xml", "sitemap"
+                if path == f"/plone.org/++api++/{section}/@search":
+                    return render_restapi_search(section, base, qs, cfg), "application/json", "restapi"
+
+                prefix = f"/plone.org/{section}"
+                if path == prefix:
+                    return render_listing(section, base, cfg), "text/html; charset=utf-8", "listing"
+                if path.startswith(prefix + "/item-"):
+                    try:
+                        i = int(path[len(prefix + "/item-"):])
+                    except ValueError:
+                        return None, "", ""
+                    return render_article(section, i, cfg), "text/html; charset=utf-8", "article"
+
+            return None, "", ""
+
+    return Handler
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, cfg: Optional[FixtureConfig] = None):
+    """
+    Arranca el servidor en un hilo. Devuelve (server, stats); server.server_address
+    tiene el puerto real si se pidió port=0.
+    """
+    cfg = cfg or FixtureConfig()
+    stats = Stats()
+    server = ThreadingHTTPServer((host, port), make_handler(cfg, stats))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--entries", type=int, default=200)
+    ap.add_argument("--articles", type=int, default=50)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--body-kb", type=float, default=4.0)
+    args = ap.parse_args()
+
+    cfg = FixtureConfig(
+        entries=args.entries,
+        articles=args.articles,
+        latency_ms=args.latency_ms,
+        body_kb=args.body_kb,
+    )
+    server, _ = start_server(args.host, args.port, cfg)
+    print(f"Fixture server on http://{args.host}:{server.server_address[1]}/ (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
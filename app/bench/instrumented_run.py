@@ -0,0 +1,79 @@
+"""
+Ejecuta un script del pipeline contando round-trips a Postgres y memoria pico.
+
+    python app/bench/instrumented_run.py app/src/ingest.py --topic all ...
+
+Las métricas se escriben como JSON en la ruta de BENCH_STATS_OUT al terminar:
+  statements          cur.execute / conn.execute
+  executemany         llamadas a executemany (un único round-trip en pipeline mode)
+  executemany_rows    filas enviadas por executemany
+  commits             conn.commit
+  db_roundtrips       statements + executemany + commits
+  wall_seconds, peak_rss_mb
+"""
+import json
+import os
+import resource
+import runpy
+import sys
+import time
+
+import psycopg
+
+
+counts = {"statements": 0, "executemany": 0, "executemany_rows": 0, "commits": 0}
+
+_execute = psycopg.Cursor.execute
+_executemany = psycopg.Cursor.executemany
+_commit = psycopg.Connection.commit
+
+
+def execute(self, *args, **kwargs):
+    counts["statements"] += 1
+    return _execute(self, *args, **kwargs)
+
+
+def executemany(self, query, params_seq, *args, **kwargs):
+    params_seq = list(params_seq)
+    counts["executemany"] += 1
+    counts["executemany_rows"] += len(params_seq)
+    return _executemany(self, query, params_seq, *args, **kwargs)
+
+
+def commit(self):
+    counts["commits"] += 1
+    return _commit(self)
+
+
+def main() -> None:
+    if len(sys.argv) < 2:
+        raise SystemExit("usage: instrumented_run.py <script.py> [args...]")
+
+    psycopg.Cursor.execute = execute
+    psycopg.Cursor.executemany = executemany
+    psycopg.Connection.commit = commit
+
+    script = os.path.abspath(sys.argv[1])
+    sys.argv = sys.argv[1:]
+    sys.path.insert(0, os.path.dirname(script))
+
+    t0 = time.perf_counter()
+    status = 0
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    finally:
+        stats = dict(counts)
+        stats["db_roundtrips"] = counts["statements"] + counts["executemany"] + counts["commits"]
+        stats["wall_seconds"] = time.perf_counter() - t0
+        stats["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+        out = os.environ.get("BENCH_STATS_OUT")
+        if out:
+            with open(out, "w", encoding="utf-8") as f:
+                json.dump(stats, f)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Backfill histórico: `ingest.py --backfill` e `ingest_scrape.py --backfill`
+con --since/--until.
+
+La ingesta normal solo ve lo que el feed expone hoy y avanza
+last_published_at. El backfill recorre el archivo de cada fuente por páginas:
+
+  rss      feeds paginados: ?paged=N (WordPress) o `backfill.page_url` de la fuente,
+           p.ej. "{url}?page={page}"
+  listing  listings Plone con ?b_start:int=N (paso `b_size`)
+  sitemap  el sitemap completo con lastmod dentro de la ventana, en bloques de `b_size`
+           (checkpoint por hash de las URLs y lastmod del bloque, no por posición)
+  api      @search de plone.restapi con effective entre since y until, por b_start
+
+Las páginas se descargan en bloques paralelos de `chunk_pages` y se guardan en
+el hilo principal; cada bloque hace un único commit con sus items y su
+checkpoint en backfill_pages, así que una ejecución interrumpida retoma donde
+se quedó (con los mismos --since/--until; sin --until se usa hoy 00:00 UTC). Una fila con page='' marca la
+fuente como terminada para esa ventana.
+
+Se deja de paginar con una página vacía, un 404/410, una página que no trae
+nada nuevo (feeds que ignoran el parámetro) o una con todo anterior a since.
+Solo se guardan items con fecha real dentro de [since, until) y no se toca
+last_published_at, etag/last_modified, cadence ni el circuito de la fuente:
+el incremental sigue como estaba.
+
+Config (defaults.ingest.backfill, topics.<topic>.ingest.backfill y `backfill`
+en cada fuente):
+  max_pages     tope de páginas por fuente (defecto 200)
+  chunk_pages   páginas descargadas en paralelo por bloque (defecto 4)
+  b_size        elementos por página en listings / @search / bloques de sitemap (defecto 20)
+  page_url      plantilla de página para feeds rss ({url}, {page})
+  first_page    primera página de la plantilla (defecto 1)
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import psycopg
+import requests
+
+from pipeline_metrics import count
+
+
+DEFAULT_BACKFILL = {
+    "max_pages": 200,
+    "chunk_pages": 4,
+    "b_size": 20,
+    "first_page": 1,
+}
+DONE = ""
+
+
+@dataclass(frozen=True)
+class Window:
+    since: datetime
+    until: datetime
+
+    def contains(self, dt: Optional[datetime]) -> bool:
+        return dt is not None and self.since <= dt < self.until
+
+
+@dataclass
+class PageResult:
+    seen: int = 0
+    inserted: int = 0
+    exhausted: bool = False
+    retry: bool = False     # algo de la página falló: no se marca hecha
+
+
+def parse_date_arg(value: str) -> datetime:
+    """YYYY-MM-DD o ISO 8601; sin zona se toma como UTC."""
+    dt = datetime.fromisoformat(value.strip())
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def make_window(since: str, until: Optional[str]) -> Window:
+    window = Window(
+        since=parse_date_arg(since),
+        # por defecto hoy a las 00:00 UTC: la ventana (y sus checkpoints) no cambia al relanzar
+        until=parse_date_arg(until) if until else datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0),
+    )
+    if window.since >= window.until:
+        raise SystemExit(f"--since ({window.since:%Y-%m-%d}) must be before --until ({window.until:%Y-%m-%d})")
+    return window
+
+
+def get_backfill_cfg(cfg: Dict[str, Any], topic: Optional[str] = None, src: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    out = dict(DEFAULT_BACKFILL)
+    out.update(cfg.get("defaults", {}).get("ingest", {}).get("backfill", {}) or {})
+    if topic:
+        out.update(cfg.get("topics", {}).get(topic, {}).get("ingest", {}).get("backfill", {}) or {})
+    if src:
+        out.update(src.get("backfill") or {})
+    return out
+
+
+def feed_page_urls(url: str, bf_cfg: Dict[str, Any]) -> Iterator[str]:
+    template = bf_cfg.get("page_url") or ("{url}&paged={page}" if "?" in url else "{url}?paged={page}")
+    first = int(bf_cfg["first_page"])
+    for n in range(first, first + int(bf_cfg["max_pages"])):
+        yield template.format(url=url, page=n)
+
+
+def offset_page_urls(url: str, param: str, step: int, max_pages: int) -> Iterator[str]:
+    # sin urlencode: Zope espera el ':int' literal en b_start:int
+    sep = "&" if "?" in url else "?"
+    for n in range(int(max_pages)):
+        yield f"{url}{sep}{param}={n * int(step)}"
+
+
+def is_end_of_archive(err: BaseException) -> bool:
+    response = getattr(err, "response", None)
+    return isinstance(err, requests.HTTPError) and response is not None and response.status_code in (404, 410)
+
+
+def ensure_backfill_table(conn: psycopg.Connection) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS backfill_pages (
+              source_id text NOT NULL,
+              since timestamptz NOT NULL,
+              until timestamptz NOT NULL,
+              page text NOT NULL,
+              seen integer NOT NULL DEFAULT 0,
+              inserted integer NOT NULL DEFAULT 0,
+              done_at timestamptz NOT NULL DEFAULT now(),
+              PRIMARY KEY (source_id, since, until, page)
+            )
+            """
+        )
+
+
+def load_done_pages(conn: psycopg.Connection, source_id: str, window: Window) -> Set[str]:
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT page FROM backfill_pages WHERE source_id=%s AND since=%s AND until=%s",
+            (source_id, window.since, window.until),
+        )
+        return {row[0] for row in cur.fetchall()}
+
+
+def mark_pages_done(
+    conn: psycopg.Connection,
+    source_id: str,
+    window: Window,
+    rows: List[Tuple[str, int, int]],
+) -> None:
+    if not rows:
+        return
+    with conn.cursor() as cur:
+        cur.executemany(
+            """
+            INSERT INTO backfill_pages (source_id, since, until, page, seen, inserted)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (source_id, since, until, page) DO UPDATE SET
+              seen = EXCLUDED.seen, inserted = EXCLUDED.inserted, done_at = now()
+            """,
+            [(source_id, window.since, window.until, page, seen, inserted) for page, seen, inserted in rows],
+        )
+
+
+def run_pages(
+    conn: psycopg.Connection,
+    source_id: str,
+    window: Window,
+    pages: Iterable[str],
+    load: Callable[[str], Any],
+    store: Callable[[str, Any], PageResult],
+    chunk_pages: int,
+    complete_on_end: bool = False,
+) -> Tuple[int, int]:
+    """
+    Recorre `pages` en bloques: load(page) en paralelo (red + parseo, sin BD),
+    store(page, data) en este hilo y en orden de página. Devuelve (seen, inserted).
+
+    La fuente se marca terminada al agotarse el archivo (o al acabar `pages` si
+    complete_on_end: listas finitas como el sitemap), nunca si falló alguna página
+    o se llegó a max_pages: la siguiente ejecución sigue desde ahí.
+    """
+    done = load_done_pages(conn, source_id, window)
+    if DONE in done:
+        print(f"  already backfilled for {window.since:%Y-%m-%d}..{window.until:%Y-%m-%d} (skip)")
+        return 0, 0
+    if done:
+        print(f"  resuming: {len(done)} pages already done")
+
+    seen_total = 0
+    inserted_total = 0
+    failed = 0
+    exhausted = False
+    ended = False
+    it = iter(pages)
+
+    with ThreadPoolExecutor(max_workers=max(1, int(chunk_pages))) as pool:
+        while not exhausted:
+            chunk = list(islice(it, max(1, int(chunk_pages))))
+            if not chunk:
+                ended = True
+                break
+            futures = [(page, pool.submit(load, page)) for page in chunk if page not in done]
+
+            rows: List[Tuple[str, int, int]] = []
+            for page, fut in futures:
+                try:
+                    data = fut.result()
+                except Exception as e:
+                    if is_end_of_archive(e):
+                        exhausted = True
+                        break
+                    print(f"  ⚠️ page error {page}: {e}")
+                    count("errors", source=source_id)
+                    failed += 1
+                    continue
+
+                res = store(page, data)
+                seen_total += res.seen
+                inserted_total += res.inserted
+                if res.retry:
+                    failed += 1
+                else:
+                    rows.append((page, res.seen, res.inserted))
+                if res.exhausted:
+                    exhausted = True
+                    break
+
+            if exhausted and not failed:
+                rows.append((DONE, seen_total, inserted_total))
+            if rows:
+                mark_pages_done(conn, source_id, window, rows)
+                conn.commit()
+                print(f"  pages done: {len(done) + sum(1 for r in rows if r[0] != DONE)} | seen: {seen_total} | inserted: {inserted_total}")
+            done.update(r[0] for r in rows)
+
+    if ended and complete_on_end and not failed:
+        mark_pages_done(conn, source_id, window, [(DONE, seen_total, inserted_total)])
+        conn.commit()
+    elif ended and not complete_on_end:
+        print("  stopped at max_pages (raise backfill.max_pages to continue)")
+    if failed:
+        print(f"  {failed} pages failed: run again with the same --since/--until to retry them")
+
+    count("rows_read", seen_total, source=source_id)
+    count("rows_written", inserted_total, source=source_id)
+    return seen_total, inserted_total
@@ -1,15 +1,33 @@
+import argparse
 import os
 import re
 import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 import psycopg
-import requests
+import yaml
 from bs4 import BeautifulSoup
 
+from http_cache import HttpCache
+from http_fetch import fetch as http_get, make_session
+from raw_store import decode_blob
+from scrape.html_backend import resolve_backend, scan_article
+from scrape.plone import (
+    _extract_from_jsonld,
+    _extract_from_meta,
+    _extract_from_time_tag,
+    _extract_from_visible_text,
+    _published_at_from_scan,
+)
+
 
 UA = "TechWatchBot/1.0"
+_session = None
+_cache: Optional[HttpCache] = None
 
 
 def _try_parse_dt(s: str) -> Optional[datetime]:
@@ -34,9 +52,10 @@ def _try_parse_dt(s: str) -> Optional[datetime]:
 
 
 def fetch(url: str) -> str:
-    r = requests.get(url, timeout=20, headers={"User-Agent": UA})
-    r.raise_for_status()
-    return r.text
+    global _session
+    if _session is None:
+        _session = make_session(UA, pool_size=2, cache=_cache)
+    return http_get(_session, url).text
 
 
 def pick_one_url(conn, source_id: str) -> Optional[str]:
@@ -112,7 +131,237 @@ def debug_url(url: str) -> None:
     print("HTML date (YYYY-MM-DD):", m2.group(0) if m2 else None)
 
 
+# Mismo orden que la cascada de scrape/plone.py::_extract_published_at.
+# visible_text va la última porque hace decompose() sobre el árbol.
+AUDIT_STRATEGIES = [
+    ("time_tag", _extract_from_time_tag),
+    ("meta", _extract_from_meta),
+    ("jsonld", _extract_from_jsonld),
+    ("visible_text", _extract_from_visible_text),
+]
+
+
+def iter_stored_pages(conn, source_id: Optional[str], limit: Optional[int]):
+    """
+    (id, source_id, url, published_at, html inline, blob encoding, blob data) de
+    los items scrapeados con HTML guardado. El blob se descomprime en el worker.
+    Cursor con nombre (server-side) para no cargar miles de páginas de golpe.
+    """
+    has_blobs = conn.execute("SELECT to_regclass('raw_blobs') IS NOT NULL").fetchone()[0]
+    blob_cols = "b.encoding, b.data" if has_blobs else "NULL, NULL"
+    blob_join = "LEFT JOIN raw_blobs b ON b.sha256 = i.raw->>'html_sha256'" if has_blobs else ""
+
+    query = f"""
+        SELECT i.id, i.source_id, i.url, i.published_at, i.raw->>'html', {blob_cols}
+        FROM items i
+        {blob_join}
+        WHERE i.source_type='scrape' AND (i.raw ? 'html' OR i.raw ? 'html_sha256')
+    """
+    params: List[Any] = []
+    if source_id:
+        query += " AND i.source_id=%s"
+        params.append(source_id)
+    query += " ORDER BY i.id"
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit)
+
+    with conn.cursor(name="audit_pages") as cur:
+        cur.itersize = 200
+        cur.execute(query, params)
+        for row in cur:
+            if row[4] is not None or row[6] is not None:
+                yield row
+
+
+def audit_page(row: tuple, backend: str) -> Dict[str, Any]:
+    item_id, source_id, url, stored_at, html, encoding, data = row
+    if html is None:
+        html = decode_blob(encoding, data)
+
+    # lo que ejecuta ingest_scrape: una pasada del backend configurado + cascada sobre el scan
+    t0 = time.perf_counter()
+    try:
+        production = _published_at_from_scan(scan_article(html, backend))
+    except Exception:
+        production = None
+    production_seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    soup = BeautifulSoup(html, "html.parser")
+    parse_seconds = time.perf_counter() - t0
+
+    dates: Dict[str, Optional[datetime]] = {}
+    seconds: Dict[str, float] = {}
+    for name, fn in AUDIT_STRATEGIES:
+        t0 = time.perf_counter()
+        try:
+            dates[name] = fn(soup)
+        except Exception:
+            dates[name] = None
+        seconds[name] = time.perf_counter() - t0
+
+    cascade = next((dates[name] for name, _ in AUDIT_STRATEGIES if dates[name]), None)
+    return {
+        "id": item_id,
+        "source_id": source_id,
+        "stored": stored_at,
+        "parse_seconds": parse_seconds,
+        "dates": dates,
+        "seconds": seconds,
+        "cascade": cascade,
+        "production": production,
+        "production_seconds": production_seconds,
+    }
+
+
+def audit_pages(rows: List[tuple], backend: str) -> List[Dict[str, Any]]:
+    return [audit_page(row, backend) for row in rows]
+
+
+def iter_audit_results(pool: ProcessPoolExecutor, rows, backend: str, chunk: int = 16, window: int = 32):
+    """
+    Como pool.map(audit_page, rows) pero con como mucho `window` lotes en vuelo:
+    Executor.map encolaría todas las páginas (y su HTML) de golpe.
+    """
+    pending = deque()
+    batch: List[tuple] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk:
+            pending.append(pool.submit(audit_pages, batch, backend))
+            batch = []
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+    if batch:
+        pending.append(pool.submit(audit_pages, batch, backend))
+    while pending:
+        yield from pending.popleft().result()
+
+
+def _day(dt: Optional[datetime]) -> Optional[str]:
+    return dt.astimezone(timezone.utc).date().isoformat() if dt else None
+
+
+def run_audit(db: str, source_id: Optional[str], limit: Optional[int], workers: Optional[int], backend: str) -> None:
+    names = [name for name, _ in AUDIT_STRATEGIES]
+    hits = {n: 0 for n in names}
+    secs = {n: 0.0 for n in names}
+    disagree = {n: 0 for n in names}   # fecha (día) distinta de la que elige la cascada
+    sole = {n: 0 for n in names}       # única estrategia con resultado
+    pages = 0
+    parse_total = 0.0
+    no_date = 0
+    conflicting = 0                    # páginas con candidatos de días distintos
+    stored_mismatch = 0                # la cascada no coincide con items.published_at
+    # columna "production": scan_article + _published_at_from_scan con `backend`
+    prod_hits = 0
+    prod_secs = 0.0
+    prod_vs_cascade = 0                # diferencias entre parsers, no de la cascada
+    prod_stored_mismatch = 0
+
+    t0 = time.perf_counter()
+    with psycopg.connect(db) as conn, ProcessPoolExecutor(max_workers=workers) as pool:
+        rows = iter_stored_pages(conn, source_id, limit)
+        for res in iter_audit_results(pool, rows, backend):
+            pages += 1
+            parse_total += res["parse_seconds"]
+            found = {n: _day(d) for n, d in res["dates"].items() if d}
+            cascade_day = _day(res["cascade"])
+            production_day = _day(res["production"])
+            prod_secs += res["production_seconds"]
+            if production_day:
+                prod_hits += 1
+            if production_day != cascade_day:
+                prod_vs_cascade += 1
+            if production_day and production_day != _day(res["stored"]):
+                prod_stored_mismatch += 1
+            for n in names:
+                secs[n] += res["seconds"][n]
+                if n in found:
+                    hits[n] += 1
+                    if found[n] != cascade_day:
+                        disagree[n] += 1
+            if len(found) == 1:
+                sole[next(iter(found))] += 1
+            if len(set(found.values())) > 1:
+                conflicting += 1
+            if not found:
+                no_date += 1
+            elif cascade_day != _day(res["stored"]):
+                stored_mismatch += 1
+    wall = time.perf_counter() - t0
+
+    if not pages:
+        print("No scraped items with stored HTML.")
+        return
+
+    print(f"\n=== DATE AUDIT ({pages} pages, {wall:.1f}s wall, {pages / wall:.0f} pages/s) ===")
+    print(f"parse (BeautifulSoup): {parse_total:.2f}s cpu, {parse_total / pages * 1000:.2f} ms/page")
+    print(f"{'strategy':<14} {'hit rate':>9} {'disagree':>9} {'sole hit':>9} {'ms/page':>8} {'cpu s':>8}")
+    for n in names:
+        rate = hits[n] / pages
+        dis = disagree[n] / hits[n] if hits[n] else 0.0
+        print(
+            f"{n:<14} {rate:>9.1%} {dis:>9.1%} {sole[n]:>9d} "
+            f"{secs[n] / pages * 1000:>8.2f} {secs[n]:>8.2f}"
+        )
+    bs4_secs = parse_total + sum(secs.values())
+    print(
+        f"{'production':<14} {prod_hits / pages:>9.1%} {prod_vs_cascade / pages:>9.1%} {'-':>9} "
+        f"{prod_secs / pages * 1000:>8.2f} {prod_secs:>8.2f}"
+    )
+    print(
+        f"  production = scan_article('{backend}') + _published_at_from_scan, parse incluido "
+        f"(BeautifulSoup + estrategias: {bs4_secs / pages * 1000:.2f} ms/page); "
+        "disagree = día distinto del de la cascada BeautifulSoup"
+    )
+    print(f"\nno date found: {no_date} ({no_date / pages:.1%})")
+    print(f"pages with conflicting candidates: {conflicting} ({conflicting / pages:.1%})")
+    print(f"cascade != stored published_at: {stored_mismatch} ({stored_mismatch / pages:.1%})")
+    print(f"production != stored published_at: {prod_stored_mismatch} ({prod_stored_mismatch / pages:.1%})")
+    print(f"production != cascade (parser differences): {prod_vs_cascade} ({prod_vs_cascade / pages:.1%})")
+
+
 def main():
+    global _cache
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sources", default=os.environ.get("SOURCES_YAML", "sources.yaml"))
+    ap.add_argument("--offline", action="store_true", help="Solo caché HTTP en disco, sin red")
+    ap.add_argument("--url", nargs="*", help="URLs concretas en lugar de la última de cada fuente")
+    ap.add_argument("--audit", action="store_true", help="Auditoría offline de estrategias sobre el HTML guardado")
+    ap.add_argument("--source", default=None, help="Con --audit: limita a una fuente")
+    ap.add_argument("--limit", type=int, default=None, help="Con --audit: máximo de páginas")
+    ap.add_argument("--workers", type=int, default=None, help="Con --audit: procesos (defecto: CPUs)")
+    ap.add_argument(
+        "--html-parser",
+        default=None,
+        help="Con --audit: backend de la columna production (defecto: html_parser de sources.yaml)",
+    )
+    args = ap.parse_args()
+
+    cfg = {}
+    if os.path.exists(args.sources):
+        with open(args.sources, "r", encoding="utf-8") as f:
+            cfg = yaml.safe_load(f) or {}
+
+    if args.audit:
+        db = os.environ.get("DATABASE_URL")
+        if not db:
+            raise SystemExit("DATABASE_URL env not set")
+        scrape_cfg = cfg.get("defaults", {}).get("ingest", {}).get("scrape", {}) or {}
+        backend = resolve_backend(args.html_parser or scrape_cfg.get("html_parser"))
+        run_audit(db, args.source, args.limit, args.workers, backend)
+        return
+
+    _cache = HttpCache.from_cfg(cfg, offline=args.offline)
+
+    if args.url:
+        for url in args.url:
+            debug_url(url)
+        return
+
     db = os.environ.get("DATABASE_URL")
     if not db:
         raise SystemExit("DATABASE_URL env not set")
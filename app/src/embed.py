@@ -1,10 +1,11 @@
 import os
 import json
 import time
-import psycopg
 import requests
 import google.generativeai as genai
 
+from pipeline_metrics import count, pipeline_stage
+
 def evaluate_with_gemini(prompt: str, api_key: str) -> dict:
     genai.configure(api_key=api_key)
     # Usamos gemini-1.5-flash (el estándar actual rápido y barato)
@@ -13,6 +14,11 @@ def evaluate_with_gemini(prompt: str, api_key: str) -> dict:
         generation_config={"response_mime_type": "application/json"}
     )
     response = model.generate_content(prompt)
+    count("llm_calls")
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        count("llm_tokens_in", getattr(usage, "prompt_token_count", 0) or 0)
+        count("llm_tokens_out", getattr(usage, "candidates_token_count", 0) or 0)
     return json.loads(response.text)
 
 def evaluate_with_ollama(prompt: str, url: str, model_name: str, api_key: str) -> dict:
@@ -29,10 +35,14 @@ def evaluate_with_ollama(prompt: str, url: str, model_name: str, api_key: str) -
     
     endpoint = f"{url.rstrip('/')}/api/generate"
     response = requests.post(endpoint, json=payload, headers=headers)
+    count("llm_calls")
     response.raise_for_status()
     
     # Ollama devuelve el string JSON dentro de la clave 'response'
-    return json.loads(response.json()["response"])
+    data = response.json()
+    count("llm_tokens_in", data.get("prompt_eval_count") or 0)
+    count("llm_tokens_out", data.get("eval_count") or 0)
+    return json.loads(data["response"])
 
 def main():
     db_url = os.environ.get("DATABASE_URL")
@@ -41,11 +51,11 @@ def main():
     if not db_url:
         raise SystemExit("DATABASE_URL no configurada.")
 
-    with psycopg.connect(db_url) as conn:
+    with pipeline_stage("embed", db_url) as metrics, metrics.connect(db_url) as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
-                SELECT id, topic, title, coalesce(content_text,'') as content_text
+                SELECT id, topic, title, coalesce(nullif(clean_text,''), content_text, '') as content_text
                 FROM items
                 WHERE status='ready' AND qdrant_id IS NOT NULL
                 ORDER BY fetched_at ASC
@@ -53,6 +63,7 @@ def main():
                 """
             )
             rows = cur.fetchall()
+        count("rows_read", len(rows))
 
         if not rows:
             print("No hay items pendientes de evaluar por LLM.")
@@ -103,6 +114,7 @@ def main():
                 conn.commit()
                 
                 processed += 1
+                count("rows_written")
                 print(f"[{topic}] Evaluado OK | Nota: {score}/10 | {title[:50]}...")
                 
                 # Pausa para no saturar APIs
@@ -111,6 +123,7 @@ def main():
             except Exception as e:
                 print(f"  ❌ Error procesando item {item_id}: {e}")
                 errors += 1
+                count("errors")
 
         print(f"\n--- Resumen LLM ({provider.upper()}) ---")
         print(f"Procesados OK: {processed} | Errores: {errors}")
@@ -1,61 +1,138 @@
+import json
 import os
-import re
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime, timezone, timedelta
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import psycopg
 
+from keywords import ensure_keyword_tables, tokenize, top_keywords_batch
+from normalize import ensure_clean_columns
+from pipeline_metrics import count, pipeline_stage
+from priority_rules import PriorityRules
 
-STOPWORDS = {
-    "the","a","an","and","or","to","of","in","on","for","with","by","from","at","as","is","are","was","were",
-    "this","that","these","those","it","its","be","can","may","will","we","you","they","their","our","your",
-    "new","release","released","version"
-}
 
-SECURITY_RE = re.compile(r"\b(cve-\d{4}-\d+|security|vulnerab|hotfix|patch)\b", re.I)
-RELEASE_RE = re.compile(r"\b(release|released|version|tag|changelog)\b", re.I)
+# reglas compiladas (sources.yaml); main() / el initializer del pool las cargan
+RULES: Optional[PriorityRules] = None
 
 
 def utcnow():
     return datetime.now(timezone.utc)
 
 
-def tokenize(text: str) -> List[str]:
-    text = (text or "").lower()
-    words = re.findall(r"[a-z0-9][a-z0-9\.\-_]{2,}", text)
-    return [w for w in words if w not in STOPWORDS]
+def init_rules(rules: PriorityRules) -> None:
+    global RULES
+    RULES = rules
 
 
-def top_keywords(text: str, k: int = 8) -> List[str]:
-    words = tokenize(text)
-    freq = {}
-    for w in words:
-        freq[w] = freq.get(w, 0) + 1
-    return [w for w, _ in sorted(freq.items(), key=lambda x: x[1], reverse=True)[:k]]
+UPDATE_ENRICHED_SQL = """
+    UPDATE items AS i
+    SET priority = v.priority,
+        tags = v.tags,
+        status = 'ready'
+    FROM jsonb_to_recordset(%s::jsonb) AS v(id bigint, priority integer, tags text[])
+    WHERE i.id = v.id AND i.status = 'new'
+"""
 
 
-def compute_priority(topic: str, source_id: str, title: str, content: str, tags: List[str]) -> int:
+def update_enriched(conn: psycopg.Connection, results: List[Dict[str, Any]]) -> int:
     """
-    Prioridad simple y transparente:
-    - Security muy alto
-    - Official > community
-    - Releases alto
+    Un único UPDATE ... FROM para todo el lote (un round-trip) en lugar de
+    uno por item. Devuelve las filas actualizadas.
     """
-    t = f"{title}\n{content}"
+    if not results:
+        return 0
+    with conn.cursor() as cur:
+        cur.execute(UPDATE_ENRICHED_SQL, (json.dumps(results),))
+        return cur.rowcount
+
+
+SELECT_NEW_SQL = """
+    SELECT id, topic, source_id, title, coalesce(nullif(clean_text,''), content_text, '') as content_text,
+           coalesce(tags, '{}'::text[]) as tags
+    FROM items
+    WHERE status='new'
+    ORDER BY fetched_at asc
+"""
+
+
+def enrich_row(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    """Tokens + prioridad de una fila de SELECT_NEW_SQL (CPU pura: apta para el pool)."""
+    item_id, topic, source_id, title, content_text, tags = row
+    text = f"{title}\n{content_text}"
+    return {
+        "id": item_id,
+        "topic": topic,
+        "priority": RULES.score(topic, source_id, text, tags),
+        "tags": list(tags),
+        "tokens": tokenize(text),
+    }
+
+
+def enrich_rows(
+    conn: psycopg.Connection,
+    rows: List[Tuple[Any, ...]],
+    pool: Optional[Executor] = None,
+    workers: int = 1,
+) -> List[Dict[str, Any]]:
+    """
+    Enriquece un lote: tokenize/prioridad por fila (en el pool si lo hay) y
+    keywords TF-IDF vectorizadas por topic, que actualizan keyword_df en la
+    transacción en curso: hay que hacer commit junto con update_enriched.
+    """
+    if pool is None:
+        scored = [enrich_row(r) for r in rows]
+    else:
+        # trozos grandes: el coste es serializar filas, no repartirlas
+        scored = list(pool.map(enrich_row, rows, chunksize=max(1, len(rows) // (workers * 4))))
 
-    if SECURITY_RE.search(t) or ("security" in (tags or [])) or ("cve" in (tags or [])):
-        return 100
+    by_topic: Dict[str, List[Dict[str, Any]]] = {}
+    for r in scored:
+        by_topic.setdefault(r["topic"], []).append(r)
 
-    official = ("official" in (tags or [])) or ("plone.org" in source_id) or ("django_official" in source_id)
-    if official:
-        base = 60
-    else:
-        base = 40
+    results = []
+    for topic, group in by_topic.items():
+        keywords = top_keywords_batch(conn, topic, [r["tokens"] for r in group], k=8)
+        for r, kw in zip(group, keywords):
+            # mezcla keywords con tags existentes sin duplicar
+            merged_tags = list(dict.fromkeys(r["tags"] + kw))
+            results.append({"id": r["id"], "priority": r["priority"], "tags": merged_tags})
+    return results
 
-    if RELEASE_RE.search(t) or ("release" in (tags or [])):
-        base += 15
 
-    return base
+def drain(
+    conn: psycopg.Connection,
+    batch_size: int,
+    pool: Optional[Executor] = None,
+    workers: int = 1,
+) -> Tuple[int, int]:
+    """
+    Vacía el backlog: recorre todos los items 'new' con un cursor de servidor
+    (WITH HOLD: sobrevive a los commits; Postgres materializa el resultado en
+    su lado, no en el cliente) en lotes de batch_size, calcula en el
+    pool y escribe cada lote con un UPDATE y un commit. Repite hasta que una
+    pasada no encuentra nada (lo que entró mientras tanto). Memoria acotada a un lote.
+    Devuelve (leídos, actualizados).
+    """
+    read = 0
+    updated = 0
+    while True:
+        read_pass = 0
+        with conn.cursor(name="enrich_new", withhold=True) as cur:
+            cur.itersize = batch_size
+            cur.execute(SELECT_NEW_SQL)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                read_pass += len(rows)
+                updated += update_enriched(conn, enrich_rows(conn, rows, pool, workers))
+                conn.commit()
+                print(f"  enriched so far: {updated}")
+        conn.commit()
+        read += read_pass
+        if read_pass == 0:
+            return read, updated
 
 
 def main():
@@ -64,47 +141,51 @@ def main():
         raise SystemExit("DATABASE_URL not set")
 
     limit = int(os.environ.get("ENRICH_LIMIT", "500"))
-
-    with psycopg.connect(db) as conn:
+    batch_size = max(1, int(os.environ.get("ENRICH_BATCH", "200")))
+    # ENRICH_DRAIN=1: procesa todo lo pendiente, no solo ENRICH_LIMIT filas
+    drain_mode = os.environ.get("ENRICH_DRAIN", "").lower() in ("1", "true", "yes")
+    workers = int(os.environ.get("ENRICH_WORKERS") or (os.cpu_count() or 1))
+    # reglas de prioridad de sources.yaml, compiladas una vez (ver priority_rules.py)
+    rules = PriorityRules.from_yaml(os.environ.get("SOURCES_YAML", "sources.yaml"))
+    init_rules(rules)
+
+    with pipeline_stage("enrich", db) as metrics, metrics.connect(db) as conn:
         conn.execute("SET TIME ZONE 'UTC'")
+        ensure_clean_columns(conn)
+        ensure_keyword_tables(conn)
         conn.commit()
 
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT id, topic, source_id, title, coalesce(content_text,'') as content_text,
-                       coalesce(tags, '{}'::text[]) as tags
-                FROM items
-                WHERE status='new'
-                ORDER BY fetched_at asc
-                LIMIT %s
-                """,
-                (limit,),
+        if drain_mode:
+            # workers <= 1: en el proceso principal (sin coste de arrancar el pool)
+            pool = (
+                ProcessPoolExecutor(max_workers=workers, initializer=init_rules, initargs=(rules,))
+                if workers > 1
+                else None
             )
+            try:
+                read, updated = drain(conn, batch_size, pool, workers)
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+            count("rows_read", read)
+            count("rows_written", updated)
+            print(f"Enriched items: {updated} (drain, workers={workers if pool else 1})")
+            return
+
+        with conn.cursor() as cur:
+            cur.execute(SELECT_NEW_SQL + " LIMIT %s", (limit,))
             rows = cur.fetchall()
 
-        updated = 0
-        for (item_id, topic, source_id, title, content_text, tags) in rows:
-            kw = top_keywords(f"{title}\n{content_text}", k=8)
-            pr = compute_priority(topic, source_id, title, content_text, list(tags))
+        conn.commit()
 
-            # mezcla keywords con tags existentes sin duplicar
-            merged_tags = list(dict.fromkeys(list(tags) + kw))
-
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    UPDATE items
-                    SET priority=%s,
-                        tags=%s,
-                        status='ready'
-                    WHERE id=%s
-                    """,
-                    (pr, merged_tags, item_id),
-                )
-            updated += 1
+        updated = 0
+        for start in range(0, len(rows), batch_size):
+            updated += update_enriched(conn, enrich_rows(conn, rows[start : start + batch_size]))
+            # commit por lote: un backlog grande no retiene los locks de items toda la pasada
+            conn.commit()
 
-        conn.commit()
+        count("rows_read", len(rows))
+        count("rows_written", updated)
         print(f"Enriched items: {updated}")
 
 
@@ -2,10 +2,11 @@ import os
 import json
 import time
 import re
-import psycopg
 import requests
 import google.generativeai as genai
 
+from pipeline_metrics import count, pipeline_stage
+
 def evaluate_with_gemini(prompt: str, api_key: str) -> dict:
     genai.configure(api_key=api_key)
     model = genai.GenerativeModel(
@@ -13,6 +14,11 @@ def evaluate_with_gemini(prompt: str, api_key: str) -> dict:
         generation_config={"response_mime_type": "application/json"}
     )
     response = model.generate_content(prompt)
+    count("llm_calls")
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        count("llm_tokens_in", getattr(usage, "prompt_token_count", 0) or 0)
+        count("llm_tokens_out", getattr(usage, "candidates_token_count", 0) or 0)
     try:
         return json.loads(response.text)
     except json.JSONDecodeError:
@@ -34,12 +40,15 @@ def evaluate_with_ollama(prompt: str, url: str, model_name: str, api_key: str) -
     endpoint = f"{base_url}/generate" if base_url.endswith("/api") else f"{base_url}/api/generate"
         
     response = requests.post(endpoint, json=payload, headers=headers)
+    count("llm_calls")
     
     if not response.ok:
         raise ValueError(f"Error HTTP {response.status_code}: {response.text[:200]}")
         
     try:
         data = response.json()
+        count("llm_tokens_in", data.get("prompt_eval_count") or 0)
+        count("llm_tokens_out", data.get("eval_count") or 0)
         raw_text = data["response"].strip()
         
         # LIMPIEZA MÁGICA: Quitamos el envoltorio Markdown ```json ... ``` si el LLM lo ha puesto
@@ -57,11 +66,11 @@ def main():
     if not db_url:
         raise SystemExit("DATABASE_URL no configurada.")
 
-    with psycopg.connect(db_url) as conn:
+    with pipeline_stage("evaluate_llm", db_url) as metrics, metrics.connect(db_url) as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
-                SELECT id, topic, title, coalesce(content_text,'') as content_text
+                SELECT id, topic, title, coalesce(nullif(clean_text,''), content_text, '') as content_text
                 FROM items
                 WHERE status='ready' AND qdrant_id IS NOT NULL
                 ORDER BY fetched_at ASC
@@ -69,6 +78,7 @@ def main():
                 """
             )
             rows = cur.fetchall()
+        count("rows_read", len(rows))
 
         if not rows:
             print("No hay items pendientes de evaluar por LLM.")
@@ -123,12 +133,14 @@ def main():
                 conn.commit()
                 
                 processed += 1
+                count("rows_written")
                 print(f"[{topic}] Evaluado OK | Nota: {score}/10 | {title[:50]}...")
                 time.sleep(2)
 
             except Exception as e:
                 print(f"  ❌ Error procesando item {item_id}: {e}")
                 errors += 1
+                count("errors")
 
         print(f"\n--- Resumen LLM ({provider.upper()}) ---")
         print(f"Procesados OK: {processed} | Errores: {errors}")
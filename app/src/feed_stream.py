@@ -0,0 +1,203 @@
+"""
+Parser de feeds en streaming (xml.etree.iterparse) para feeds grandes (arXiv).
+
+Devuelve las entradas de una en una como FeedParserDict con los campos que usa
+ingest.py (link, title, id, published_parsed/updated_parsed, summary, content,
+tags, author) y deja de leer en cuanto:
+  - se alcanza max_items, o
+  - aparecen `stop_after_old` entradas seguidas más antiguas que el umbral.
+
+Solo entiende RSS 2.0, RSS 1.0 (RDF) y Atom. Si el documento no es uno de
+esos o el XML está roto (también a mitad, con entradas ya emitidas), lanza
+StreamUnsupported y el llamador debe descartar lo leído y volver a feedparser,
+que marca el feed como bozo: un feed truncado no debe parecer sano.
+"""
+import io
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Iterator, Optional
+
+import feedparser
+
+
+ATOM_NS = "http://www.w3.org/2005/Atom"
+RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+RSS1_NS = "http://purl.org/rss/1.0/"
+DC_NS = "http://purl.org/dc/elements/1.1/"
+CONTENT_NS = "http://purl.org/rss/1.0/modules/content/"
+
+DEFAULT_STOP_AFTER_OLD = 10
+
+
+class StreamUnsupported(Exception):
+    pass
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1] if "}" in tag else tag
+
+
+def _ns(tag: str) -> str:
+    return tag[1:].split("}", 1)[0] if tag.startswith("{") else ""
+
+
+def _parse_date(s: Optional[str]) -> Optional[time.struct_time]:
+    s = (s or "").strip()
+    if not s:
+        return None
+    dt: Optional[datetime] = None
+    try:
+        dt = parsedate_to_datetime(s)  # RFC 822 (RSS)
+    except (TypeError, ValueError):
+        try:
+            dt = datetime.fromisoformat(s.replace("Z", "+00:00"))  # RFC 3339 (Atom, dc:date)
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).timetuple()
+
+
+def _text(el: ET.Element) -> str:
+    return "".join(el.itertext()).strip()
+
+
+def _rss_entry(item: ET.Element) -> feedparser.FeedParserDict:
+    e = feedparser.FeedParserDict()
+    tags = []
+    for child in item:
+        name, ns = _local(child.tag), _ns(child.tag)
+        if name == "title":
+            e["title"] = _text(child)
+        elif name == "link" and ns in ("", RSS1_NS):
+            e["link"] = _text(child)
+        elif name == "guid":
+            e["id"] = _text(child)
+        elif name == "description":
+            e["summary"] = _text(child)
+        elif name == "encoded" and ns == CONTENT_NS:
+            e["content"] = [feedparser.FeedParserDict(value=_text(child), type="text/html")]
+        elif name == "pubDate":
+            e["published"] = _text(child)
+            e["published_parsed"] = _parse_date(e["published"])
+        elif name == "date" and ns == DC_NS:
+            e["updated"] = _text(child)
+            e["updated_parsed"] = _parse_date(e["updated"])
+        elif name in ("author", "creator"):
+            e["author"] = _text(child)
+        elif name == "category":
+            tags.append(feedparser.FeedParserDict(term=_text(child), scheme=child.get("domain"), label=None))
+    if "id" not in e and item.get(f"{{{RDF_NS}}}about"):
+        e["id"] = item.get(f"{{{RDF_NS}}}about")
+    if tags:
+        e["tags"] = tags
+    return e
+
+
+def _atom_entry(entry: ET.Element) -> feedparser.FeedParserDict:
+    e = feedparser.FeedParserDict()
+    tags = []
+    for child in entry:
+        if _ns(child.tag) != ATOM_NS:
+            continue
+        name = _local(child.tag)
+        if name == "title":
+            e["title"] = _text(child)
+        elif name == "link":
+            rel = child.get("rel", "alternate")
+            href = child.get("href")
+            e.setdefault("links", []).append(feedparser.FeedParserDict(rel=rel, href=href, type=child.get("type")))
+            if rel == "alternate" and href and "link" not in e:
+                e["link"] = href
+        elif name == "id":
+            e["id"] = _text(child)
+        elif name == "summary":
+            e["summary"] = _text(child)
+        elif name == "content":
+            e["content"] = [feedparser.FeedParserDict(value=_text(child), type=child.get("type", "text"))]
+        elif name == "published":
+            e["published"] = _text(child)
+            e["published_parsed"] = _parse_date(e["published"])
+        elif name == "updated":
+            e["updated"] = _text(child)
+            e["updated_parsed"] = _parse_date(e["updated"])
+        elif name == "author":
+            for sub in child:
+                if _local(sub.tag) == "name":
+                    e["author"] = _text(sub)
+        elif name == "category":
+            tags.append(feedparser.FeedParserDict(term=child.get("term"), scheme=child.get("scheme"), label=child.get("label")))
+    if tags:
+        e["tags"] = tags
+    return e
+
+
+def iter_feed_entries(
+    content: bytes,
+    max_items: int,
+    threshold: Optional[datetime] = None,
+    stop_after_old: int = DEFAULT_STOP_AFTER_OLD,
+    meta: Optional[dict] = None,
+) -> Iterator[feedparser.FeedParserDict]:
+    """
+    Genera entradas en orden de documento. `meta` (si se pasa) recibe
+    meta["title"] con el título del feed en cuanto se ha leído.
+    Lanza StreamUnsupported si el formato no es reconocible o el XML está
+    roto, aunque ya se hayan producido entradas.
+    """
+    kind = None
+    depth = 0
+    yielded = 0
+    old_run = 0
+
+    try:
+        for event, el in ET.iterparse(io.BytesIO(content), events=("start", "end")):
+            name, ns = _local(el.tag), _ns(el.tag)
+
+            if event == "start":
+                depth += 1
+                if kind is None and depth == 1:
+                    if name == "rss":
+                        kind = "rss"
+                    elif name == "RDF" and ns == RDF_NS:
+                        kind = "rdf"
+                    elif name == "feed" and ns == ATOM_NS:
+                        kind = "atom"
+                    else:
+                        raise StreamUnsupported(f"root element <{name}> not streamable")
+                continue
+
+            depth -= 1
+
+            if meta is not None and name == "title" and "title" not in meta and depth == (1 if kind == "atom" else 2):
+                meta["title"] = _text(el)
+
+            if kind in ("rss", "rdf") and name == "item":
+                entry = _rss_entry(el)
+            elif kind == "atom" and name == "entry" and ns == ATOM_NS:
+                entry = _atom_entry(el)
+            else:
+                continue
+
+            el.clear()  # memoria acotada: no conservamos el árbol de entradas ya emitidas
+
+            parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+            if threshold and parsed and datetime(*parsed[:6], tzinfo=timezone.utc) <= threshold:
+                old_run += 1
+                if stop_after_old and old_run >= stop_after_old:
+                    return
+            else:
+                old_run = 0
+
+            yield entry
+            yielded += 1
+            if yielded >= max_items:
+                return
+    except ET.ParseError as e:
+        if yielded == 0:
+            raise StreamUnsupported(str(e))
+        # XML roto a mitad: quedarse con lo leído avanzaría last_published_at
+        # de un feed truncado como si estuviera completo
+        raise StreamUnsupported(f"XML broken after {yielded} entries: {e}")
@@ -5,6 +5,8 @@ import re
 from datetime import datetime
 from jinja2 import Environment, FileSystemLoader
 
+from pipeline_metrics import count, pipeline_stage
+
 def escape_latex(s: str) -> str:
     """Escapa caracteres especiales de LaTeX para evitar errores de compilación."""
     if not s:
@@ -16,7 +18,7 @@ def escape_latex(s: str) -> str:
     s = s.replace('^', '\\textasciicircum{}')
     return s
 
-def main():
+def build_pdf():
     json_path = os.environ.get("BULLETIN_OUT", "app/build/bulletin.json")
     build_dir = os.path.dirname(json_path)
     template_dir = os.path.join(os.path.dirname(__file__), "templates")
@@ -27,6 +29,9 @@ def main():
 
     with open(json_path, "r", encoding="utf-8") as f:
         data = json.load(f)
+    for t in data.get("topics", {}).values():
+        sections = t.get("sections") or [{"items": t.get("items") or []}]
+        count("rows_read", sum(len(s.get("items") or []) for s in sections))
 
     # Configuramos Jinja2 para que no choque con las llaves de LaTeX
     env = Environment(
@@ -73,6 +78,13 @@ def main():
     except subprocess.CalledProcessError as e:
         print("❌ Error al compilar el PDF. Revisa los logs de LaTeX.")
         print(e.stdout.decode('utf-8', errors='ignore'))
+        # salida != 0: pipeline_stage registra la etapa como error (y cuenta el error)
+        raise SystemExit(f"pdflatex failed with exit code {e.returncode}")
+
+
+def main():
+    with pipeline_stage("generate_pdf"):
+        build_pdf()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,169 @@
+"""
+Caché HTTP en disco (SQLite, cuerpos comprimidos con zlib) para scrapes y
+herramientas de depuración.
+
+Por URL guarda cuerpo, ETag, Last-Modified, encoding y hora de descarga.
+http_fetch.fetch la usa cuando la sesión tiene una caché asociada
+(make_session(..., cache=...)):
+
+  - con entrada en caché, la petición sale con If-None-Match / If-Modified-Since;
+    un 304 se sirve con el cuerpo guardado (solo cuesta la ida y vuelta de cabeceras);
+  - max_age_seconds > 0 sirve entradas recientes sin tocar la red;
+  - offline=True sirve solo desde caché y lanza CacheMiss si no está.
+
+Config en defaults.ingest.http_cache (enabled, path, max_age_seconds, prune_days).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import requests
+
+
+DEFAULT_HTTP_CACHE = {
+    "enabled": True,
+    "path": ".cache/http_cache.sqlite",
+    "max_age_seconds": 0,
+    "prune_days": 30,
+}
+
+
+class CacheMiss(requests.exceptions.RequestException):
+    pass
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    status: int
+    content: bytes
+    headers: Dict[str, str]
+    encoding: Optional[str]
+    fetched_at: float
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("last-modified")
+
+
+def get_http_cache_cfg(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(DEFAULT_HTTP_CACHE)
+    out.update(cfg.get("defaults", {}).get("ingest", {}).get("http_cache", {}) or {})
+    return out
+
+
+def cache_key(url: str, headers: Optional[Dict[str, str]] = None) -> str:
+    # la misma URL con otro Accept (p.ej. JSON de plone.restapi) es otra respuesta
+    accept = (headers or {}).get("Accept")
+    return f"{url}\n{accept}" if accept else url
+
+
+class HttpCache:
+    def __init__(self, path: str, max_age_seconds: float = 0, offline: bool = False):
+        self.path = path
+        self.max_age_seconds = float(max_age_seconds or 0)
+        self.offline = offline
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+              key TEXT PRIMARY KEY,
+              url TEXT NOT NULL,
+              status INTEGER NOT NULL,
+              headers TEXT NOT NULL,
+              encoding TEXT,
+              body BLOB NOT NULL,
+              size_bytes INTEGER NOT NULL,
+              fetched_at REAL NOT NULL
+            )
+            """
+        )
+        conn.commit()
+
+    @classmethod
+    def from_cfg(cls, cfg: Dict[str, Any], offline: bool = False) -> Optional["HttpCache"]:
+        c = get_http_cache_cfg(cfg)
+        if not c["enabled"] and not offline:
+            return None
+        return cls(c["path"], c["max_age_seconds"], offline=offline)
+
+    def _conn(self) -> sqlite3.Connection:
+        # una conexión por hilo (las descargas de artículos van en un ThreadPool)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        row = self._conn().execute(
+            "SELECT url, status, headers, encoding, body, fetched_at FROM responses WHERE key=?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        url, status, headers, encoding, body, fetched_at = row
+        return CacheEntry(url, status, zlib.decompress(body), json.loads(headers), encoding, fetched_at)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return self.max_age_seconds > 0 and time.time() - entry.fetched_at < self.max_age_seconds
+
+    def put(
+        self,
+        key: str,
+        url: str,
+        status: int,
+        content: bytes,
+        headers: Dict[str, str],
+        encoding: Optional[str],
+    ) -> None:
+        body = zlib.compress(content, 6)
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute(
+                """
+                INSERT INTO responses (key, url, status, headers, encoding, body, size_bytes, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                  url=excluded.url, status=excluded.status, headers=excluded.headers,
+                  encoding=excluded.encoding, body=excluded.body,
+                  size_bytes=excluded.size_bytes, fetched_at=excluded.fetched_at
+                """,
+                (key, url, status, json.dumps(headers), encoding, body, len(content), time.time()),
+            )
+            conn.commit()
+
+    def touch(self, key: str) -> None:
+        """Revalidada con 304: la entrada vuelve a contar como recién descargada."""
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("UPDATE responses SET fetched_at=? WHERE key=?", (time.time(), key))
+            conn.commit()
+
+    def prune(self, older_than_days: float) -> int:
+        if not older_than_days:
+            return 0
+        with self._write_lock:
+            conn = self._conn()
+            cur = conn.execute(
+                "DELETE FROM responses WHERE fetched_at < ?",
+                (time.time() - float(older_than_days) * 86400,),
+            )
+            conn.commit()
+            return cur.rowcount
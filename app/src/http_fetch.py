@@ -0,0 +1,332 @@
+"""
+Capa HTTP compartida por ingest.py, ingest_scrape.py, debug_plone_dates.py y check_rss.py.
+
+- Una requests.Session con pool keep-alive dimensionado a la concurrencia.
+- gzip/deflate siempre, brotli si el paquete `brotli` está instalado.
+- Timeouts reales: (connect, read) por socket + un tope total por descarga,
+  para que un host que envía bytes a cuentagotas no bloquee el pipeline.
+- GET condicional con el etag/last_modified guardados en `sources`.
+- Caché en disco opcional por sesión (http_cache.py): revalida con
+  If-None-Match/If-Modified-Since y sirve los 304 desde la caché.
+- Devuelve bytes; feedparser.parse recibe el contenido ya descargado.
+"""
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import feedparser
+import requests
+
+from http_cache import CacheEntry, CacheMiss, HttpCache, cache_key
+
+try:
+    import brotli  # noqa: F401  (urllib3 lo usa para descomprimir 'br')
+
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+
+DEFAULT_USER_AGENT = "TechWatchBot/1.0"
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 20.0
+DEFAULT_MAX_SECONDS = 60.0
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+# Funciones (url, status, bytes de red, hubo petición, servido de caché) que se
+# llaman tras cada fetch; pipeline_metrics registra aquí su contador.
+_fetch_observers: List[Callable[[str, int, int, bool, bool], None]] = []
+
+
+def add_fetch_observer(fn: Callable[[str, int, int, bool, bool], None]) -> None:
+    _fetch_observers.append(fn)
+
+
+def remove_fetch_observer(fn: Callable[[str, int, int, bool, bool], None]) -> None:
+    if fn in _fetch_observers:
+        _fetch_observers.remove(fn)
+
+
+def _notify(url: str, status: int, network_bytes: int, requested: bool, from_cache: bool) -> None:
+    for fn in _fetch_observers:
+        fn(url, status, network_bytes, requested, from_cache)
+
+
+class FetchTimeout(requests.exceptions.Timeout):
+    pass
+
+
+@dataclass
+class Timeouts:
+    connect: float = DEFAULT_CONNECT_TIMEOUT
+    read: float = DEFAULT_READ_TIMEOUT
+    total: float = DEFAULT_MAX_SECONDS
+
+    def as_requests(self) -> Tuple[float, float]:
+        return (self.connect, self.read)
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int
+    content: bytes = b""
+    headers: Dict[str, str] = field(default_factory=dict)
+    encoding: Optional[str] = None
+    elapsed: float = 0.0
+    from_cache: bool = False
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("last-modified")
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class HostLimiter:
+    """
+    Limita las peticiones simultáneas por host (varios feeds comparten github.com
+    o el foro de Discourse y no queremos abrirles N conexiones a la vez).
+    Con delay_seconds > 0 además espacia el inicio de peticiones al mismo host.
+    """
+
+    def __init__(self, max_per_host: int, delay_seconds: float = 0.0):
+        self.max_per_host = max(1, int(max_per_host))
+        self.delay_seconds = max(0.0, float(delay_seconds or 0.0))
+        self._lock = threading.Lock()
+        self._sems: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    def for_url(self, url: str) -> "_HostSlot":
+        host = (urlsplit(url).hostname or "").lower()
+        with self._lock:
+            sem = self._sems.get(host)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self.max_per_host)
+                self._sems[host] = sem
+        return _HostSlot(self, host, sem)
+
+    def _wait_turn(self, host: str) -> None:
+        if not self.delay_seconds:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, 0.0))
+            self._next_start[host] = start + self.delay_seconds
+        if start > now:
+            time.sleep(start - now)
+
+
+class _HostSlot:
+    def __init__(self, limiter: HostLimiter, host: str, sem: threading.BoundedSemaphore):
+        self.limiter = limiter
+        self.host = host
+        self.sem = sem
+
+    def __enter__(self) -> "_HostSlot":
+        self.sem.acquire()
+        self.limiter._wait_turn(self.host)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.sem.release()
+
+
+def get_timeouts(cfg: Dict[str, Any], topic: Optional[str] = None) -> Timeouts:
+    """
+    Lee defaults.ingest (y topics.<topic>.ingest si se indica):
+    connect_timeout_seconds, timeout_seconds (lectura) y max_fetch_seconds (total).
+    """
+    merged = dict(cfg.get("defaults", {}).get("ingest", {}) or {})
+    if topic:
+        merged.update(cfg.get("topics", {}).get(topic, {}).get("ingest", {}) or {})
+    return Timeouts(
+        connect=float(merged.get("connect_timeout_seconds") or DEFAULT_CONNECT_TIMEOUT),
+        read=float(merged.get("timeout_seconds") or DEFAULT_READ_TIMEOUT),
+        total=float(merged.get("max_fetch_seconds") or DEFAULT_MAX_SECONDS),
+    )
+
+
+def make_session(
+    user_agent: str = DEFAULT_USER_AGENT,
+    pool_size: int = 10,
+    cache: Optional[HttpCache] = None,
+) -> requests.Session:
+    session = requests.Session()
+    session.http_cache = cache
+    session.headers["User-Agent"] = user_agent or DEFAULT_USER_AGENT
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=max(1, pool_size),
+        pool_maxsize=max(1, pool_size),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch(
+    session: requests.Session,
+    url: str,
+    timeouts: Optional[Timeouts] = None,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    limiter: Optional[HostLimiter] = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> FetchResult:
+    """
+    GET con timeouts de conexión/lectura y tope total. Con etag/last_modified
+    hace GET condicional; un 304 vuelve como FetchResult(status=304) sin cuerpo.
+    Lanza requests.HTTPError en 4xx/5xx y FetchTimeout si se supera el tope total.
+
+    Si la sesión tiene caché (make_session(cache=...)) y no se pasan validadores
+    propios, se revalida con los de la caché y un 304 vuelve como 200 con el
+    cuerpo guardado (from_cache=True).
+    """
+    timeouts = timeouts or Timeouts()
+    req_headers = dict(headers or {})
+    if etag:
+        req_headers["If-None-Match"] = etag
+    if last_modified:
+        req_headers["If-Modified-Since"] = last_modified
+
+    cache: Optional[HttpCache] = getattr(session, "http_cache", None)
+    key = cache_key(url, headers)
+    entry = None
+    if cache is not None:
+        entry = cache.get(key)
+        if entry is not None and (cache.offline or cache.is_fresh(entry)):
+            _notify(url, entry.status, 0, False, True)
+            return _from_cache(entry)
+        if cache.offline:
+            raise CacheMiss(f"{url}: not in HTTP cache (offline)")
+        if entry is not None and not (etag or last_modified):
+            if entry.etag:
+                req_headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                req_headers["If-Modified-Since"] = entry.last_modified
+
+    try:
+        if limiter is not None:
+            with limiter.for_url(url):
+                result = _fetch(session, url, timeouts, req_headers, max_bytes)
+        else:
+            result = _fetch(session, url, timeouts, req_headers, max_bytes)
+    except Exception:
+        _notify(url, 0, 0, True, False)
+        raise
+
+    if cache is not None:
+        if result.not_modified and entry is not None and not (etag or last_modified):
+            cache.touch(key)
+            _notify(url, 304, 0, True, True)
+            return _from_cache(entry, elapsed=result.elapsed)
+        if result.status == 200:
+            cache.put(key, result.url, result.status, result.content, result.headers, result.encoding)
+    _notify(url, result.status, len(result.content), True, False)
+    return result
+
+
+def _from_cache(entry: CacheEntry, elapsed: float = 0.0) -> FetchResult:
+    return FetchResult(
+        url=entry.url,
+        status=entry.status,
+        content=entry.content,
+        headers=entry.headers,
+        encoding=entry.encoding,
+        elapsed=elapsed,
+        from_cache=True,
+    )
+
+
+def _fetch(
+    session: requests.Session,
+    url: str,
+    timeouts: Timeouts,
+    headers: Dict[str, str],
+    max_bytes: int,
+) -> FetchResult:
+    t0 = time.monotonic()
+    with session.get(url, headers=headers, timeout=timeouts.as_requests(), stream=True) as r:
+        resp_headers = {k.lower(): v for k, v in r.headers.items()}
+        if r.status_code == 304:
+            return FetchResult(url=r.url, status=304, headers=resp_headers, elapsed=time.monotonic() - t0)
+        r.raise_for_status()
+
+        chunks = []
+        size = 0
+        for chunk in r.iter_content(CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if time.monotonic() - t0 > timeouts.total:
+                raise FetchTimeout(f"{url}: exceeded {timeouts.total:.0f}s total download time")
+            if size > max_bytes:
+                raise FetchTimeout(f"{url}: body larger than {max_bytes} bytes")
+
+        return FetchResult(
+            url=r.url,
+            status=r.status_code,
+            content=b"".join(chunks),
+            headers=resp_headers,
+            encoding=r.encoding,
+            elapsed=time.monotonic() - t0,
+        )
+
+
+def parse_feed(result: FetchResult) -> Any:
+    """
+    feedparser sobre los bytes ya descargados. Se copian status/etag/modified
+    para que el resto del código los lea igual que con feedparser.parse(url).
+    """
+    if result.not_modified:
+        return feedparser.FeedParserDict(status=304, bozo=False, entries=[])
+
+    feed = feedparser.parse(result.content, response_headers=result.headers)
+    feed["status"] = result.status
+    feed["href"] = result.url
+    feed["etag"] = result.etag
+    feed["modified"] = result.last_modified
+    return feed
+
+
+def safe_get_entry_published(entry: Any) -> Optional[datetime]:
+    """published_parsed (o updated_parsed) de una entrada de feedparser como datetime UTC."""
+    for key in ("published_parsed", "updated_parsed"):
+        parsed = entry.get(key) if hasattr(entry, "get") else getattr(entry, key, None)
+        if parsed:
+            try:
+                return datetime(*parsed[:6], tzinfo=timezone.utc)
+            except Exception:
+                pass
+    return None
+
+
+def fetch_feed(
+    session: requests.Session,
+    url: str,
+    timeouts: Optional[Timeouts] = None,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    limiter: Optional[HostLimiter] = None,
+) -> Any:
+    result = fetch(session, url, timeouts, etag=etag, last_modified=last_modified, limiter=limiter)
+    return parse_feed(result)
@@ -2,15 +2,39 @@ import argparse
 import hashlib
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone, timedelta
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
 import feedparser
 import psycopg
-import yaml
-
+import requests
+
+from backfill import PageResult, Window, ensure_backfill_table, feed_page_urls, get_backfill_cfg, make_window, run_pages
+from feed_stream import StreamUnsupported, iter_feed_entries
+from http_fetch import (
+    HostLimiter,
+    Timeouts,
+    fetch,
+    get_timeouts,
+    make_session,
+    parse_feed,
+    safe_get_entry_published,
+)
+from pipeline_metrics import count, pipeline_stage, scoped_sources, source_scope
+from raw_store import get_raw_storage_cfg
+from source_health import (
+    ensure_health_columns,
+    get_circuit_cfg,
+    mark_half_open,
+    record_failure,
+    record_success,
+    split_allowed,
+)
+from source_schedule import ensure_schedule_columns, save_post_interval, split_due, update_post_interval
+from sources_config import get_ingest_setting, load_sources_yaml, resolve_topics
 
 SAFETY_WINDOW = timedelta(days=3)
 DROP_PARAMS_PREFIX = ("utm_",)
@@ -79,6 +103,21 @@ def to_jsonable(obj: Any) -> Any:
     return obj
 
 
+def compact_entry(entry: Any, fields: Optional[List[str]]) -> Any:
+    """
+    Payload de la entrada para items.raw. Con fields=None se guarda entera
+    (modo "full"); si no, solo los campos de la whitelist que existan.
+    """
+    if fields is None:
+        return to_jsonable(entry)
+    out = {}
+    for k in fields:
+        val = mget(entry, k)
+        if val is not None:
+            out[k] = to_jsonable(val)
+    return out
+
+
 def safe_get_entry_url(entry: Any) -> Optional[str]:
     url = mget(entry, "link")
     if url:
@@ -99,17 +138,6 @@ def safe_get_entry_title(entry: Any) -> str:
     return (str(title).strip() if title else "").strip() or "(no title)"
 
 
-def safe_get_entry_published(entry: Any) -> Optional[datetime]:
-    for key in ("published_parsed", "updated_parsed"):
-        parsed = mget(entry, key)
-        if parsed:
-            try:
-                return datetime(*parsed[:6], tzinfo=timezone.utc)
-            except Exception:
-                pass
-    return None
-
-
 def extract_best_text(entry: Any) -> str:
     content = mget(entry, "content")
     if content and isinstance(content, list) and content:
@@ -125,11 +153,6 @@ def extract_best_text(entry: Any) -> str:
     return ""
 
 
-def load_sources_yaml(path: str) -> Dict[str, Any]:
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
-
-
 def iter_topic_sources(cfg: Dict[str, Any], topic: str) -> Iterable[Dict[str, Any]]:
     topics = cfg.get("topics", {})
     topic_cfg = topics.get(topic, {})
@@ -168,7 +191,9 @@ def load_rss_sources_from_db(conn: psycopg.Connection, topic: str) -> List[Dict[
     with conn.cursor() as cur:
         cur.execute(
             """
-            SELECT id, topic, source_type, name, url, enabled, last_published_at, etag, last_modified
+            SELECT id, topic, source_type, name, url, enabled, last_published_at, etag, last_modified,
+                   last_fetched_at, post_interval_hours,
+                   failure_count, circuit_state, next_attempt_at
             FROM sources
             WHERE topic=%s AND source_type='rss' AND enabled=true
             ORDER BY id
@@ -179,6 +204,37 @@ def load_rss_sources_from_db(conn: psycopg.Connection, topic: str) -> List[Dict[
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+def load_known_urls(
+    conn: psycopg.Connection,
+    topic: str,
+    source_id: str,
+    threshold: Optional[datetime],
+) -> Set[str]:
+    """
+    URLs (originales y canónicas) ya guardadas para la fuente. Solo hace falta
+    mirar las que pasarían el umbral de fecha: las más antiguas ya se descartan antes.
+    """
+    query = """
+        SELECT url, canonical_url
+        FROM items
+        WHERE topic=%s AND source_id=%s
+    """
+    params: List[Any] = [topic, source_id]
+    if threshold:
+        query += " AND (published_at IS NULL OR published_at > %s)"
+        params.append(threshold)
+
+    known: Set[str] = set()
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+        for url, canonical in cur.fetchall():
+            if url:
+                known.add(url)
+            if canonical:
+                known.add(canonical)
+    return known
+
+
 def update_source_fetch_only(conn: psycopg.Connection, source_id: str) -> None:
     with conn.cursor() as cur:
         cur.execute(
@@ -214,8 +270,20 @@ def update_source_state(
         )
 
 
-def insert_item(
-    conn: psycopg.Connection,
+INSERT_ITEM_SQL = """
+    INSERT INTO items
+      (topic, source_id, source_type, title, url, canonical_url,
+       published_at, fetched_at, content_text, content_hash,
+       status, priority, tags, raw)
+    VALUES
+      (%s, %s, %s, %s, %s, %s,
+       %s, %s, %s, %s,
+       'new', 0, %s, %s::jsonb)
+    ON CONFLICT ON CONSTRAINT uniq_item DO NOTHING
+"""
+
+
+def item_params(
     topic: str,
     source_id: str,
     source_type: str,
@@ -226,188 +294,576 @@ def insert_item(
     content_text: str,
     tags: Optional[List[str]],
     raw: Dict[str, Any],
-) -> bool:
+) -> tuple:
     content_text = (content_text or "").strip()
     content_hash = sha256_text(content_text) if content_text else None
+    return (
+        topic,
+        source_id,
+        source_type,
+        title,
+        url,
+        canonical_url,
+        published_at,
+        utcnow(),
+        content_text if content_text else None,
+        content_hash,
+        tags if tags else None,
+        json.dumps(raw, ensure_ascii=False, default=str),
+    )
+
+
+def insert_item(conn: psycopg.Connection, **item: Any) -> bool:
+    """
+    Inserta un item (un round-trip). Se mantiene para el benchmark y usos puntuales;
+    la ingesta normal usa insert_items.
+    """
+    with conn.cursor() as cur:
+        cur.execute(INSERT_ITEM_SQL, item_params(**item))
+        return cur.rowcount == 1
+
+
+def insert_items(conn: psycopg.Connection, items: List[Dict[str, Any]]) -> List[bool]:
+    """
+    Inserta un lote de items con executemany en pipeline mode (los INSERT viajan
+    juntos, sin esperar respuesta de cada uno). Devuelve, en el mismo orden,
+    True para los que eran nuevos y False para los descartados por uniq_item.
+    """
+    if not items:
+        return []
 
+    flags: List[bool] = []
     with conn.cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO items
-              (topic, source_id, source_type, title, url, canonical_url,
-               published_at, fetched_at, content_text, content_hash,
-               status, priority, tags, raw)
-            VALUES
-              (%s, %s, %s, %s, %s, %s,
-               %s, %s, %s, %s,
-               'new', 0, %s, %s::jsonb)
-            ON CONFLICT ON CONSTRAINT uniq_item DO NOTHING            """,
-            (
-                topic,
-                source_id,
-                source_type,
-                title,
-                url,
-                canonical_url,
-                published_at,
-                utcnow(),
-                content_text if content_text else None,
-                content_hash,
-                tags if tags else None,
-                json.dumps(raw, ensure_ascii=False, default=str),
-            ),
+        cur.executemany(
+            INSERT_ITEM_SQL + " RETURNING id",
+            [item_params(**it) for it in items],
+            returning=True,
         )
-        return cur.rowcount == 1
+        while True:
+            flags.append(cur.fetchone() is not None)
+            if not cur.nextset():
+                break
+    return flags
+
+
+def fetch_and_parse_feed(
+    session: requests.Session,
+    src: Dict[str, Any],
+    timeouts: Timeouts,
+    limiter: HostLimiter,
+    max_items: int,
+    stream: bool = False,
+    stream_stop_after_old: int = 10,
+) -> Any:
+    """
+    Descarga y parsea un feed. Con stream=True usa el parser incremental
+    (feed_stream) que corta en max_items o tras una racha de entradas por debajo
+    del umbral; si el formato no se puede streamear, vuelve a feedparser.
+    """
+    result = fetch(
+        session,
+        src["url"],
+        timeouts,
+        etag=src.get("etag"),
+        last_modified=src.get("last_modified"),
+        limiter=limiter,
+    )
+    if not stream or result.not_modified:
+        return parse_feed(result)
+
+    last_pub = src.get("last_published_at")
+    threshold = (last_pub - SAFETY_WINDOW) if last_pub else None
+    meta: Dict[str, Any] = {}
+    try:
+        entries = list(
+            iter_feed_entries(
+                result.content,
+                max_items=int(max_items),
+                threshold=threshold,
+                stop_after_old=stream_stop_after_old,
+                meta=meta,
+            )
+        )
+    except StreamUnsupported as e:
+        # lo ya leído se descarta: feedparser vuelve a parsear el documento
+        # entero y, si el XML está roto, lo marca bozo (error y sin avanzar la marca)
+        print(f"  {src['id']}: streaming parse not possible ({e}), falling back to feedparser")
+        return parse_feed(result)
+
+    return feedparser.FeedParserDict(
+        status=result.status,
+        href=result.url,
+        etag=result.etag,
+        modified=result.last_modified,
+        bozo=False,
+        feed=feedparser.FeedParserDict(title=meta.get("title")),
+        entries=entries,
+    )
+
+
+def fetch_feeds_concurrently(
+    sources: List[Dict[str, Any]],
+    session: requests.Session,
+    max_workers: int,
+    max_per_host: int,
+    timeouts: Timeouts,
+    max_items: int,
+    stream: bool = False,
+    stream_stop_after_old: int = 10,
+) -> Iterator[Tuple[Dict[str, Any], Any, Optional[BaseException]]]:
+    """
+    Descarga (y parsea) los feeds en paralelo y los devuelve según van llegando,
+    para que el tiempo total dependa del feed más lento y no de la suma de todos.
+    Los inserts siguen en el hilo principal (una conexión, commit por fuente).
+    """
+    limiter = HostLimiter(max_per_host)
+
+    def fetch_one(src: Dict[str, Any]) -> Any:
+        # métricas HTTP atribuidas a la fuente desde el hilo de descarga
+        with source_scope(src["id"]):
+            return fetch_and_parse_feed(
+                session,
+                src,
+                timeouts,
+                limiter,
+                max_items,
+                stream,
+                stream_stop_after_old,
+            )
 
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as pool:
+        futures = {pool.submit(fetch_one, src): src for src in sources}
+        for fut in as_completed(futures):
+            src = futures[fut]
+            try:
+                yield src, fut.result(), None
+            except Exception as e:
+                yield src, None, e
 
-def main() -> None:
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--topic", required=True, choices=["plone", "django", "ai"])
-    ap.add_argument("--sources", default=os.environ.get("SOURCES_YAML", "sources.yaml"))
-    ap.add_argument("--db", default=os.environ.get("DATABASE_URL"))
-    args = ap.parse_args()
 
-    if not args.db:
-        raise SystemExit("DATABASE_URL not set. Provide --db or set env DATABASE_URL.")
+def entry_item(
+    topic: str,
+    source_id: str,
+    entry: Any,
+    entry_url: str,
+    feed_url: str,
+    feed_title: Optional[str],
+    tags: Optional[List[str]],
+    raw_fields: Optional[List[str]],
+) -> Dict[str, Any]:
+    """Item listo para insert_items a partir de una entrada del feed."""
+    return dict(
+        topic=topic,
+        source_id=source_id,
+        source_type="rss",
+        title=safe_get_entry_title(entry),
+        url=entry_url,
+        canonical_url=canonicalize_url(entry_url),
+        published_at=safe_get_entry_published(entry),
+        content_text=extract_best_text(entry),
+        tags=tags,
+        raw={
+            "feed_url": feed_url,
+            "feed_title": feed_title,
+            "entry": compact_entry(entry, raw_fields),
+        },
+    )
+
+
+def ingest_feed(
+    conn: psycopg.Connection,
+    topic: str,
+    src: Dict[str, Any],
+    feed: Any,
+    max_items: int,
+    tags: Optional[List[str]],
+    circuit: Dict[str, Any],
+    raw_fields: Optional[List[str]] = None,
+) -> Tuple[int, int, int]:
+    """
+    Procesa un feed ya descargado y hace commit. Devuelve (seen, inserted, skipped_known).
+    """
+    source_id = src["id"]
+    url = src["url"]
+
+    last_pub = src.get("last_published_at")
+    threshold = (last_pub - SAFETY_WINDOW) if last_pub else None
+
+    print(f"\n--- Fetched {source_id}: {url}")
+
+    if getattr(feed, "status", None) == 304:
+        print("  304 Not Modified (skip)")
+        update_source_fetch_only(conn, source_id)
+        record_success(conn, source_id)
+        conn.commit()
+        return 0, 0, 0
 
-    cfg = load_sources_yaml(args.sources)
+    if getattr(feed, "bozo", False):
+        err = getattr(feed, "bozo_exception", "unknown")
+        print(f"  ❌ parse error: {err}")
+        count("errors", source=source_id)
+        record_failure(conn, source_id, f"parse error: {err}", circuit)
+        conn.commit()
+        return 0, 0, 0
+
+    entries = getattr(feed, "entries", []) or []
+    print(f"  entries: {len(entries)} (processing up to {max_items})")
+
+    seen = 0
+    inserted = 0
+    skipped_known = 0
+    max_published_seen = last_pub
+
+    # Pre-check: en régimen normal casi todo ya está en BD; así nos ahorramos
+    # compact_entry/json.dumps/extract_best_text y el round-trip para esas entradas.
+    known = load_known_urls(conn, topic, source_id, threshold)
+
+    feed_title = None
+    try:
+        feed_title = mget(getattr(feed, "feed", None), "title")
+    except Exception:
+        feed_title = None
+
+    batch: List[Dict[str, Any]] = []
 
-    yaml_sources = list(iter_topic_sources(cfg, args.topic))
+    for entry in entries[: int(max_items)]:
+        seen += 1
+
+        entry_url = safe_get_entry_url(entry)
+        if not entry_url:
+            continue
+
+        canonical = canonicalize_url(entry_url)
+        if canonical in known or entry_url in known:
+            skipped_known += 1
+            continue
+
+        published_at = safe_get_entry_published(entry)
+
+        if threshold and published_at and published_at <= threshold:
+            continue
+
+        batch.append(entry_item(topic, source_id, entry, entry_url, url, feed_title, tags, raw_fields))
+
+    new_published: List[datetime] = []
+    for item, ok in zip(batch, insert_items(conn, batch)):
+        if ok:
+            inserted += 1
+            published_at = item["published_at"]
+            if published_at:
+                new_published.append(published_at)
+                if (max_published_seen is None) or (published_at > max_published_seen):
+                    max_published_seen = published_at
+
+    save_post_interval(
+        conn,
+        source_id,
+        update_post_interval(src.get("post_interval_hours"), last_pub, new_published),
+    )
+
+    update_source_state(
+        conn,
+        source_id=source_id,
+        last_published_at=max_published_seen,
+        etag=getattr(feed, "etag", None),
+        last_modified=getattr(feed, "modified", None),
+    )
+    record_success(conn, source_id)
+    conn.commit()
+
+    count("rows_read", seen, source=source_id)
+    count("rows_written", inserted, source=source_id)
+    print(f"  inserted: {inserted} | already known: {skipped_known} | last_published_at: {max_published_seen}")
+    return seen, inserted, skipped_known
+
+
+def ingest_topic(
+    conn: psycopg.Connection,
+    cfg: Dict[str, Any],
+    topic: str,
+    session: requests.Session,
+    force: bool = False,
+) -> Tuple[int, int, int]:
+    """
+    Ingesta RSS de un topic sobre una conexión y sesión HTTP compartidas.
+    Devuelve (seen, inserted, skipped_known).
+    """
+    yaml_sources = list(iter_topic_sources(cfg, topic))
     if not yaml_sources:
-        print(f"No sources found for topic='{args.topic}' in sources.yaml")
-        return
+        print(f"No sources found for topic='{topic}' in sources.yaml")
+        return 0, 0, 0
 
-    print(f"Topic: {args.topic}")
+    print(f"\n===== Topic: {topic} =====")
     print(f"YAML sources: {len(yaml_sources)}")
-    print("Connecting to Postgres...")
 
-    with psycopg.connect(args.db) as conn:
-        conn.execute("SET TIME ZONE 'UTC'")
-        conn.commit()
+    upsert_sources(conn, topic, yaml_sources)
+    conn.commit()
 
-        upsert_sources(conn, args.topic, yaml_sources)
-        conn.commit()
+    rss_sources = load_rss_sources_from_db(conn, topic)
+    if not rss_sources:
+        print(f"No RSS sources enabled for topic='{topic}'")
+        return 0, 0, 0
 
-        rss_sources = load_rss_sources_from_db(conn, args.topic)
-        if not rss_sources:
-            print(f"No RSS sources enabled for topic='{args.topic}'")
-            return
+    print(f"RSS sources enabled: {len(rss_sources)}")
 
-        print(f"RSS sources enabled: {len(rss_sources)}")
+    circuit = get_circuit_cfg(cfg)
+    rss_sources, blocked = split_allowed(rss_sources, utcnow())
+    for src, next_at in blocked:
+        print(
+            f"  ⛔ {src['id']}: circuit open after {src.get('failure_count')} failures, "
+            f"next attempt {next_at:%Y-%m-%d %H:%M} UTC"
+        )
 
-        inserted_total = 0
-        seen_total = 0
+    if not force:
+        cadence_by_id = {s["id"]: s.get("cadence") for s in yaml_sources}
+        rss_sources, skipped = split_due(
+            rss_sources,
+            cadence_by_id,
+            default_cadence=get_ingest_setting(cfg, topic, "cadence", "daily"),
+            max_poll_interval=get_ingest_setting(cfg, topic, "max_poll_interval", "7d"),
+            now=utcnow(),
+        )
+        for src, next_at in skipped:
+            print(f"  ⏭  {src['id']}: not due until {next_at:%Y-%m-%d %H:%M} UTC")
+        print(f"Sources due: {len(rss_sources)} | skipped by schedule: {len(skipped)}")
+
+    mark_half_open(conn, [s["id"] for s in rss_sources if s.get("circuit_state") == "half_open"])
+    conn.commit()
+
+    inserted_total = 0
+    seen_total = 0
+    skipped_total = 0
+
+    max_items = int(get_ingest_setting(cfg, topic, "max_items_per_source", 50))
+    max_concurrency = int(get_ingest_setting(cfg, topic, "max_concurrency", 8))
+    max_per_host = int(get_ingest_setting(cfg, topic, "max_per_host", 2))
+    timeouts = get_timeouts(cfg, topic)
+    stream = bool(get_ingest_setting(cfg, topic, "stream_parse", False))
+    stream_stop_after_old = int(get_ingest_setting(cfg, topic, "stream_stop_after_old", 10))
+
+    tags_by_id = {s["id"]: s.get("tags") for s in yaml_sources if s.get("type") == "rss"}
+
+    raw_cfg = get_raw_storage_cfg(cfg)
+    raw_fields = None if raw_cfg["mode"] == "full" else list(raw_cfg["entry_fields"])
+
+    print(f"Fetching concurrently (max_concurrency={max_concurrency}, max_per_host={max_per_host})")
+
+    feeds = fetch_feeds_concurrently(
+        rss_sources,
+        session,
+        max_concurrency,
+        max_per_host,
+        timeouts,
+        max_items=max_items,
+        stream=stream,
+        stream_stop_after_old=stream_stop_after_old,
+    )
+    for src, feed, err in feeds:
+        if err is not None:
+            print(f"\n--- {src['id']}: ❌ fetch error: {err}")
+            count("errors", source=src["id"])
+            record_failure(conn, src["id"], err, circuit)
+            conn.commit()
+            continue
 
-        max_items = (
-            cfg.get("topics", {})
-            .get(args.topic, {})
-            .get("ingest", {})
-            .get("max_items_per_source")
-            or cfg.get("defaults", {})
-            .get("ingest", {})
-            .get("max_items_per_source")
-            or 50
+        seen, inserted, skipped = ingest_feed(
+            conn,
+            topic=topic,
+            src=src,
+            feed=feed,
+            max_items=max_items,
+            tags=tags_by_id.get(src["id"]),
+            circuit=circuit,
+            raw_fields=raw_fields,
         )
+        seen_total += seen
+        inserted_total += inserted
+        skipped_total += skipped
 
-        tags_by_id = {s["id"]: s.get("tags") for s in yaml_sources if s.get("type") == "rss"}
+    print(f"\n[{topic}] seen: {seen_total} | inserted: {inserted_total} | already known: {skipped_total}")
+    return seen_total, inserted_total, skipped_total
 
-        for src in rss_sources:
-            source_id = src["id"]
-            url = src["url"]
-            tags = tags_by_id.get(source_id)
 
-            last_pub = src.get("last_published_at")
-            threshold = (last_pub - SAFETY_WINDOW) if last_pub else None
+def backfill_feed(
+    conn: psycopg.Connection,
+    topic: str,
+    src: Dict[str, Any],
+    session: requests.Session,
+    timeouts: Timeouts,
+    limiter: HostLimiter,
+    window: Window,
+    bf_cfg: Dict[str, Any],
+    tags: Optional[List[str]],
+    raw_fields: Optional[List[str]],
+) -> Tuple[int, int]:
+    """
+    Recorre las páginas del archivo del feed y guarda las entradas con fecha
+    dentro de la ventana. Devuelve (seen, inserted).
+    """
+    source_id = src["id"]
+    seen_urls: Set[str] = set()
+
+    def load(page: str) -> Any:
+        with source_scope(source_id):
+            return parse_feed(fetch(session, page, timeouts, limiter=limiter))
+
+    def store(page: str, feed: Any) -> PageResult:
+        entries = getattr(feed, "entries", []) or []
+        feed_title = mget(getattr(feed, "feed", None), "title")
+
+        batch: List[Dict[str, Any]] = []
+        new_urls = 0
+        dated: List[datetime] = []
+        for entry in entries:
+            entry_url = safe_get_entry_url(entry)
+            if not entry_url or entry_url in seen_urls:
+                continue
+            seen_urls.add(entry_url)
+            new_urls += 1
+            published_at = safe_get_entry_published(entry)
+            if published_at is None:
+                continue
+            dated.append(published_at)
+            if window.contains(published_at):
+                batch.append(entry_item(topic, source_id, entry, entry_url, src["url"], feed_title, tags, raw_fields))
+
+        inserted = sum(insert_items(conn, batch))
+        # feed vacío, repetido (el sitio ignora el parámetro de página) o ya por debajo de since
+        exhausted = new_urls == 0 or (bool(dated) and max(dated) < window.since)
+        return PageResult(seen=len(entries), inserted=inserted, exhausted=exhausted)
+
+    return run_pages(
+        conn,
+        source_id,
+        window,
+        feed_page_urls(src["url"], bf_cfg),
+        load,
+        store,
+        int(bf_cfg["chunk_pages"]),
+    )
+
+
+def backfill_topic(
+    conn: psycopg.Connection,
+    cfg: Dict[str, Any],
+    topic: str,
+    session: requests.Session,
+    window: Window,
+    only_sources: Optional[List[str]] = None,
+) -> Tuple[int, int]:
+    """
+    Backfill histórico de las fuentes RSS del topic (ver backfill.py).
+    No consulta cadence ni circuito y no toca el estado incremental de `sources`.
+    """
+    yaml_sources = list(iter_topic_sources(cfg, topic))
+    upsert_sources(conn, topic, yaml_sources)
+    conn.commit()
+
+    rss_sources = [s for s in yaml_sources if s.get("type") == "rss"]
+    if only_sources:
+        rss_sources = [s for s in rss_sources if s["id"] in only_sources]
+    if not rss_sources:
+        return 0, 0
+
+    print(f"\n===== Backfill topic: {topic} ({window.since:%Y-%m-%d} .. {window.until:%Y-%m-%d}) =====")
+
+    timeouts = get_timeouts(cfg, topic)
+    limiter = HostLimiter(int(get_ingest_setting(cfg, topic, "max_per_host", 2)))
+    raw_cfg = get_raw_storage_cfg(cfg)
+    raw_fields = None if raw_cfg["mode"] == "full" else list(raw_cfg["entry_fields"])
+
+    seen_total = 0
+    inserted_total = 0
+    for src in scoped_sources(rss_sources):
+        print(f"\n--- Backfill {src['id']}: {src['url']}")
+        seen, inserted = backfill_feed(
+            conn,
+            topic,
+            src,
+            session,
+            timeouts,
+            limiter,
+            window,
+            get_backfill_cfg(cfg, topic, src),
+            src.get("tags"),
+            raw_fields,
+        )
+        seen_total += seen
+        inserted_total += inserted
 
-            headers = {}
-            if src.get("etag"):
-                headers["If-None-Match"] = src["etag"]
-            if src.get("last_modified"):
-                headers["If-Modified-Since"] = src["last_modified"]
+    print(f"\n[{topic}] backfill seen: {seen_total} | inserted: {inserted_total}")
+    return seen_total, inserted_total
 
-            print(f"\n--- Fetching {source_id}: {url}")
-            feed = feedparser.parse(url, request_headers=headers)
 
-            if getattr(feed, "status", None) == 304:
-                print("  304 Not Modified (skip)")
-                update_source_fetch_only(conn, source_id)
-                conn.commit()
-                continue
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--topic",
+        required=True,
+        nargs="+",
+        choices=["plone", "django", "ai", "all"],
+        help="Uno o varios topics, o 'all' para todos los de sources.yaml",
+    )
+    ap.add_argument("--sources", default=os.environ.get("SOURCES_YAML", "sources.yaml"))
+    ap.add_argument("--db", default=os.environ.get("DATABASE_URL"))
+    ap.add_argument("--force", action="store_true", help="Ignora la planificación (cadence) y consulta todas las fuentes")
+    ap.add_argument("--backfill", action="store_true", help="Recorre el archivo paginado de los feeds (ver backfill.py)")
+    ap.add_argument("--since", help="Con --backfill: fecha inicial (YYYY-MM-DD, incluida)")
+    ap.add_argument("--until", help="Con --backfill: fecha final (excluida; defecto hoy 00:00 UTC)")
+    ap.add_argument("--source", nargs="+", default=None, help="Con --backfill: solo estas fuentes (ids)")
+    args = ap.parse_args()
 
-            if getattr(feed, "bozo", False):
-                print(f"  ❌ parse error: {getattr(feed, 'bozo_exception', 'unknown')}")
-                update_source_fetch_only(conn, source_id)
-                conn.commit()
-                continue
+    if not args.db:
+        raise SystemExit("DATABASE_URL not set. Provide --db or set env DATABASE_URL.")
+    if args.backfill and not args.since:
+        raise SystemExit("--backfill needs --since.")
+    window = make_window(args.since, args.until) if args.backfill else None
 
-            entries = getattr(feed, "entries", []) or []
-            print(f"  entries: {len(entries)} (processing up to {max_items})")
-
-            inserted = 0
-            max_published_seen = last_pub
-
-            for entry in entries[: int(max_items)]:
-                seen_total += 1
-
-                entry_url = safe_get_entry_url(entry)
-                if not entry_url:
-                    continue
-
-                canonical = canonicalize_url(entry_url)
-                title = safe_get_entry_title(entry)
-                published_at = safe_get_entry_published(entry)
-
-                if threshold and published_at and published_at <= threshold:
-                    continue
-
-                text = extract_best_text(entry)
-
-                feed_title = None
-                try:
-                    feed_title = mget(getattr(feed, "feed", None), "title")
-                except Exception:
-                    feed_title = None
-
-                raw = {
-                    "feed_url": url,
-                    "feed_title": feed_title,
-                    "entry": to_jsonable(entry),
-                }
-
-                ok = insert_item(
-                    conn=conn,
-                    topic=args.topic,
-                    source_id=source_id,
-                    source_type="rss",
-                    title=title,
-                    url=entry_url,
-                    canonical_url=canonical,
-                    published_at=published_at,
-                    content_text=text,
-                    tags=tags,
-                    raw=raw,
-                )
-
-                if ok:
-                    inserted += 1
-                    inserted_total += 1
-                    if published_at:
-                        if (max_published_seen is None) or (published_at > max_published_seen):
-                            max_published_seen = published_at
-
-            update_source_state(
-                conn,
-                source_id=source_id,
-                last_published_at=max_published_seen,
-                etag=getattr(feed, "etag", None),
-                last_modified=getattr(feed, "modified", None),
-            )
+    cfg = load_sources_yaml(args.sources)
+    topics = resolve_topics(cfg, args.topic)
+
+    print(f"Topics: {', '.join(topics)}")
+    print("Connecting to Postgres...")
+
+    user_agent = cfg.get("defaults", {}).get("ingest", {}).get("user_agent") or "TechWatchBot/1.0"
+    pool_size = max(int(get_ingest_setting(cfg, t, "max_concurrency", 8)) for t in topics) if topics else 1
+
+    stage = "ingest_backfill" if window else "ingest"
+    with pipeline_stage(stage, args.db) as metrics, metrics.connect(args.db) as conn, make_session(
+        user_agent, pool_size
+    ) as session:
+        conn.execute("SET TIME ZONE 'UTC'")
+        ensure_schedule_columns(conn)
+        ensure_health_columns(conn)
+        conn.commit()
+
+        if window:
+            ensure_backfill_table(conn)
             conn.commit()
+            seen_total = 0
+            inserted_total = 0
+            for topic in topics:
+                seen, inserted = backfill_topic(conn, cfg, topic, session, window, args.source)
+                seen_total += seen
+                inserted_total += inserted
+            print("\nDone.")
+            print(f"Backfill seen entries: {seen_total}")
+            print(f"Inserted new items: {inserted_total}")
+            return
+
+        inserted_total = 0
+        seen_total = 0
+        skipped_total = 0
 
-            print(f"  inserted: {inserted} | last_published_at: {max_published_seen}")
+        for topic in topics:
+            seen, inserted, skipped = ingest_topic(conn, cfg, topic, session, force=args.force)
+            seen_total += seen
+            inserted_total += inserted
+            skipped_total += skipped
 
         print("\nDone.")
         print(f"Seen entries: {seen_total}")
+        print(f"Skipped (already known, not serialised): {skipped_total}")
         print(f"Inserted new items: {inserted_total}")
 
 
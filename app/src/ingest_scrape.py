@@ -2,23 +2,45 @@ import argparse
 import hashlib
 import json
 import os
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
 import psycopg
 import requests
 import yaml
 
-from scrape.plone import (
-    discover_plone_news_events,
-    discover_plone_security,
-    extract_plone_article,
+from backfill import (
+    PageResult,
+    Window,
+    ensure_backfill_table,
+    get_backfill_cfg,
+    make_window,
+    offset_page_urls,
+    run_pages,
 )
+from http_cache import HttpCache, get_http_cache_cfg
+from http_fetch import HostLimiter, Timeouts, fetch as http_get, get_timeouts, make_session
+from pipeline_metrics import count, pipeline_stage, scoped_sources, source_scope
+from raw_store import blob_key, ensure_blob_table, get_raw_storage_cfg, store_blobs
+from source_health import (
+    ensure_health_columns,
+    get_circuit_cfg,
+    mark_half_open,
+    record_failure,
+    record_success,
+    split_allowed,
+)
+from source_schedule import split_due
+from scrape.html_backend import resolve_backend
+from scrape.registry import ScrapeParser, get_parser
+from scrape.plone import DiscoveredLink, extract_plone_article
 
 
 DROP_PARAMS_PREFIX = ("utm_",)
 DROP_PARAMS_EXACT = {"ref", "source", "feature"}
+MAX_LINKS_PER_SOURCE = 100  # enlaces procesados por fuente y pasada
 
 
 def utcnow() -> datetime:
@@ -53,6 +75,12 @@ def load_sources_yaml(path: str) -> Dict[str, Any]:
         return yaml.safe_load(f)
 
 
+def resolve_topics(cfg: Dict[str, Any], requested: List[str]) -> List[str]:
+    if "all" in requested:
+        return list((cfg.get("topics") or {}).keys())
+    return list(dict.fromkeys(requested))
+
+
 def iter_topic_sources(cfg: Dict[str, Any], topic: str) -> List[Dict[str, Any]]:
     topic_cfg = cfg.get("topics", {}).get(topic, {})
     return [s for s in (topic_cfg.get("sources", []) or []) if s.get("enabled", True)]
@@ -81,7 +109,8 @@ def load_scrape_sources_from_db(conn: psycopg.Connection, topic: str) -> List[Di
     with conn.cursor() as cur:
         cur.execute(
             """
-            SELECT id, url, name, last_published_at
+            SELECT id, url, name, last_published_at, last_fetched_at, etag, last_modified,
+                   failure_count, circuit_state, next_attempt_at, refresh_checked_at
             FROM sources
             WHERE topic=%s AND source_type='scrape' AND enabled=true
             ORDER BY id
@@ -92,24 +121,55 @@ def load_scrape_sources_from_db(conn: psycopg.Connection, topic: str) -> List[Di
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
-def update_source_fetched(conn: psycopg.Connection, source_id: str) -> None:
+def update_source_fetched(
+    conn: psycopg.Connection,
+    source_id: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    last_published_at: Optional[datetime] = None,
+    clear_validators: bool = False,
+) -> None:
     """
-    Para scrapes sin fecha fiable: NO tocar last_published_at.
+    Para scrapes sin fecha fiable: NO tocar last_published_at (solo se pasa
+    desde fuentes api, con fecha real, y sitemap, donde es el lastmod procesado).
+    etag/last_modified son los del listing (GET condicional en la próxima pasada);
+    clear_validators los borra para que la próxima pasada pida el listing entero.
     """
     with conn.cursor() as cur:
         cur.execute(
             """
             UPDATE sources
             SET last_fetched_at=now(),
+                etag=CASE WHEN %(clear)s THEN NULL ELSE coalesce(%(etag)s, etag) END,
+                last_modified=CASE WHEN %(clear)s THEN NULL ELSE coalesce(%(last_modified)s, last_modified) END,
+                last_published_at=greatest(last_published_at, %(last_published_at)s),
                 updated_at=now()
-            WHERE id=%s
+            WHERE id=%(id)s
             """,
-            (source_id,),
+            dict(
+                clear=clear_validators,
+                etag=etag,
+                last_modified=last_modified,
+                last_published_at=last_published_at,
+                id=source_id,
+            ),
         )
 
 
-def insert_item(
-    conn: psycopg.Connection,
+INSERT_ITEM_SQL = """
+    INSERT INTO items
+      (topic, source_id, source_type, title, url, canonical_url,
+       published_at, fetched_at, content_text, content_hash,
+       status, priority, tags, raw)
+    VALUES
+      (%s, %s, 'scrape', %s, %s, %s,
+       %s, %s, %s, %s,
+       'new', 0, %s, %s::jsonb)
+    ON CONFLICT (topic, url) DO NOTHING
+"""
+
+
+def item_params(
     topic: str,
     source_id: str,
     title: str,
@@ -120,139 +180,990 @@ def insert_item(
     content_text: str,
     tags: Optional[List[str]],
     raw: Dict[str, Any],
-) -> bool:
+) -> tuple:
     content_text = (content_text or "").strip()
     content_hash = sha256_text(content_text) if content_text else None
+    return (
+        topic,
+        source_id,
+        title,
+        url,
+        canonical_url,
+        published_at,
+        fetched_at,
+        content_text if content_text else None,
+        content_hash,
+        tags if tags else None,
+        json.dumps(raw, ensure_ascii=False, default=str),
+    )
+
+
+def insert_item(conn: psycopg.Connection, **item: Any) -> bool:
+    with conn.cursor() as cur:
+        cur.execute(INSERT_ITEM_SQL, item_params(**item))
+        return cur.rowcount == 1
+
 
+def insert_items(conn: psycopg.Connection, items: List[Dict[str, Any]]) -> List[bool]:
+    """
+    Igual que ingest.insert_items: executemany en pipeline mode, un flag por item
+    (True = insertado, False = ya existía).
+    """
+    if not items:
+        return []
+
+    flags: List[bool] = []
+    with conn.cursor() as cur:
+        cur.executemany(
+            INSERT_ITEM_SQL + " RETURNING id",
+            [item_params(**it) for it in items],
+            returning=True,
+        )
+        while True:
+            flags.append(cur.fetchone() is not None)
+            if not cur.nextset():
+                break
+    return flags
+
+
+REFRESH_ITEM_SQL = """
+UPDATE items
+SET published_at = coalesce(%(published_at)s, published_at),
+    title = coalesce(%(title)s, title),
+    raw = coalesce(raw, '{}'::jsonb) || %(raw_patch)s
+WHERE id = %(id)s
+"""
+
+
+DEFAULT_SCRAPE_CFG = {
+    "max_concurrency": 4,        # descargas de artículos en paralelo (por fuente)
+    "max_per_host": 2,
+    "request_delay_seconds": 0.0,
+    "parse_workers": 2,          # procesos para BeautifulSoup; 0 = en el hilo principal
+    "refresh_days": 7,           # artículos ya guardados más jóvenes que esto se revisan
+    "refresh_interval_hours": 24,  # ...como mucho una vez cada tanto
+    "html_parser": "auto",       # lxml | selectolax | html.parser | auto
+    "restapi_max_items": 200,    # tope por fuente plone_restapi y pasada
+}
+
+
+def get_scrape_cfg(cfg: Dict[str, Any], topic: Optional[str] = None) -> Dict[str, Any]:
+    out = dict(DEFAULT_SCRAPE_CFG)
+    out.update(cfg.get("defaults", {}).get("ingest", {}).get("scrape", {}) or {})
+    if topic:
+        out.update(cfg.get("topics", {}).get(topic, {}).get("ingest", {}).get("scrape", {}) or {})
+    return out
+
+
+def load_stored_articles(
+    conn: psycopg.Connection,
+    topic: str,
+    source_id: str,
+    urls: List[str],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Items ya guardados de la fuente entre las URLs descubiertas, indexados
+    tanto por url como por canonical_url. checked_at es la última vez que se
+    descargó la página (inserción o último refresh).
+    """
+    if not urls:
+        return {}
     with conn.cursor() as cur:
         cur.execute(
             """
-            INSERT INTO items
-              (topic, source_id, source_type, title, url, canonical_url,
-               published_at, fetched_at, content_text, content_hash,
-               status, priority, tags, raw)
-            VALUES
-              (%s, %s, 'scrape', %s, %s, %s,
-               %s, %s, %s, %s,
-               'new', 0, %s, %s::jsonb)
-            ON CONFLICT (topic, url) DO NOTHING
+            SELECT id, url, canonical_url, published_at,
+                   coalesce((raw->>'published_at_inferred')::boolean, false) AS inferred,
+                   coalesce((raw->>'refreshed_at')::timestamptz, fetched_at) AS checked_at
+            FROM items
+            WHERE topic=%s AND source_id=%s AND (url = ANY(%s) OR canonical_url = ANY(%s))
             """,
-            (
-                topic,
-                source_id,
-                title,
-                url,
-                canonical_url,
-                published_at,
-                fetched_at,
-                content_text if content_text else None,
-                content_hash,
-                tags if tags else None,
-                json.dumps(raw, ensure_ascii=False, default=str),
-            ),
+            (topic, source_id, urls, urls),
         )
-        return cur.rowcount == 1
+        cols = [d[0] for d in cur.description]
+        stored: Dict[str, Dict[str, Any]] = {}
+        for row in cur.fetchall():
+            item = dict(zip(cols, row))
+            for key in (item["url"], item["canonical_url"]):
+                if key:
+                    stored[key] = item
+    return stored
 
 
-def fetch(url: str, timeout: int = 20, user_agent: str = "TechWatchBot/1.0") -> str:
-    r = requests.get(url, timeout=timeout, headers={"User-Agent": user_agent})
-    r.raise_for_status()
-    return r.text
+def ensure_refresh_schema(conn: psycopg.Connection) -> None:
+    with conn.cursor() as cur:
+        # última vez que se aplicó la política de refresh a la fuente (listing completo o 304)
+        cur.execute("ALTER TABLE sources ADD COLUMN IF NOT EXISTS refresh_checked_at timestamptz")
+        # load_recent_article_links: rango de published_at por fuente, más reciente primero
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS items_source_published_idx ON items (source_id, published_at DESC)"
+        )
 
 
-def main() -> None:
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--topic", required=True, choices=["plone", "django", "ai"])
-    ap.add_argument("--sources", default=os.environ.get("SOURCES_YAML", "sources.yaml"))
-    ap.add_argument("--db", default=os.environ.get("DATABASE_URL"))
-    args = ap.parse_args()
+def mark_refresh_checked(conn: psycopg.Connection, source_id: str) -> None:
+    with conn.cursor() as cur:
+        cur.execute("UPDATE sources SET refresh_checked_at=now() WHERE id=%s", (source_id,))
 
-    if not args.db:
-        raise SystemExit("DATABASE_URL not set. Provide --db or set env DATABASE_URL.")
 
-    cfg = load_sources_yaml(args.sources)
-    yaml_sources = iter_topic_sources(cfg, args.topic)
+def refresh_due(src: Dict[str, Any], now: datetime, refresh_interval_hours: float) -> bool:
+    checked = src.get("refresh_checked_at")
+    return checked is None or checked <= now - timedelta(hours=float(refresh_interval_hours or 0))
 
-    with psycopg.connect(args.db) as conn:
-        conn.execute("SET TIME ZONE 'UTC'")
+
+def load_recent_article_links(
+    conn: psycopg.Connection,
+    topic: str,
+    source_id: str,
+    published_after: datetime,
+    limit: int,
+) -> List[DiscoveredLink]:
+    """
+    Hasta `limit` artículos guardados de la fuente publicados después de
+    published_after, los más recientes primero: candidatos a refresh cuando el
+    listing responde 304 y no hay enlaces descubiertos.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT url, title FROM items
+            WHERE source_id=%s AND published_at > %s AND topic=%s
+            ORDER BY published_at DESC
+            LIMIT %s
+            """,
+            (source_id, published_after, topic, limit),
+        )
+        return [DiscoveredLink(url=url, title=title) for url, title in cur.fetchall()]
+
+
+def plan_article_fetches(
+    links: List[DiscoveredLink],
+    stored: Dict[str, Dict[str, Any]],
+    now: datetime,
+    refresh_days: float,
+    refresh_interval_hours: float,
+) -> Tuple[List[DiscoveredLink], Dict[str, Dict[str, Any]], int]:
+    """
+    Decide qué enlaces descargar antes de hacer ninguna petición:
+      - nuevos (ni url ni canónica en BD) -> se descargan e insertan;
+      - ya guardados, publicados hace menos de refresh_days y sin revisar en
+        refresh_interval_hours, o con lastmod de sitemap posterior a la última
+        descarga -> se descargan para actualizar la fecha;
+      - el resto se salta.
+    Devuelve (a_descargar, refresh por url, saltados).
+    """
+    young_after = now - timedelta(days=float(refresh_days or 0))
+    recheck_before = now - timedelta(hours=float(refresh_interval_hours or 0))
+
+    to_fetch: List[DiscoveredLink] = []
+    refresh: Dict[str, Dict[str, Any]] = {}
+    skipped = 0
+    seen = set()
+    for link in links:
+        canonical = canonicalize_url(link.url)
+        if canonical in seen:
+            continue
+        seen.add(canonical)
+
+        item = stored.get(link.url) or stored.get(canonical)
+        if item is None:
+            to_fetch.append(link)
+            continue
+
+        published = item["published_at"]
+        young = bool(refresh_days) and published is not None and published > young_after
+        stale = item["checked_at"] is None or item["checked_at"] <= recheck_before
+        # el sitemap dice que la página cambió después de la última descarga
+        changed = link.lastmod is not None and item["checked_at"] is not None and link.lastmod > item["checked_at"]
+        if (young and stale) or changed:
+            to_fetch.append(link)
+            refresh[link.url] = item
+        else:
+            skipped += 1
+    return to_fetch, refresh, skipped
+
+
+def refresh_items(conn: psycopg.Connection, rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    with conn.cursor() as cur:
+        cur.executemany(
+            REFRESH_ITEM_SQL,
+            [
+                dict(
+                    id=r["id"],
+                    published_at=r.get("published_at"),
+                    title=r.get("title"),
+                    raw_patch=json.dumps(r["raw_patch"], ensure_ascii=False),
+                )
+                for r in rows
+            ],
+        )
+
+
+def fetch_and_extract_articles(
+    links: List[DiscoveredLink],
+    session: requests.Session,
+    timeouts: Timeouts,
+    limiter: HostLimiter,
+    max_workers: int,
+    parse_pool: Optional[Executor],
+    extract: Callable[..., tuple] = extract_plone_article,
+    html_parser: Optional[str] = None,
+    source_id: Optional[str] = None,
+) -> Iterator[Tuple[DiscoveredLink, Optional[datetime], Optional[str], Optional[tuple], Optional[BaseException]]]:
+    """
+    Descarga los artículos con un pool de hilos (respetando el límite y el
+    delay por host) y pasa el HTML a un pool de procesos para la extracción
+    (`extract` del parser), que es CPU pura. Produce (link, fetched_at, html,
+    (title, published_at, text), error) según van terminando.
+    """
+
+    def download(link: DiscoveredLink) -> Tuple[datetime, str]:
+        with source_scope(source_id):
+            fetched_at = utcnow()
+            return fetched_at, http_get(session, link.url, timeouts, limiter=limiter).text
+
+    pending = {}
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as pool:
+        downloads = {pool.submit(download, link): link for link in links}
+        for fut in as_completed(downloads):
+            link = downloads[fut]
+            try:
+                fetched_at, html = fut.result()
+            except Exception as e:
+                yield link, None, None, None, e
+                continue
+
+            if parse_pool is None:
+                try:
+                    yield link, fetched_at, html, extract(html, link.url, html_parser), None
+                except Exception as e:
+                    yield link, fetched_at, html, None, e
+            else:
+                future = parse_pool.submit(extract, html, link.url, html_parser)
+                pending[future] = (link, fetched_at, html)
+
+    for fut in as_completed(pending):
+        link, fetched_at, html = pending[fut]
+        try:
+            yield link, fetched_at, html, fut.result(), None
+        except Exception as e:
+            yield link, fetched_at, html, None, e
+
+
+def article_item(
+    topic: str,
+    source_id: str,
+    link: DiscoveredLink,
+    fetched_at: datetime,
+    html: str,
+    extracted: tuple,
+    listing_url: str,
+    parser: Optional[str],
+    tags: Optional[List[str]],
+    html_store: str,
+) -> Dict[str, Any]:
+    """Item listo para insert_items a partir de un artículo descargado y extraído."""
+    title, published_at_real, text = extracted
+    raw = {
+        "listing_url": listing_url,
+        "article_url": link.url,
+        "parser": parser,
+        "published_at_inferred": published_at_real is None,
+        "published_at_real": published_at_real.isoformat() if published_at_real else None,
+    }
+    if link.lastmod is not None:
+        raw["sitemap_lastmod"] = link.lastmod.isoformat()
+    if html_store == "inline":
+        raw["html"] = html
+    elif html_store == "table":
+        raw["html_sha256"] = blob_key(html)
+
+    return dict(
+        topic=topic,
+        source_id=source_id,
+        title=title,
+        url=link.url,
+        canonical_url=canonicalize_url(link.url),
+        # Si NO hay published_at real, usa fetched_at para poder hacer ventana semanal.
+        published_at=published_at_real or fetched_at,
+        fetched_at=fetched_at,
+        content_text=text,
+        tags=tags,
+        raw=raw,
+    )
+
+
+def lastmod_watermark(links: List[DiscoveredLink], failed_urls: set) -> Optional[datetime]:
+    """
+    Hasta dónde avanzar last_published_at en fuentes sitemap: el mayor lastmod
+    procesado, pero por debajo del primer artículo que falló para reintentarlo.
+    """
+    ok = [link.lastmod for link in links if link.lastmod and link.url not in failed_urls]
+    failed = [link.lastmod for link in links if link.lastmod and link.url in failed_urls]
+    if not ok:
+        return None
+    mark = max(ok)
+    if failed:
+        mark = min(mark, min(failed) - timedelta(microseconds=1))
+    return mark
+
+
+def scrape_api_source(
+    conn: psycopg.Connection,
+    topic: str,
+    src: Dict[str, Any],
+    scraper: ScrapeParser,
+    session: requests.Session,
+    timeouts: Timeouts,
+    limiter: HostLimiter,
+    scrape_cfg: Dict[str, Any],
+    html_parser: str,
+    circuit: Dict[str, Any],
+    tags: Optional[List[str]],
+) -> int:
+    """
+    Fuente con estrategia "api" (plone_restapi): búsqueda incremental desde
+    last_published_at, sin listing ni una petición por artículo.
+    """
+    source_id = src["id"]
+    since = src.get("last_published_at")
+    try:
+        found = scraper.search(
+            session,
+            src,
+            timeouts,
+            limiter,
+            since=since,
+            max_items=int(scrape_cfg["restapi_max_items"]),
+            html_parser=html_parser,
+        )
+    except Exception as e:
+        print(f"  ❌ {scraper.name} error: {e}")
+        count("errors", source=source_id)
+        record_failure(conn, source_id, e, circuit)
         conn.commit()
+        return 0
+
+    print(f"  {scraper.name} items: {len(found)} (since {since.isoformat() if since else '-'})")
+
+    fetched_at = utcnow()
+    batch: List[Dict[str, Any]] = []
+    for it in found:
+        raw = dict(
+            it.raw,
+            parser=scraper.name,
+            published_at_inferred=it.published_at is None,
+            published_at_real=it.published_at.isoformat() if it.published_at else None,
+        )
+        batch.append(
+            dict(
+                topic=topic,
+                source_id=source_id,
+                title=it.title,
+                url=it.url,
+                canonical_url=canonicalize_url(it.url),
+                published_at=it.published_at or fetched_at,
+                fetched_at=fetched_at,
+                content_text=it.text,
+                tags=tags,
+                raw=raw,
+            )
+        )
+
+    inserted = sum(insert_items(conn, batch))
+    # con since la búsqueda va en ascendente: si se cortó en max_items, el más
+    # reciente de lo recibido es justo hasta donde se ha llegado
+    newest = max((it.published_at for it in found if it.published_at), default=None)
+    update_source_fetched(conn, source_id, last_published_at=newest)
+    record_success(conn, source_id)
+    conn.commit()
+
+    count("rows_read", len(found), source=source_id)
+    count("rows_written", inserted, source=source_id)
+    print(f"  inserted: {inserted}")
+    return inserted
+
 
-        upsert_sources(conn, args.topic, yaml_sources)
+def scrape_topic(
+    conn: psycopg.Connection,
+    cfg: Dict[str, Any],
+    topic: str,
+    session: requests.Session,
+    force: bool = False,
+    parse_pool: Optional[Executor] = None,
+) -> int:
+    yaml_sources = iter_topic_sources(cfg, topic)
+
+    print(f"\n===== Topic: {topic} =====")
+
+    upsert_sources(conn, topic, yaml_sources)
+    conn.commit()
+
+    scrape_sources = load_scrape_sources_from_db(conn, topic)
+    if not scrape_sources:
+        print("No scrape sources enabled.")
+        return 0
+
+    circuit = get_circuit_cfg(cfg)
+    scrape_sources, blocked = split_allowed(scrape_sources, utcnow())
+    for src, next_at in blocked:
+        print(
+            f"  ⛔ {src['id']}: circuit open after {src.get('failure_count')} failures, "
+            f"next attempt {next_at:%Y-%m-%d %H:%M} UTC"
+        )
+
+    if not force:
+        # last_published_at no es fiable en scrapes: solo cuenta la cadence declarada
+        ingest_cfg = dict(cfg.get("defaults", {}).get("ingest", {}) or {})
+        ingest_cfg.update(cfg.get("topics", {}).get(topic, {}).get("ingest", {}) or {})
+        scrape_sources, skipped = split_due(
+            scrape_sources,
+            {s["id"]: s.get("cadence") for s in yaml_sources},
+            default_cadence=ingest_cfg.get("cadence", "daily"),
+            max_poll_interval=ingest_cfg.get("max_poll_interval", "7d"),
+            now=utcnow(),
+            adaptive=False,
+        )
+        for src, next_at in skipped:
+            print(f"  ⏭  {src['id']}: not due until {next_at:%Y-%m-%d %H:%M} UTC")
+
+    mark_half_open(conn, [s["id"] for s in scrape_sources if s.get("circuit_state") == "half_open"])
+    conn.commit()
+
+    timeouts = get_timeouts(cfg, topic)
+    scrape_cfg = get_scrape_cfg(cfg, topic)
+    limiter = HostLimiter(scrape_cfg["max_per_host"], scrape_cfg["request_delay_seconds"])
+    html_parser = resolve_backend(scrape_cfg["html_parser"])
+
+    html_store = get_raw_storage_cfg(cfg)["html_store"]
+    if html_store == "table":
+        ensure_blob_table(conn)
         conn.commit()
 
-        scrape_sources = load_scrape_sources_from_db(conn, args.topic)
-        if not scrape_sources:
-            print("No scrape sources enabled.")
-            return
+    yaml_by_id = {s["id"]: s for s in yaml_sources if s.get("type") == "scrape"}
+    tags_by_id = {sid: s.get("tags") for sid, s in yaml_by_id.items()}
+    parser_by_id = {sid: s.get("parser") for sid, s in yaml_by_id.items()}
 
-        tags_by_id = {s["id"]: s.get("tags") for s in yaml_sources if s.get("type") == "scrape"}
-        parser_by_id = {s["id"]: s.get("parser") for s in yaml_sources if s.get("type") == "scrape"}
+    inserted_total = 0
 
-        inserted_total = 0
+    for src in scoped_sources(scrape_sources):
+        source_id = src["id"]
+        base_url = src["url"]
+        parser = parser_by_id.get(source_id)
+        tags = tags_by_id.get(source_id)
+
+        print(f"\n--- Scraping {source_id}: {base_url} (parser={parser}, html={html_parser})")
 
-        for src in scrape_sources:
-            source_id = src["id"]
-            base_url = src["url"]
-            parser = parser_by_id.get(source_id)
-            tags = tags_by_id.get(source_id)
+        try:
+            scraper = get_parser(parser)
+        except KeyError:
+            print(f"  ❌ unknown parser '{parser}' for source '{source_id}'")
+            continue
 
-            print(f"\n--- Scraping {source_id}: {base_url} (parser={parser})")
+        src_cfg = dict(yaml_by_id.get(source_id, {}), **src)
 
-            listing_html = fetch(base_url)
-            if parser == "plone_news_events":
-                links = discover_plone_news_events(listing_html, base_url)
-            elif parser == "plone_security":
-                links = discover_plone_security(listing_html, base_url)
+        if scraper.strategy == "api":
+            inserted_total += scrape_api_source(
+                conn,
+                topic,
+                src_cfg,
+                scraper,
+                session,
+                timeouts,
+                limiter,
+                scrape_cfg,
+                html_parser,
+                circuit,
+                tags,
+            )
+            continue
+
+        # Un listing/sitemap caído no debe abortar el topic: se apunta el fallo y se sigue
+        listing = None
+        try:
+            if scraper.strategy == "sitemap":
+                links = scraper.discover(session, src_cfg, timeouts, limiter, since=src.get("last_published_at"))
             else:
-                print(f"  ❌ unknown parser '{parser}' for source '{source_id}'")
+                listing = http_get(
+                    session,
+                    base_url,
+                    timeouts,
+                    etag=src.get("etag"),
+                    last_modified=src.get("last_modified"),
+                )
+                if listing.not_modified:
+                    # el listing no cambió, pero los artículos jóvenes pueden haber
+                    # cambiado de fecha: la política de refresh se aplica igual, como
+                    # mucho una vez cada refresh_interval_hours (un 304 sigue siendo barato)
+                    links = []
+                    if scrape_cfg["refresh_days"] and refresh_due(src, utcnow(), scrape_cfg["refresh_interval_hours"]):
+                        young_after = utcnow() - timedelta(days=float(scrape_cfg["refresh_days"]))
+                        links = load_recent_article_links(conn, topic, source_id, young_after, MAX_LINKS_PER_SOURCE)
+                        mark_refresh_checked(conn, source_id)
+                    if not links:
+                        print("  304 Not Modified (skip)")
+                        update_source_fetched(conn, source_id)
+                        record_success(conn, source_id)
+                        conn.commit()
+                        continue
+                    print(f"  304 Not Modified: checking {len(links)} recent articles for refresh")
+                else:
+                    links = scraper.discover(listing.text, base_url, html_parser)
+        except Exception as e:
+            print(f"  ❌ {scraper.strategy} error: {e}")
+            count("errors", source=source_id)
+            record_failure(conn, source_id, e, circuit)
+            conn.commit()
+            continue
+
+        since = src.get("last_published_at")
+        if scraper.strategy == "sitemap" and since is not None:
+            # incremental: de más antiguo a más nuevo, para que la marca de agua
+            # (max lastmod procesado) no salte páginas que quedaron fuera del tope
+            links = sorted(links, key=lambda link: link.lastmod or since)
+        links = links[:MAX_LINKS_PER_SOURCE]
+        stored = load_stored_articles(
+            conn,
+            topic,
+            source_id,
+            list({u for link in links for u in (link.url, canonicalize_url(link.url))}),
+        )
+        to_fetch, refresh, known = plan_article_fetches(
+            links,
+            stored,
+            utcnow(),
+            scrape_cfg["refresh_days"],
+            scrape_cfg["refresh_interval_hours"],
+        )
+        print(
+            f"  discovered links: {len(links)} | new: {len(to_fetch) - len(refresh)} "
+            f"| refresh: {len(refresh)} | already stored: {known}"
+        )
+
+        batch: List[Dict[str, Any]] = []
+        htmls: List[str] = []
+        refreshed: List[Dict[str, Any]] = []
+        dates_changed = 0
+        article_errors = 0
+        failed_urls = set()
+
+        articles = fetch_and_extract_articles(
+            to_fetch,
+            session,
+            timeouts,
+            limiter,
+            scrape_cfg["max_concurrency"],
+            parse_pool,
+            scraper.extract,
+            html_parser,
+            source_id,
+        )
+        for link, fetched_at, html, extracted, err in articles:
+            article_url = link.url
+
+            if err is not None:
+                print(f"  ⚠️ article error {article_url}: {err}")
+                article_errors += 1
+                failed_urls.add(article_url)
                 continue
+            title, published_at_real, text = extracted
 
-            print(f"  discovered links: {len(links)}")
-
-            inserted = 0
-
-            for link in links[:100]:  # cap
-                article_url = link.url
-                canonical = canonicalize_url(article_url)
-
-                fetched_at = utcnow()
-                html = fetch(article_url)
-                title, published_at_real, text = extract_plone_article(html, article_url)
-
-                # Si NO hay published_at real, usa fetched_at para poder hacer ventana semanal.
-                inferred = published_at_real is None
-                published_at = published_at_real or fetched_at
-
-                raw = {
-                    "listing_url": base_url,
-                    "article_url": article_url,
-                    "html": html,
-                    "parser": parser,
-                    "published_at_inferred": inferred,
-                    "published_at_real": published_at_real.isoformat() if published_at_real else None,
-                }
-
-                ok = insert_item(
-                    conn,
-                    topic=args.topic,
-                    source_id=source_id,
-                    title=title,
-                    url=article_url,
-                    canonical_url=canonical,
-                    published_at=published_at,
-                    fetched_at=fetched_at,
-                    content_text=text,
-                    tags=tags,
-                    raw=raw,
+            item = refresh.get(article_url)
+            if item is not None:
+                # Ya guardado: solo se corrige la fecha si la página la cambió
+                # (o si antes era inferida y ahora aparece una real).
+                changed = published_at_real is not None and published_at_real != item["published_at"]
+                patch: Dict[str, Any] = {"refreshed_at": fetched_at.isoformat()}
+                if changed:
+                    dates_changed += 1
+                    patch.update(
+                        published_at_inferred=False,
+                        published_at_real=published_at_real.isoformat(),
+                    )
+                refreshed.append(
+                    dict(
+                        id=item["id"],
+                        published_at=published_at_real if changed else None,
+                        title=title if changed else None,
+                        raw_patch=patch,
+                    )
                 )
-                if ok:
-                    inserted += 1
-                    inserted_total += 1
+                continue
 
-            update_source_fetched(conn, source_id)
-            conn.commit()
+            htmls.append(html)
+            batch.append(
+                article_item(topic, source_id, link, fetched_at, html, extracted, base_url, parser, tags, html_store)
+            )
+
+        flags = insert_items(conn, batch)
+        inserted = sum(flags)
+        inserted_total += inserted
+
+        if html_store == "table":
+            # HTML comprimido fuera de items, solo para los items realmente nuevos
+            store_blobs(conn, [html for html, ok in zip(htmls, flags) if ok])
+
+        refresh_items(conn, refreshed)
+
+        if listing is not None:
+            mark_refresh_checked(conn, source_id)  # plan_article_fetches ya revisó los jóvenes
+            # con artículos fallidos no se guardan los validadores: un 304 en la
+            # próxima pasada saltaría la fuente y no se reintentarían
+            update_source_fetched(
+                conn, source_id, listing.etag, listing.last_modified, clear_validators=bool(failed_urls)
+            )
+        else:
+            update_source_fetched(conn, source_id, last_published_at=lastmod_watermark(links, failed_urls))
+        if to_fetch and article_errors == len(to_fetch):
+            # el listing respondió pero no se pudo bajar ni un artículo: el host está fallando
+            record_failure(conn, source_id, f"all {article_errors} article fetches failed", circuit)
+        else:
+            record_success(conn, source_id)
+        conn.commit()
+
+        count("rows_read", len(links), source=source_id)
+        count("rows_written", inserted + len(refreshed), source=source_id)
+        count("errors", article_errors, source=source_id)
+        print(
+            f"  inserted: {inserted} | refreshed: {len(refreshed)} (dates changed: {dates_changed}) "
+            f"| article errors: {article_errors} "
+            "| note: published_at may be inferred from fetched_at"
+        )
+
+    return inserted_total
+
+
+def backfill_articles(
+    conn: psycopg.Connection,
+    topic: str,
+    source_id: str,
+    links: List[DiscoveredLink],
+    listing_url: str,
+    parser: Optional[str],
+    scraper: ScrapeParser,
+    session: requests.Session,
+    timeouts: Timeouts,
+    limiter: HostLimiter,
+    scrape_cfg: Dict[str, Any],
+    html_parser: str,
+    parse_pool: Optional[Executor],
+    window: Window,
+    tags: Optional[List[str]],
+    html_store: str,
+) -> Tuple[PageResult, List[datetime]]:
+    """
+    Descarga los artículos aún no guardados de un bloque de enlaces y guarda
+    los que tienen fecha real dentro de la ventana. Devuelve el resultado de
+    la página y las fechas vistas (para saber si ya se pasó de since).
+    """
+    stored = load_stored_articles(
+        conn,
+        topic,
+        source_id,
+        list({u for link in links for u in (link.url, canonicalize_url(link.url))}),
+    )
+    to_fetch = [link for link in links if link.url not in stored and canonicalize_url(link.url) not in stored]
+
+    batch: List[Dict[str, Any]] = []
+    htmls: List[str] = []
+    dates: List[datetime] = [it["published_at"] for it in stored.values() if it["published_at"] and not it["inferred"]]
+    errors = 0
+    undated = 0
+    articles = fetch_and_extract_articles(
+        to_fetch,
+        session,
+        timeouts,
+        limiter,
+        scrape_cfg["max_concurrency"],
+        parse_pool,
+        scraper.extract,
+        html_parser,
+        source_id,
+    )
+    for link, fetched_at, html, extracted, err in articles:
+        if err is not None:
+            print(f"  ⚠️ article error {link.url}: {err}")
+            errors += 1
+            continue
+        published_at_real = extracted[1]
+        if published_at_real is None:
+            # sin fecha real no se puede colocar en el histórico (fetched_at la metería en esta semana)
+            undated += 1
+            continue
+        dates.append(published_at_real)
+        if window.contains(published_at_real):
+            htmls.append(html)
+            batch.append(
+                article_item(topic, source_id, link, fetched_at, html, extracted, listing_url, parser, tags, html_store)
+            )
+
+    flags = insert_items(conn, batch)
+    if html_store == "table":
+        store_blobs(conn, [html for html, ok in zip(htmls, flags) if ok])
+
+    count("errors", errors, source=source_id)
+    if undated:
+        print(f"  {undated} articles without a real date skipped")
+    return PageResult(seen=len(links), inserted=sum(flags), retry=errors > 0), dates
 
-            print(f"  inserted: {inserted} | note: published_at may be inferred from fetched_at")
+
+def sitemap_block_key(links: List[DiscoveredLink]) -> str:
+    """Checkpoint de un bloque de sitemap: hash de sus URLs y lastmod."""
+    h = hashlib.sha1()
+    for link in links:
+        h.update(f"{link.url} {link.lastmod.isoformat() if link.lastmod else ''}\n".encode("utf-8"))
+    return f"sitemap:{h.hexdigest()[:16]}"
+
+
+def backfill_scrape_source(
+    conn: psycopg.Connection,
+    topic: str,
+    src: Dict[str, Any],
+    scraper: ScrapeParser,
+    session: requests.Session,
+    timeouts: Timeouts,
+    limiter: HostLimiter,
+    scrape_cfg: Dict[str, Any],
+    html_parser: str,
+    parse_pool: Optional[Executor],
+    window: Window,
+    bf_cfg: Dict[str, Any],
+    tags: Optional[List[str]],
+    html_store: str,
+) -> Tuple[int, int]:
+    """
+    Backfill de una fuente scrape según la estrategia de su parser
+    (ver backfill.py). Devuelve (seen, inserted).
+    """
+    source_id = src["id"]
+    base_url = src["url"]
+    parser = src.get("parser")
+    b_size = int(bf_cfg["b_size"])
+    max_pages = int(bf_cfg["max_pages"])
+    chunk_pages = int(bf_cfg["chunk_pages"])
+
+    def articles(links: List[DiscoveredLink]) -> Tuple[PageResult, List[datetime]]:
+        return backfill_articles(
+            conn,
+            topic,
+            source_id,
+            links,
+            base_url,
+            parser,
+            scraper,
+            session,
+            timeouts,
+            limiter,
+            scrape_cfg,
+            html_parser,
+            parse_pool,
+            window,
+            tags,
+            html_store,
+        )
+
+    if scraper.strategy == "api":
+        if scraper.pages is None or scraper.load_page is None:
+            print(f"  ❌ parser '{scraper.name}' has no backfill support")
+            return 0, 0
+        fetched_at = utcnow()
+
+        def load_api(page: str) -> Any:
+            with source_scope(source_id):
+                return scraper.load_page(session, page, timeouts, limiter, html_parser)
+
+        def store_api(page: str, data: Any) -> PageResult:
+            found, has_next = data
+            batch = []
+            for it in found:
+                if not window.contains(it.published_at):
+                    continue
+                batch.append(
+                    dict(
+                        topic=topic,
+                        source_id=source_id,
+                        title=it.title,
+                        url=it.url,
+                        canonical_url=canonicalize_url(it.url),
+                        published_at=it.published_at,
+                        fetched_at=fetched_at,
+                        content_text=it.text,
+                        tags=tags,
+                        raw=dict(
+                            it.raw,
+                            parser=scraper.name,
+                            published_at_inferred=False,
+                            published_at_real=it.published_at.isoformat(),
+                        ),
+                    )
+                )
+            return PageResult(seen=len(found), inserted=sum(insert_items(conn, batch)), exhausted=not found or not has_next)
+
+        pages = scraper.pages(src, window.since, window.until, b_size, max_pages)
+        return run_pages(conn, source_id, window, pages, load_api, store_api, chunk_pages)
+
+    if scraper.strategy == "sitemap":
+        try:
+            links = scraper.discover(session, src, timeouts, limiter, since=window.since)
+        except Exception as e:
+            print(f"  ❌ sitemap error: {e}")
+            count("errors", source=source_id)
+            return 0, 0
+        # lastmod es la última modificación: lo que cambió después de until aún puede ser antiguo.
+        # Orden por URL (no por lastmod, que cambia entre ejecuciones) y checkpoint por
+        # contenido del bloque: si al retomar un enlace cambió de lastmod o los bloques
+        # se desplazaron, su bloque tiene otra clave y se procesa en vez de darse por hecho.
+        links.sort(key=lambda link: link.url)
+        blocks = {sitemap_block_key(links[i : i + b_size]): links[i : i + b_size] for i in range(0, len(links), b_size)}
+        print(f"  sitemap links since {window.since:%Y-%m-%d}: {len(links)} ({len(blocks)} blocks)")
+
+        def store_block(page: str, block: List[DiscoveredLink]) -> PageResult:
+            return articles(block)[0]
+
+        return run_pages(conn, source_id, window, list(blocks), blocks.get, store_block, 1, complete_on_end=True)
+
+    seen_links = set()
+
+    def load_listing(page: str) -> List[DiscoveredLink]:
+        with source_scope(source_id):
+            return scraper.discover(http_get(session, page, timeouts, limiter=limiter).text, base_url, html_parser)
+
+    def store_listing(page: str, links: List[DiscoveredLink]) -> PageResult:
+        # la navegación sale en todas las páginas: solo cuentan los enlaces nuevos
+        new = [link for link in links if link.url not in seen_links]
+        seen_links.update(link.url for link in links)
+        if not new:
+            return PageResult(seen=len(links), exhausted=True)
+        res, dates = articles(new)
+        res.exhausted = bool(dates) and max(dates) < window.since
+        return res
+
+    pages = offset_page_urls(base_url, "b_start:int", b_size, max_pages)
+    return run_pages(conn, source_id, window, pages, load_listing, store_listing, chunk_pages)
+
+
+def backfill_scrape_topic(
+    conn: psycopg.Connection,
+    cfg: Dict[str, Any],
+    topic: str,
+    session: requests.Session,
+    window: Window,
+    parse_pool: Optional[Executor] = None,
+    only_sources: Optional[List[str]] = None,
+) -> int:
+    """
+    Backfill histórico de las fuentes scrape del topic. No consulta cadence ni
+    circuito y no toca last_published_at / etag / last_modified.
+    """
+    yaml_sources = iter_topic_sources(cfg, topic)
+    upsert_sources(conn, topic, yaml_sources)
+    conn.commit()
+
+    scrape_sources = [s for s in yaml_sources if s.get("type") == "scrape"]
+    if only_sources:
+        scrape_sources = [s for s in scrape_sources if s["id"] in only_sources]
+    if not scrape_sources:
+        return 0
+
+    print(f"\n===== Backfill topic: {topic} ({window.since:%Y-%m-%d} .. {window.until:%Y-%m-%d}) =====")
+
+    timeouts = get_timeouts(cfg, topic)
+    scrape_cfg = get_scrape_cfg(cfg, topic)
+    limiter = HostLimiter(scrape_cfg["max_per_host"], scrape_cfg["request_delay_seconds"])
+    html_parser = resolve_backend(scrape_cfg["html_parser"])
+    html_store = get_raw_storage_cfg(cfg)["html_store"]
+    if html_store == "table":
+        ensure_blob_table(conn)
+        conn.commit()
+
+    inserted_total = 0
+    for src in scoped_sources(scrape_sources):
+        print(f"\n--- Backfill {src['id']}: {src['url']} (parser={src.get('parser')})")
+        try:
+            scraper = get_parser(src.get("parser"))
+        except KeyError:
+            print(f"  ❌ unknown parser '{src.get('parser')}' for source '{src['id']}'")
+            continue
+        _seen, inserted = backfill_scrape_source(
+            conn,
+            topic,
+            src,
+            scraper,
+            session,
+            timeouts,
+            limiter,
+            scrape_cfg,
+            html_parser,
+            parse_pool,
+            window,
+            get_backfill_cfg(cfg, topic, src),
+            src.get("tags"),
+            html_store,
+        )
+        inserted_total += inserted
+
+    return inserted_total
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--topic",
+        required=True,
+        nargs="+",
+        choices=["plone", "django", "ai", "all"],
+        help="Uno o varios topics, o 'all' para todos los de sources.yaml",
+    )
+    ap.add_argument("--sources", default=os.environ.get("SOURCES_YAML", "sources.yaml"))
+    ap.add_argument("--db", default=os.environ.get("DATABASE_URL"))
+    ap.add_argument("--force", action="store_true", help="Ignora la planificación (cadence) y scrapea todas las fuentes")
+    ap.add_argument("--backfill", action="store_true", help="Recorre el archivo de las fuentes (ver backfill.py)")
+    ap.add_argument("--since", help="Con --backfill: fecha inicial (YYYY-MM-DD, incluida)")
+    ap.add_argument("--until", help="Con --backfill: fecha final (excluida; defecto hoy 00:00 UTC)")
+    ap.add_argument("--source", nargs="+", default=None, help="Con --backfill: solo estas fuentes (ids)")
+    args = ap.parse_args()
+
+    if not args.db:
+        raise SystemExit("DATABASE_URL not set. Provide --db or set env DATABASE_URL.")
+    if args.backfill and not args.since:
+        raise SystemExit("--backfill needs --since.")
+    window = make_window(args.since, args.until) if args.backfill else None
+
+    cfg = load_sources_yaml(args.sources)
+    topics = resolve_topics(cfg, args.topic)
+    user_agent = cfg.get("defaults", {}).get("ingest", {}).get("user_agent") or "TechWatchBot/1.0"
+
+    scrape_cfg = get_scrape_cfg(cfg)
+    parse_workers = int(scrape_cfg["parse_workers"] or 0)
+    parse_pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+    pool_size = max(int(scrape_cfg["max_concurrency"]), 1)
+
+    # listings, sitemaps y artículos revisados se revalidan contra la caché en disco
+    http_cache = HttpCache.from_cfg(cfg)
+
+    stage = "ingest_scrape_backfill" if window else "ingest_scrape"
+    with pipeline_stage(stage, args.db) as metrics, metrics.connect(args.db) as conn, make_session(
+        user_agent, pool_size, http_cache
+    ) as session:
+        conn.execute("SET TIME ZONE 'UTC'")
+        ensure_health_columns(conn)
+        ensure_refresh_schema(conn)
+        if window:
+            ensure_backfill_table(conn)
+        conn.commit()
+
+        inserted_total = 0
+        try:
+            for topic in topics:
+                if window:
+                    inserted_total += backfill_scrape_topic(conn, cfg, topic, session, window, parse_pool, args.source)
+                else:
+                    inserted_total += scrape_topic(conn, cfg, topic, session, force=args.force, parse_pool=parse_pool)
+        finally:
+            if parse_pool is not None:
+                parse_pool.shutdown()
+            if http_cache is not None:
+                http_cache.prune(get_http_cache_cfg(cfg)["prune_days"])
 
         print("\nDone.")
         print(f"Inserted new items: {inserted_total}")
@@ -0,0 +1,162 @@
+"""
+Keywords TF-IDF por topic para enrich.py.
+
+La frecuencia bruta dentro de un item premia lo que sale en todos
+("https", "class", "plone.org"...). Aquí cada término se pondera con su
+frecuencia de documento en el topic, guardada en `keyword_df` y
+`keyword_corpus` y actualizada de forma incremental con cada lote
+enriquecido (en la misma transacción que pasa los items a 'ready', así que
+reintentar un lote no cuenta dos veces).
+
+Por lote y topic:
+  - tokenize() de cada documento (CPU pura: enrich.py la reparte en el pool);
+  - matriz dispersa documentos x términos (scipy.sparse.csr_matrix);
+  - df del lote = nº de filas con el término; se suma al df guardado;
+  - score = (1 + log tf) * idf, idf = log((1 + N) / (1 + df)) + 1;
+  - top-k por fila sobre los datos de la fila en la CSR, sin dicts por item.
+"""
+import re
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import psycopg
+from scipy.sparse import csr_matrix
+
+
+STOPWORDS = {
+    "the","a","an","and","or","to","of","in","on","for","with","by","from","at","as","is","are","was","were",
+    "this","that","these","those","it","its","be","can","may","will","we","you","they","their","our","your",
+    "new","release","released","version",
+    "has","have","had","not","but","all","also","more","about","into","than","then","there","which","who",
+    "what","when","how","would","should","could","been","out","one","two","use","using","used","via",
+}
+
+# restos de marcado que llegan en content_text de los feeds
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+HTML_ENTITY_RE = re.compile(r"&#?\w+;")
+URL_RE = re.compile(r"\b(?:https?://|www\.)\S+", re.I)
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9\.\-_]{2,}")
+
+
+def tokenize(text: str) -> List[str]:
+    text = URL_RE.sub(" ", HTML_ENTITY_RE.sub(" ", HTML_TAG_RE.sub(" ", text or ""))).lower()
+    out = []
+    for w in TOKEN_RE.findall(text):
+        w = w.strip(".-_")
+        if len(w) < 3 or w in STOPWORDS or w.replace(".", "").isdigit():
+            continue
+        out.append(w)
+    return out
+
+
+def ensure_keyword_tables(conn: psycopg.Connection) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS keyword_df (
+              topic text NOT NULL,
+              term text NOT NULL,
+              df integer NOT NULL,
+              PRIMARY KEY (topic, term)
+            )
+            """
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS keyword_corpus (
+              topic text PRIMARY KEY,
+              n_docs bigint NOT NULL DEFAULT 0
+            )
+            """
+        )
+
+
+def count_matrix(docs: Sequence[Sequence[str]]) -> Tuple[csr_matrix, List[str]]:
+    """(matriz CSR documentos x términos con tf, vocabulario del lote)."""
+    vocab: Dict[str, int] = {}
+    indices: List[int] = []
+    indptr = [0]
+    for tokens in docs:
+        for w in tokens:
+            indices.append(vocab.setdefault(w, len(vocab)))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float64)
+    m = csr_matrix((data, np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+                   shape=(len(docs), len(vocab)))
+    m.sum_duplicates()  # tokens repetidos en un documento -> tf
+    terms = [""] * len(vocab)
+    for w, j in vocab.items():
+        terms[j] = w
+    return m, terms
+
+
+def update_document_frequencies(
+    conn: psycopg.Connection,
+    topic: str,
+    terms: List[str],
+    batch_df: np.ndarray,
+    n_docs: int,
+) -> Tuple[np.ndarray, int]:
+    """
+    Suma el df del lote al guardado (un INSERT ... ON CONFLICT con unnest) y
+    devuelve (df total por término del lote, N total de documentos del topic).
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO keyword_df AS k (topic, term, df)
+            SELECT %s, t.term, t.df FROM unnest(%s::text[], %s::int[]) AS t(term, df)
+            ON CONFLICT (topic, term) DO UPDATE SET df = k.df + EXCLUDED.df
+            RETURNING term, df
+            """,
+            (topic, terms, [int(x) for x in batch_df]),
+        )
+        df_by_term = dict(cur.fetchall())
+        cur.execute(
+            """
+            INSERT INTO keyword_corpus AS c (topic, n_docs) VALUES (%s, %s)
+            ON CONFLICT (topic) DO UPDATE SET n_docs = c.n_docs + EXCLUDED.n_docs
+            RETURNING n_docs
+            """,
+            (topic, n_docs),
+        )
+        total_docs = int(cur.fetchone()[0])
+    return np.array([df_by_term[t] for t in terms], dtype=np.float64), total_docs
+
+
+def top_keywords_batch(
+    conn: psycopg.Connection,
+    topic: str,
+    docs: Sequence[Sequence[str]],
+    k: int = 8,
+) -> List[List[str]]:
+    """
+    Top-k términos TF-IDF de cada documento (lista de tokens) del lote,
+    actualizando de paso la frecuencia de documento del topic.
+    """
+    if not docs:
+        return []
+    tf, terms = count_matrix(docs)
+    if not terms:
+        return [[] for _ in docs]
+
+    batch_df = np.diff(tf.tocsc().indptr)  # filas con cada término (tf ya sin duplicados)
+    df, n_docs = update_document_frequencies(conn, topic, terms, batch_df, len(docs))
+    idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+
+    scores = tf.copy()
+    scores.data = (1.0 + np.log(scores.data)) * idf[scores.indices]
+
+    out: List[List[str]] = []
+    for i in range(scores.shape[0]):
+        start, end = scores.indptr[i], scores.indptr[i + 1]
+        row_scores = scores.data[start:end]
+        row_terms = scores.indices[start:end]
+        if len(row_scores) > k:
+            top = np.argpartition(-row_scores, k)[:k]
+        else:
+            top = np.arange(len(row_scores))
+        # desempate estable por término para que el resultado no dependa del orden del lote
+        top = sorted(top, key=lambda j: (-row_scores[j], terms[row_terms[j]]))
+        out.append([terms[row_terms[j]] for j in top])
+    return out
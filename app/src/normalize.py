@@ -0,0 +1,212 @@
+"""
+Normalización HTML -> texto limpio, una vez por contenido.
+
+content_text llega de los feeds como HTML y enrich, embed y evaluate_llm
+trabajaban sobre ese marcado. Esta etapa (entre la ingesta y enrich) saca el
+texto principal con trafilatura (o, si no encuentra cuerpo en un fragmento
+corto, el texto plano del HTML) y lo guarda en el item:
+
+  items.clean_text    texto principal
+  items.clean_chars   caracteres
+  items.clean_tokens  palabras y signos (aprox. de tokens para el prompt del LLM)
+
+La caché es `content_clean`, por content_hash: un contenido idéntico (reenvíos,
+el mismo post en dos feeds, backfills repetidos) nunca se reprocesa, se copia
+con un UPDATE ... FROM. Cada entrada lleva la NORMALIZE_VERSION con la que se
+generó; al cambiar la extracción se sube la versión y las entradas anteriores
+(y el clean_text que se copió de ellas) se descartan y se recalculan.
+
+    python app/src/normalize.py        # NORMALIZE_BATCH (500), NORMALIZE_WORKERS (CPUs)
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import psycopg
+
+from pipeline_metrics import count, pipeline_stage
+from scrape.html_backend import fragment_text, resolve_backend
+
+
+# 2: el texto de lxml ya no parte las palabras en cada entidad
+NORMALIZE_VERSION = 2
+
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+MARKUP_RE = re.compile(r"<[a-zA-Z/!]")
+
+
+def ensure_clean_columns(conn: psycopg.Connection) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            ALTER TABLE items
+              ADD COLUMN IF NOT EXISTS clean_text text,
+              ADD COLUMN IF NOT EXISTS clean_chars integer,
+              ADD COLUMN IF NOT EXISTS clean_tokens integer
+            """
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS content_clean (
+              content_hash text PRIMARY KEY,
+              clean_text text NOT NULL,
+              clean_chars integer NOT NULL,
+              clean_tokens integer NOT NULL,
+              version integer NOT NULL DEFAULT 1,
+              created_at timestamptz NOT NULL DEFAULT now()
+            )
+            """
+        )
+        # tablas creadas antes de versionar: sus entradas cuentan como versión 1
+        cur.execute("ALTER TABLE content_clean ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 1")
+
+
+def invalidate_stale(conn: psycopg.Connection, version: int = NORMALIZE_VERSION) -> int:
+    """
+    Descarta las entradas de content_clean de versiones anteriores y vacía el
+    clean_text de sus items para que se vuelvan a normalizar. Devuelve los items afectados.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE items AS i
+            SET clean_text = NULL, clean_chars = NULL, clean_tokens = NULL
+            FROM content_clean AS c
+            WHERE i.content_hash = c.content_hash AND c.version < %s AND i.clean_text IS NOT NULL
+            """,
+            (version,),
+        )
+        affected = cur.rowcount
+        cur.execute("DELETE FROM content_clean WHERE version < %s", (version,))
+    return affected
+
+
+def clean_html(html: str, backend: Optional[str] = None) -> str:
+    """Texto principal; trafilatura para documentos, texto plano para fragmentos y texto sin marcado."""
+    html = html or ""
+    if not MARKUP_RE.search(html):
+        return re.sub(r"\s+", " ", html).strip()
+
+    import trafilatura
+
+    text = trafilatura.extract(html, include_comments=False, include_tables=True, favor_recall=True)
+    if not text:
+        # trafilatura descarta fragmentos cortos (resumen de un feed) por no tener "cuerpo"
+        text = fragment_text(html, backend)
+    return text.strip()
+
+
+def normalize_one(args: Tuple[str, str, Optional[str]]) -> Tuple[str, str, int, int]:
+    """(content_hash, texto, chars, tokens) — CPU pura, se ejecuta en el pool."""
+    content_hash, html, backend = args
+    try:
+        text = clean_html(html, backend)
+    except Exception:
+        # un HTML que rompe el extractor no debe bloquear la cola en cada pasada
+        text = re.sub(r"\s+", " ", re.sub(r"<[^>]+>", " ", html or "")).strip()
+    return content_hash, text, len(text), len(TOKEN_RE.findall(text))
+
+
+def apply_cached(conn: psycopg.Connection, hashes: Optional[List[str]] = None) -> int:
+    """
+    Copia a los items pendientes el texto ya normalizado de su content_hash
+    (todos, o solo los de `hashes` tras procesar un lote).
+    """
+    query = """
+        UPDATE items AS i
+        SET clean_text = c.clean_text,
+            clean_chars = c.clean_chars,
+            clean_tokens = c.clean_tokens
+        FROM content_clean AS c
+        WHERE i.clean_text IS NULL AND i.content_hash = c.content_hash
+    """
+    params: List[object] = []
+    if hashes is not None:
+        query += " AND c.content_hash = ANY(%s)"
+        params.append(hashes)
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+        return cur.rowcount
+
+
+def load_pending(conn: psycopg.Connection, limit: int) -> List[Tuple[str, str]]:
+    """(content_hash, content_text) distintos de items sin normalizar."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT DISTINCT ON (i.content_hash) i.content_hash, i.content_text
+            FROM items AS i
+            WHERE i.clean_text IS NULL AND i.content_hash IS NOT NULL AND i.content_text IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM content_clean c WHERE c.content_hash = i.content_hash)
+            ORDER BY i.content_hash
+            LIMIT %s
+            """,
+            (limit,),
+        )
+        return cur.fetchall()
+
+
+def store_clean(conn: psycopg.Connection, rows: List[Tuple[str, str, int, int]]) -> None:
+    if not rows:
+        return
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO content_clean (content_hash, clean_text, clean_chars, clean_tokens, version)
+            SELECT t.*, %s FROM unnest(%s::text[], %s::text[], %s::int[], %s::int[]) AS t
+            ON CONFLICT (content_hash) DO NOTHING
+            """,
+            (NORMALIZE_VERSION, *(list(col) for col in zip(*rows))),
+        )
+
+
+def main() -> None:
+    db = os.environ.get("DATABASE_URL")
+    if not db:
+        raise SystemExit("DATABASE_URL not set")
+
+    batch_size = max(1, int(os.environ.get("NORMALIZE_BATCH", "500")))
+    workers = int(os.environ.get("NORMALIZE_WORKERS") or (os.cpu_count() or 1))
+    backend = resolve_backend()  # SCRAPE_HTML_PARSER o el primero instalado
+
+    with pipeline_stage("normalize", db) as metrics, metrics.connect(db) as conn:
+        ensure_clean_columns(conn)
+        conn.commit()
+
+        stale = invalidate_stale(conn)
+        conn.commit()
+        if stale:
+            print(f"Invalidated clean_text of {stale} items cached by an older normalizer")
+
+        reused = apply_cached(conn)
+        conn.commit()
+
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        processed = 0
+        updated = reused
+        try:
+            while True:
+                pending = load_pending(conn, batch_size)
+                if not pending:
+                    break
+                args = [(h, html, backend) for h, html in pending]
+                if pool is None:
+                    cleaned = [normalize_one(a) for a in args]
+                else:
+                    cleaned = list(pool.map(normalize_one, args, chunksize=max(1, len(args) // (workers * 4))))
+                store_clean(conn, cleaned)
+                updated += apply_cached(conn, [c[0] for c in cleaned])
+                conn.commit()
+                processed += len(cleaned)
+                count("rows_read", len(pending))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        count("rows_written", updated)
+        print(f"Normalized contents: {processed} | items updated: {updated} (reused from cache: {reused})")
+
+
+if __name__ == "__main__":
+    main()
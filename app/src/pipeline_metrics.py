@@ -0,0 +1,321 @@
+"""
+Instrumentación común de las etapas del pipeline (ingest, ingest_scrape,
+enrich, embed, evaluate_llm, select_week, generate_pdf).
+
+Cada script envuelve su trabajo en `with pipeline_stage("<etapa>") as metrics:`
+y al terminar se guarda una fila por etapa (source_id = '') y otra por
+fuente en `pipeline_stage_metrics`, colgando de `pipeline_runs`:
+
+  wall_seconds, rows_read, rows_written, http_requests, http_bytes,
+  http_cache_hits, db_roundtrips, llm_calls, llm_tokens_in, llm_tokens_out, errors
+
+- Round-trips a BD: conexiones abiertas con metrics.connect(), que usan
+  CountingConnection / CountingCursor (execute, executemany y commit).
+- HTTP: observador de http_fetch.fetch; la fuente sale de source_scope(),
+  que es por hilo (sirve dentro de los ThreadPool de descarga).
+- LLM y filas: count("llm_calls"), count("rows_written", n, source=...).
+
+PIPELINE_RUN_ID agrupa las etapas de una ejecución de run_pipeline.sh; sin
+él cada etapa crea su propio run. Con METRICS_TEXTFILE_DIR se escribe además
+techwatch_<etapa>.prom para el textfile collector de node_exporter.
+Un fallo al guardar métricas nunca tumba la etapa.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import psycopg
+
+
+COUNTERS = (
+    "rows_read",
+    "rows_written",
+    "http_requests",
+    "http_bytes",
+    "http_cache_hits",
+    "db_roundtrips",
+    "llm_calls",
+    "llm_tokens_in",
+    "llm_tokens_out",
+    "errors",
+)
+
+_current: Optional["StageMetrics"] = None
+_scope = threading.local()
+
+
+class StageMetrics:
+    def __init__(self, stage: str, run_id: Optional[str] = None):
+        self.stage = stage
+        self.run_id = run_id or os.environ.get("PIPELINE_RUN_ID") or uuid.uuid4().hex
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self.wall_seconds = 0.0
+        self.status = "running"
+        self.extra: Dict[str, Any] = {}
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._by_source: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        self._source_seconds: Dict[str, float] = defaultdict(float)
+
+    def add(self, name: str, n: int = 1, source: Optional[str] = None) -> None:
+        if name not in COUNTERS:
+            raise KeyError(f"unknown metric '{name}'")
+        source = source if source is not None else current_source()
+        with self._lock:
+            self._by_source[source or ""][name] += int(n)
+
+    def add_seconds(self, source: str, seconds: float) -> None:
+        with self._lock:
+            self._source_seconds[source] += seconds
+
+    def totals(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict.fromkeys(COUNTERS, 0)
+            for counters in self._by_source.values():
+                for k, v in counters.items():
+                    out[k] += v
+            return out
+
+    def connect(self, conninfo: str, **kwargs: Any) -> psycopg.Connection:
+        return CountingConnection.connect(conninfo, cursor_factory=CountingCursor, **kwargs)
+
+    def finish(self, status: str) -> None:
+        self.status = status
+        self.finished_at = datetime.now(timezone.utc)
+        self.wall_seconds = time.perf_counter() - self._t0
+
+
+class CountingCursor(psycopg.Cursor):
+    def execute(self, *args: Any, **kwargs: Any):
+        count("db_roundtrips")
+        return super().execute(*args, **kwargs)
+
+    def executemany(self, *args: Any, **kwargs: Any):
+        # en pipeline mode es un único round-trip
+        count("db_roundtrips")
+        return super().executemany(*args, **kwargs)
+
+
+class CountingConnection(psycopg.Connection):
+    def commit(self) -> None:
+        count("db_roundtrips")
+        super().commit()
+
+
+def count(name: str, n: int = 1, source: Optional[str] = None) -> None:
+    """Suma a la etapa activa; fuera de pipeline_stage no hace nada."""
+    if _current is not None:
+        _current.add(name, n, source)
+
+
+def current_source() -> Optional[str]:
+    return getattr(_scope, "source", None)
+
+
+@contextmanager
+def source_scope(source_id: Optional[str]) -> Iterator[None]:
+    """Atribuye a source_id lo que se cuente en este hilo, y el tiempo que pase dentro."""
+    prev = getattr(_scope, "source", None)
+    _scope.source = source_id
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _scope.source = prev
+        metrics = _current
+        if metrics is not None and source_id:
+            metrics.add_seconds(source_id, time.perf_counter() - t0)
+
+
+def scoped_sources(sources: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """for src in scoped_sources(...): cada vuelta del bucle cuenta para src["id"]."""
+    for src in sources:
+        with source_scope(src["id"]):
+            yield src
+
+
+def observe_fetch(url: str, status: int, network_bytes: int, requested: bool, from_cache: bool) -> None:
+    """
+    Observador de http_fetch. requested=False: servido de caché sin red;
+    from_cache con requested: revalidado con 304, el cuerpo salió de disco.
+    """
+    if from_cache:
+        count("http_cache_hits")
+    if requested:
+        count("http_requests")
+        count("http_bytes", network_bytes)
+
+
+def ensure_metrics_tables(conn: psycopg.Connection) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pipeline_runs (
+              id text PRIMARY KEY,
+              started_at timestamptz NOT NULL DEFAULT now(),
+              finished_at timestamptz,
+              status text NOT NULL DEFAULT 'running',
+              host text
+            )
+            """
+        )
+        cur.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS pipeline_stage_metrics (
+              id bigserial PRIMARY KEY,
+              run_id text NOT NULL REFERENCES pipeline_runs(id) ON DELETE CASCADE,
+              stage text NOT NULL,
+              source_id text NOT NULL DEFAULT '',
+              started_at timestamptz NOT NULL,
+              finished_at timestamptz NOT NULL,
+              wall_seconds double precision NOT NULL,
+              status text NOT NULL,
+              {", ".join(f"{c} bigint NOT NULL DEFAULT 0" for c in COUNTERS)},
+              extra jsonb
+            )
+            """
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS pipeline_stage_metrics_stage_idx "
+            "ON pipeline_stage_metrics (stage, started_at)"
+        )
+
+
+def save_metrics(conninfo: str, metrics: StageMetrics) -> None:
+    # Conexión propia y sin contar: la de la etapa puede estar en una transacción abortada
+    with psycopg.connect(conninfo) as conn:
+        ensure_metrics_tables(conn)
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO pipeline_runs (id, started_at, finished_at, status, host)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (id) DO UPDATE SET
+                  started_at = least(pipeline_runs.started_at, EXCLUDED.started_at),
+                  finished_at = greatest(pipeline_runs.finished_at, EXCLUDED.finished_at),
+                  status = CASE WHEN pipeline_runs.status = 'error' THEN 'error' ELSE EXCLUDED.status END
+                """,
+                (metrics.run_id, metrics.started_at, metrics.finished_at, metrics.status, socket.gethostname()),
+            )
+
+            rows = []
+            totals = metrics.totals()
+            rows.append(("", metrics.wall_seconds, totals, metrics.extra or None))
+            for source, counters in sorted(metrics._by_source.items()):
+                if source:
+                    rows.append((source, metrics._source_seconds.get(source, 0.0), counters, None))
+
+            cols = ", ".join(COUNTERS)
+            placeholders = ", ".join(["%s"] * len(COUNTERS))
+            cur.executemany(
+                f"""
+                INSERT INTO pipeline_stage_metrics
+                  (run_id, stage, source_id, started_at, finished_at, wall_seconds, status, {cols}, extra)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, {placeholders}, %s::jsonb)
+                """,
+                [
+                    (
+                        metrics.run_id,
+                        metrics.stage,
+                        source,
+                        metrics.started_at,
+                        metrics.finished_at,
+                        wall,
+                        metrics.status,
+                        *[counters[c] for c in COUNTERS],
+                        json.dumps(extra, default=str) if extra else None,
+                    )
+                    for source, wall, counters, extra in rows
+                ],
+            )
+        conn.commit()
+
+
+def write_textfile(directory: str, metrics: StageMetrics) -> str:
+    """techwatch_<etapa>.prom (escritura atómica) para node_exporter --collector.textfile."""
+    lines = [
+        "# HELP techwatch_stage_wall_seconds Wall time of the last run of a pipeline stage.",
+        "# TYPE techwatch_stage_wall_seconds gauge",
+        f'techwatch_stage_wall_seconds{{stage="{metrics.stage}"}} {metrics.wall_seconds:.3f}',
+        "# HELP techwatch_stage_last_run_timestamp_seconds Finish time of the last run of a stage.",
+        "# TYPE techwatch_stage_last_run_timestamp_seconds gauge",
+        f'techwatch_stage_last_run_timestamp_seconds{{stage="{metrics.stage}"}} '
+        f"{(metrics.finished_at or metrics.started_at).timestamp():.0f}",
+        "# HELP techwatch_stage_success Whether the last run of the stage finished without error.",
+        "# TYPE techwatch_stage_success gauge",
+        f'techwatch_stage_success{{stage="{metrics.stage}"}} {int(metrics.status == "ok")}',
+    ]
+    totals = metrics.totals()
+    for name in COUNTERS:
+        lines.append(f"# TYPE techwatch_stage_{name} gauge")
+        lines.append(f'techwatch_stage_{name}{{stage="{metrics.stage}"}} {totals[name]}')
+    for source, counters in sorted(metrics._by_source.items()):
+        if not source:
+            continue
+        for name in ("http_requests", "http_bytes", "rows_written", "errors"):
+            lines.append(f'techwatch_source_{name}{{stage="{metrics.stage}",source="{source}"}} {counters[name]}')
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"techwatch_{metrics.stage}.prom")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, path)
+    return path
+
+
+@contextmanager
+def pipeline_stage(stage: str, conninfo: Optional[str] = None) -> Iterator[StageMetrics]:
+    """
+    Mide la etapa y guarda sus métricas al salir (también si falla).
+    conninfo por defecto: DATABASE_URL.
+    """
+    global _current
+    from http_fetch import add_fetch_observer, remove_fetch_observer
+
+    metrics = StageMetrics(stage)
+    _current = metrics
+    add_fetch_observer(observe_fetch)
+    status = "ok"
+    try:
+        yield metrics
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            status = "error"
+            metrics.add("errors", source="")
+        raise
+    except BaseException:
+        status = "error"
+        metrics.add("errors", source="")
+        raise
+    finally:
+        remove_fetch_observer(observe_fetch)
+        _current = None
+        metrics.finish(status)
+
+        conninfo = conninfo or os.environ.get("DATABASE_URL")
+        try:
+            if conninfo:
+                save_metrics(conninfo, metrics)
+            textfile_dir = os.environ.get("METRICS_TEXTFILE_DIR")
+            if textfile_dir:
+                write_textfile(textfile_dir, metrics)
+        except Exception as e:
+            print(f"⚠️ could not save pipeline metrics: {e}")
+
+        t = metrics.totals()
+        print(
+            f"[metrics] {stage}: {metrics.wall_seconds:.1f}s status={status} "
+            f"rows r/w={t['rows_read']}/{t['rows_written']} http={t['http_requests']} "
+            f"({t['http_bytes'] / 1024:.0f} KiB, cache hits {t['http_cache_hits']}) "
+            f"db_rt={t['db_roundtrips']} llm={t['llm_calls']} "
+            f"tokens={t['llm_tokens_in']}/{t['llm_tokens_out']} errors={t['errors']}"
+        )
@@ -0,0 +1,188 @@
+"""
+Reglas de prioridad de enrich.py declaradas en sources.yaml.
+
+    defaults:
+      priority:
+        base: 40
+        rules:
+          - name: security
+            keywords: ["cve-\\d{4}-\\d+", "security", "vulnerab\\w*"]   # regex entre \\b...\\b, sin mayúsculas
+            tags: ["security", "cve"]        # tags del item
+            score: 100                       # prioridad fija (gana la mayor)
+          - name: official
+            authority: ["official"]          # `authority` de la fuente en sources.yaml
+            sources: ["django_releases"]     # ids de fuente
+            weight: 20                       # se suma a base
+    topics:
+      django:
+        priority:
+          rules:
+            - name: release                  # mismo nombre: sustituye a la de defaults
+              ...
+            - name: official
+              enabled: false                 # la quita para este topic
+
+Una regla se cumple si se cumple cualquiera de sus condiciones. Prioridad =
+la mayor `score` de las reglas cumplidas si alguna la tiene; si no,
+base + suma de `weight`, limitada a 0..100.
+
+Al arrancar, las keywords de todas las reglas de un topic se compilan en una
+única regex de alternativas con un grupo por keyword distinta; cada documento
+se recorre una sola vez (y se corta en cuanto todas las reglas con keywords
+ya se han cumplido), así que añadir reglas no multiplica los escaneos.
+Si dos keywords casan en la misma posición cuenta la declarada antes
+(p. ej. "secur\\w*" en una regla tapa "security" en otra).
+Tags, authority y fuentes se comprueban con operaciones de conjuntos.
+"""
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set
+
+import yaml
+
+
+# Mismas puntuaciones que el antiguo compute_priority salvo "vulnerab\w*": la regex
+# anterior exigía la palabra exacta "vulnerab", así que "vulnerability" no contaba
+# como seguridad; esos items pasan ahora a prioridad 100.
+DEFAULT_PRIORITY: Dict[str, Any] = {
+    "base": 40,
+    "rules": [
+        {
+            "name": "security",
+            "keywords": [r"cve-\d{4}-\d+", "security", r"vulnerab\w*", "hotfix", "patch"],
+            "tags": ["security", "cve"],
+            "score": 100,
+        },
+        {"name": "official", "authority": ["official"], "tags": ["official"], "weight": 20},
+        {
+            "name": "release",
+            "keywords": ["release", "released", "version", "tag", "changelog"],
+            "tags": ["release"],
+            "weight": 15,
+        },
+    ],
+}
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    weight: int = 0
+    score: Optional[int] = None
+    tags: FrozenSet[str] = frozenset()
+    authority: FrozenSet[str] = frozenset()
+    sources: FrozenSet[str] = frozenset()
+    has_keywords: bool = False
+
+
+def _as_set(value: Any) -> FrozenSet[str]:
+    if value is None:
+        return frozenset()
+    if isinstance(value, str):
+        return frozenset([value.lower()])
+    return frozenset(str(v).lower() for v in value)
+
+
+def merge_rules(base: List[Dict[str, Any]], override: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Reglas de defaults con las del topic encima (por `name`); enabled: false la quita."""
+    merged: Dict[str, Dict[str, Any]] = {r["name"]: r for r in base}
+    for r in override:
+        merged[r["name"]] = r
+    return [r for r in merged.values() if r.get("enabled", True)]
+
+
+def get_priority_cfg(cfg: Dict[str, Any], topic: Optional[str] = None) -> Dict[str, Any]:
+    defaults = cfg.get("defaults", {}).get("priority") or DEFAULT_PRIORITY
+    out = {"base": defaults.get("base", DEFAULT_PRIORITY["base"]), "rules": list(defaults.get("rules") or [])}
+    if topic:
+        topic_cfg = cfg.get("topics", {}).get(topic, {}).get("priority") or {}
+        if topic_cfg.get("base") is not None:
+            out["base"] = topic_cfg["base"]
+        out["rules"] = merge_rules(out["rules"], topic_cfg.get("rules") or [])
+    else:
+        out["rules"] = merge_rules(out["rules"], [])
+    return out
+
+
+class TopicRules:
+    def __init__(self, base: int, rules: List[Dict[str, Any]], authority_by_source: Dict[str, str]):
+        self.base = int(base)
+        self.authority_by_source = authority_by_source
+        self.rules: List[Rule] = []
+
+        rules_by_keyword: Dict[str, List[int]] = {}
+        for i, spec in enumerate(rules):
+            keywords = [str(k) for k in spec.get("keywords") or []]
+            self.rules.append(
+                Rule(
+                    name=spec["name"],
+                    weight=int(spec.get("weight") or 0),
+                    score=int(spec["score"]) if spec.get("score") is not None else None,
+                    tags=_as_set(spec.get("tags")),
+                    authority=_as_set(spec.get("authority")),
+                    sources=frozenset(spec.get("sources") or []),
+                    has_keywords=bool(keywords),
+                )
+            )
+            for kw in keywords:
+                rules_by_keyword.setdefault(kw, []).append(i)
+
+        self._keyword_rules = frozenset(i for i, r in enumerate(self.rules) if r.has_keywords)
+        self._rules_by_group: Dict[str, List[int]] = {}
+        parts = []
+        for n, (kw, idxs) in enumerate(rules_by_keyword.items()):
+            group = f"k{n}"
+            re.compile(kw)  # error claro con la keyword que falla, no con la regex combinada
+            parts.append(rf"(?P<{group}>\b(?:{kw})\b)")
+            self._rules_by_group[group] = idxs
+        self._regex = re.compile("|".join(parts), re.I) if parts else None
+
+    def matched(self, source_id: str, text: str, tags: Iterable[str]) -> Set[int]:
+        tag_set = {t.lower() for t in tags or []}
+        authority = (self.authority_by_source.get(source_id) or "").lower()
+        hits = {
+            i
+            for i, r in enumerate(self.rules)
+            if (r.tags & tag_set) or (authority and authority in r.authority) or source_id in r.sources
+        }
+
+        pending = self._keyword_rules - hits
+        if pending and self._regex is not None:
+            for m in self._regex.finditer(text or ""):
+                hits.update(self._rules_by_group[m.lastgroup])
+                if pending <= hits:
+                    break
+        return hits
+
+    def score(self, source_id: str, text: str, tags: Iterable[str]) -> int:
+        hits = [self.rules[i] for i in self.matched(source_id, text, tags)]
+        fixed = [r.score for r in hits if r.score is not None]
+        if fixed:
+            return max(fixed)
+        return max(0, min(100, self.base + sum(r.weight for r in hits)))
+
+
+class PriorityRules:
+    """Reglas compiladas de todos los topics (los topics sin entrada usan defaults)."""
+
+    def __init__(self, cfg: Dict[str, Any]):
+        authority_by_source: Dict[str, str] = {}
+        for topic_cfg in (cfg.get("topics") or {}).values():
+            for src in topic_cfg.get("sources") or []:
+                if src.get("authority"):
+                    authority_by_source[src["id"]] = str(src["authority"])
+
+        default = get_priority_cfg(cfg)
+        self.default = TopicRules(default["base"], default["rules"], authority_by_source)
+        self.topics: Dict[str, TopicRules] = {}
+        for topic in cfg.get("topics") or {}:
+            topic_cfg = get_priority_cfg(cfg, topic)
+            self.topics[topic] = TopicRules(topic_cfg["base"], topic_cfg["rules"], authority_by_source)
+
+    @classmethod
+    def from_yaml(cls, path: str) -> "PriorityRules":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(yaml.safe_load(f) or {})
+
+    def score(self, topic: str, source_id: str, text: str, tags: Iterable[str]) -> int:
+        return self.topics.get(topic, self.default).score(source_id, text, tags)
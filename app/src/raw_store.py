@@ -0,0 +1,107 @@
+"""
+Almacenamiento de payloads crudos (items.raw).
+
+- Feeds: en modo "compact" solo se guarda una whitelist de campos de la entrada
+  (el FeedParserDict completo duplica summary_detail/title_detail, links, etc.).
+- HTML de scrapes: se guarda comprimido fuera de `items`, en `raw_blobs`,
+  direccionado por sha256. En items.raw solo queda la referencia `html_sha256`.
+
+Así la tabla caliente `items` se mantiene estrecha y los SELECT de enrich,
+evaluate_llm y select_week no arrastran TOAST.
+"""
+import hashlib
+import zlib
+from typing import Any, Dict, List, Optional
+
+import psycopg
+
+
+DEFAULT_ENTRY_FIELDS = ["id", "link", "title", "author", "published", "updated", "tags"]
+
+DEFAULT_RAW_STORAGE = {
+    "mode": "compact",      # "compact" | "full" (payload completo, comportamiento antiguo)
+    "entry_fields": DEFAULT_ENTRY_FIELDS,
+    "html_store": "table",  # "table" (raw_blobs) | "inline" (raw["html"]) | "none"
+}
+
+
+def get_raw_storage_cfg(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    user = cfg.get("defaults", {}).get("processing", {}).get("raw_storage", {}) or {}
+    out = dict(DEFAULT_RAW_STORAGE)
+    out.update({k: v for k, v in user.items() if v is not None})
+    return out
+
+
+def ensure_blob_table(conn: psycopg.Connection) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS raw_blobs (
+              sha256      text PRIMARY KEY,
+              encoding    text NOT NULL DEFAULT 'zlib',
+              size_bytes  integer NOT NULL,
+              data        bytea NOT NULL,
+              created_at  timestamptz NOT NULL DEFAULT now()
+            )
+            """
+        )
+        # ya va comprimido con zlib: que Postgres no intente pglz otra vez
+        cur.execute("ALTER TABLE raw_blobs ALTER COLUMN data SET STORAGE EXTERNAL")
+
+
+def blob_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
+
+
+def store_blobs(conn: psycopg.Connection, texts: List[str]) -> List[str]:
+    """
+    Guarda textos comprimidos (idempotente: mismo contenido, misma clave).
+    Devuelve las claves sha256 en el mismo orden.
+    """
+    keys = [blob_key(t) for t in texts]
+    rows = {}
+    for key, text in zip(keys, texts):
+        if key not in rows:
+            data = text.encode("utf-8", errors="ignore")
+            rows[key] = (key, len(data), zlib.compress(data, 6))
+
+    if rows:
+        with conn.cursor() as cur:
+            cur.executemany(
+                """
+                INSERT INTO raw_blobs (sha256, encoding, size_bytes, data)
+                VALUES (%s, 'zlib', %s, %s)
+                ON CONFLICT (sha256) DO NOTHING
+                """,
+                list(rows.values()),
+            )
+    return keys
+
+
+def load_blob(conn: psycopg.Connection, key: str) -> Optional[str]:
+    with conn.cursor() as cur:
+        cur.execute("SELECT encoding, data FROM raw_blobs WHERE sha256=%s", (key,))
+        row = cur.fetchone()
+    if not row:
+        return None
+    return decode_blob(*row)
+
+
+def decode_blob(encoding: Optional[str], data: Any) -> str:
+    data = bytes(data)
+    if encoding == "zlib":
+        data = zlib.decompress(data)
+    return data.decode("utf-8", errors="replace")
+
+
+def resolve_html(conn: psycopg.Connection, raw: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    HTML de un item scrapeado, esté inline (items antiguos) o en raw_blobs.
+    """
+    if not raw:
+        return None
+    if raw.get("html"):
+        return raw["html"]
+    if raw.get("html_sha256"):
+        return load_blob(conn, raw["html_sha256"])
+    return None
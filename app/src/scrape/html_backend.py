@@ -0,0 +1,358 @@
+"""
+Backends de parseo HTML para scrape/plone.py.
+
+BeautifulSoup("html.parser") construye un árbol completo en Python y luego
+extract_plone_article lo recorría varias veces. Aquí se recoge todo lo que
+hace falta de un artículo (h1, <title>, fechas candidatas y texto del
+contenedor principal) en una sola pasada:
+
+  - lxml:       parser libxml2 en modo "target": eventos start/end/data, sin árbol
+                (ya viene como dependencia de trafilatura).
+  - selectolax: árbol en C (Lexbor), consultas CSS baratas; opcional.
+  - html.parser: el parser de la stdlib con el mismo colector por eventos
+                 (fallback siempre disponible, sin bs4).
+
+El backend se elige con `html_parser` en la config de scrape; si es "auto"
+(o no se indica) manda la variable de entorno SCRAPE_HTML_PARSER, y sin ella
+se usa el primero instalado en el orden de BACKENDS (medido con
+app/bench/bench_plone_parsers.py).
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as _SelectolaxParser
+except ImportError:
+    _SelectolaxParser = None
+
+try:
+    from lxml import etree as _lxml_etree
+except ImportError:
+    _lxml_etree = None
+
+
+BACKENDS = ("lxml", "selectolax", "html.parser")
+
+# Mismo orden de preferencia que los selectores de _extract_from_meta
+META_DATE_KEYS: List[Tuple[str, str]] = [
+    ("property", "article:published_time"),
+    ("property", "article:modified_time"),
+    ("property", "og:updated_time"),
+    ("name", "DC.date"),
+    ("name", "dc.date"),
+    ("name", "DC.created"),
+    ("name", "dc.created"),
+    ("name", "created"),
+    ("name", "modified"),
+]
+
+SKIP_TAGS = {"script", "style", "noscript"}
+# lxml entrega el texto en trozos (se corta en cada entidad: "Caf", "é"), así que
+# los trozos se unen sin separador y el espacio solo se añade al abrir o cerrar
+# un elemento de bloque
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "figcaption", "figure",
+    "footer", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre",
+    "section", "table", "td", "th", "tr", "ul",
+}
+CONTAINERS = ("main", "article", "body")
+
+
+@dataclass
+class ArticleScan:
+    h1: Optional[str] = None
+    title: Optional[str] = None
+    time_datetime: Optional[str] = None
+    metas: Dict[Tuple[str, str], str] = field(default_factory=dict)
+    jsonld: List[str] = field(default_factory=list)
+    text: str = ""  # texto de main / article / body, sin script/style/noscript
+
+
+def _clean_text(s: str) -> str:
+    return re.sub(r"\s+", " ", (s or "").strip())
+
+
+def available_backends() -> List[str]:
+    out = []
+    if _lxml_etree is not None:
+        out.append("lxml")
+    if _SelectolaxParser is not None:
+        out.append("selectolax")
+    out.append("html.parser")
+    return out
+
+
+_WARNED_MISSING = set()
+
+
+def resolve_backend(name: Optional[str] = None) -> str:
+    name = (name or "auto").strip().lower()
+    if name == "auto":
+        name = (os.environ.get("SCRAPE_HTML_PARSER") or "auto").strip().lower()
+    available = available_backends()
+    if name == "auto":
+        return available[0]
+    if name not in BACKENDS:
+        raise ValueError(f"unknown html parser backend '{name}' (expected one of {', '.join(BACKENDS)} or auto)")
+    if name not in available:
+        # se resuelve en cada scan_article/scan_links: un aviso por proceso basta
+        if name not in _WARNED_MISSING:
+            _WARNED_MISSING.add(name)
+            print(f"  ⚠️ html parser '{name}' not installed, using {available[0]}")
+        return available[0]
+    return name
+
+
+class _ArticleCollector:
+    """
+    Colector por eventos (start/end/data), compartido por html.parser y el
+    modo target de lxml. Solo mira la primera aparición de cada cosa, igual
+    que los select_one de la versión con BeautifulSoup.
+    """
+
+    def __init__(self):
+        self.scan = ArticleScan()
+        self._skip = 0
+        self._jsonld: Optional[List[str]] = None
+        self._h1: Optional[List[str]] = None
+        self._h1_depth = 0
+        self._title: Optional[List[str]] = None
+        # por contenedor: profundidad abierta (0 = fuera) y si ya se cerró
+        self._depth = {c: 0 for c in CONTAINERS}
+        self._done = {c: False for c in CONTAINERS}
+        self._text = {c: [] for c in CONTAINERS}
+
+    def start(self, tag: str, attrs: Dict[str, Optional[str]]) -> None:
+        tag = tag.lower()
+        if tag in BLOCK_TAGS:
+            self._text_break()
+        if tag in self._depth and not self._done[tag]:
+            self._depth[tag] += 1
+
+        if tag == "script" and (attrs.get("type") or "").strip().lower() == "application/ld+json":
+            self._jsonld = []
+        if tag in SKIP_TAGS:
+            self._skip += 1
+            return
+
+        if tag == "meta":
+            content = attrs.get("content")
+            if content is not None:
+                for attr in ("property", "name"):
+                    key = (attr, attrs.get(attr) or "")
+                    if key[1] and key not in self.scan.metas:
+                        self.scan.metas[key] = content
+        elif tag == "time":
+            if self.scan.time_datetime is None and attrs.get("datetime") is not None:
+                self.scan.time_datetime = attrs["datetime"]
+        elif tag == "h1":
+            if self.scan.h1 is None:
+                if self._h1 is None:
+                    self._h1 = []
+                self._h1_depth += 1
+        elif tag == "title":
+            if self.scan.title is None and self._title is None:
+                self._title = []
+
+    def end(self, tag: str) -> None:
+        tag = tag.lower()
+        if tag in BLOCK_TAGS:
+            self._text_break()
+        if tag in SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+            if tag == "script" and self._jsonld is not None:
+                self.scan.jsonld.append("".join(self._jsonld))
+                self._jsonld = None
+        elif tag == "h1" and self._h1 is not None and self.scan.h1 is None:
+            self._h1_depth -= 1
+            if self._h1_depth <= 0:
+                self.scan.h1 = _clean_text("".join(self._h1))
+        elif tag == "title" and self._title is not None and self.scan.title is None:
+            self.scan.title = _clean_text("".join(self._title))
+
+        if tag in self._depth and self._depth[tag] > 0:
+            self._depth[tag] -= 1
+            if self._depth[tag] == 0:
+                self._done[tag] = True
+
+    def data(self, text: str) -> None:
+        if self._jsonld is not None:
+            self._jsonld.append(text)
+        if self._skip:
+            return
+        self._append(text)
+
+    def _text_break(self) -> None:
+        if not self._skip:
+            self._append(" ")
+
+    def _append(self, text: str) -> None:
+        if self._title is not None and self.scan.title is None:
+            self._title.append(text)
+        if self._h1 is not None and self.scan.h1 is None:
+            self._h1.append(text)
+        for c in CONTAINERS:
+            if self._depth[c] > 0:
+                self._text[c].append(text)
+
+    def close(self) -> ArticleScan:
+        if self.scan.h1 is None and self._h1:
+            self.scan.h1 = _clean_text("".join(self._h1))
+        if self.scan.title is None and self._title:
+            self.scan.title = _clean_text("".join(self._title))
+        for c in CONTAINERS:
+            if self._done[c] or self._depth[c] > 0:
+                self.scan.text = _clean_text("".join(self._text[c]))
+                break
+        return self.scan
+
+
+class _StdlibFeeder(HTMLParser):
+    def __init__(self, target: _ArticleCollector):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
+        self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+def _scan_stdlib(html: str) -> ArticleScan:
+    collector = _ArticleCollector()
+    feeder = _StdlibFeeder(collector)
+    feeder.feed(html)
+    feeder.close()
+    return collector.close()
+
+
+def _scan_lxml(html: str) -> ArticleScan:
+    collector = _ArticleCollector()
+    if not html.strip():
+        return collector.close()
+    parser = _lxml_etree.HTMLParser(target=collector)
+    parser.feed(html)
+    return parser.close()
+
+
+def _scan_selectolax(html: str) -> ArticleScan:
+    tree = _SelectolaxParser(html)
+    scan = ArticleScan()
+
+    h1 = tree.css_first("h1")
+    if h1 is not None:
+        scan.h1 = _clean_text(h1.text(separator=" ", strip=True))
+    title = tree.css_first("title")
+    if title is not None:
+        scan.title = _clean_text(title.text(separator=" ", strip=True))
+    time_el = tree.css_first("time[datetime]")
+    if time_el is not None:
+        scan.time_datetime = time_el.attributes.get("datetime")
+
+    for meta in tree.css("meta[content]"):
+        attrs = meta.attributes
+        for attr in ("property", "name"):
+            key = (attr, attrs.get(attr) or "")
+            if key[1] and key not in scan.metas:
+                scan.metas[key] = attrs.get("content") or ""
+
+    for sc in tree.css('script[type="application/ld+json"]'):
+        scan.jsonld.append(sc.text())
+
+    container = tree.css_first("main")
+    if container is None:
+        container = tree.css_first("article")
+    if container is None:
+        container = tree.body
+    if container is not None:
+        for bad in container.css("script, style, noscript"):
+            bad.decompose()
+        scan.text = _clean_text(container.text(separator=" ", strip=True))
+    return scan
+
+
+_SCANNERS = {
+    "selectolax": _scan_selectolax,
+    "lxml": _scan_lxml,
+    "html.parser": _scan_stdlib,
+}
+
+
+def scan_article(html: str, backend: Optional[str] = None) -> ArticleScan:
+    return _SCANNERS[resolve_backend(backend)](html or "")
+
+
+def fragment_text(html: str, backend: Optional[str] = None) -> str:
+    """Texto limpio de un fragmento HTML (p.ej. el campo `text` de plone.restapi)."""
+    return scan_article(f"<body>{html or ''}</body>", backend).text
+
+
+class _LinkCollector:
+    def __init__(self):
+        self.links: List[Tuple[str, str]] = []
+        self._open: Optional[Tuple[str, List[str]]] = None
+
+    def start(self, tag: str, attrs: Dict[str, Optional[str]]) -> None:
+        tag = tag.lower()
+        if tag == "a" and attrs.get("href") is not None:
+            self._flush()
+            self._open = (attrs["href"], [])
+        elif tag in BLOCK_TAGS:
+            self.data(" ")
+
+    def end(self, tag: str) -> None:
+        tag = tag.lower()
+        if tag == "a":
+            self._flush()
+        elif tag in BLOCK_TAGS:
+            self.data(" ")
+
+    def data(self, text: str) -> None:
+        if self._open is not None:
+            self._open[1].append(text)
+
+    def _flush(self) -> None:
+        if self._open is not None:
+            href, parts = self._open
+            self.links.append((href, _clean_text("".join(parts))))
+            self._open = None
+
+    def close(self) -> List[Tuple[str, str]]:
+        self._flush()
+        return self.links
+
+
+def scan_links(html: str, backend: Optional[str] = None) -> List[Tuple[str, str]]:
+    """(href, texto) de cada <a href> en orden de documento."""
+    backend = resolve_backend(backend)
+    html = html or ""
+    if backend == "selectolax":
+        tree = _SelectolaxParser(html)
+        return [
+            (a.attributes.get("href") or "", _clean_text(a.text(separator=" ", strip=True)))
+            for a in tree.css("a[href]")
+        ]
+
+    collector = _LinkCollector()
+    if backend == "lxml":
+        if not html.strip():
+            return []
+        parser = _lxml_etree.HTMLParser(target=collector)
+        parser.feed(html)
+        return parser.close()
+
+    feeder = _StdlibFeeder(collector)
+    feeder.feed(html)
+    feeder.close()
+    return collector.close()
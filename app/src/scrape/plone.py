@@ -2,17 +2,20 @@ import re
 import json
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import List, Optional, Tuple, Any
+from typing import Any, Iterable, List, Optional, Tuple
 from urllib.parse import urljoin
 
 import bs4  # beautifulsoup4
 
+from .html_backend import META_DATE_KEYS, ArticleScan, scan_article, scan_links
+
 
 @dataclass
 class DiscoveredLink:
     url: str
     title: Optional[str] = None
     published_at: Optional[datetime] = None
+    lastmod: Optional[datetime] = None  # sitemap <lastmod>, si se descubrió por sitemap
 
 
 def _clean_text(s: str) -> str:
@@ -52,8 +55,11 @@ def _extract_from_jsonld(soup: bs4.BeautifulSoup) -> Optional[datetime]:
     Plone suele incluir schema.org JSON-LD en muchas páginas.
     """
     scripts = soup.select('script[type="application/ld+json"]')
-    for sc in scripts:
-        raw = sc.string or sc.get_text() or ""
+    return _date_from_jsonld_strings(sc.string or sc.get_text() or "" for sc in scripts)
+
+
+def _date_from_jsonld_strings(raws: Iterable[str]) -> Optional[datetime]:
+    for raw in raws:
         raw = raw.strip()
         if not raw:
             continue
@@ -109,17 +115,7 @@ def _extract_from_meta(soup: bs4.BeautifulSoup) -> Optional[datetime]:
     - DC.date / DC.created
     - og:updated_time
     """
-    selectors = [
-        'meta[property="article:published_time"][content]',
-        'meta[property="article:modified_time"][content]',
-        'meta[property="og:updated_time"][content]',
-        'meta[name="DC.date"][content]',
-        'meta[name="dc.date"][content]',
-        'meta[name="DC.created"][content]',
-        'meta[name="dc.created"][content]',
-        'meta[name="created"][content]',
-        'meta[name="modified"][content]',
-    ]
+    selectors = [f'meta[{attr}="{value}"][content]' for attr, value in META_DATE_KEYS]
     for sel in selectors:
         meta = soup.select_one(sel)
         if meta:
@@ -150,8 +146,10 @@ def _extract_from_visible_text(soup: bs4.BeautifulSoup) -> Optional[datetime]:
     for bad in container.select("script, style, noscript"):
         bad.decompose()
 
-    txt = _clean_text(container.get_text(" ", strip=True))
+    return _date_from_text(_clean_text(container.get_text(" ", strip=True)))
+
 
+def _date_from_text(txt: str) -> Optional[datetime]:
     # ISO date visible
     m = re.search(r"\b(\d{4})-(\d{2})-(\d{2})\b", txt)
     if m:
@@ -186,12 +184,27 @@ def _extract_published_at(soup: bs4.BeautifulSoup) -> Optional[datetime]:
     )
 
 
-def discover_plone_news_events(listing_html: str, base_url: str) -> List[DiscoveredLink]:
-    soup = bs4.BeautifulSoup(listing_html, "html.parser")
+def _published_at_from_scan(scan: ArticleScan) -> Optional[datetime]:
+    # mismo orden que _extract_published_at
+    dt = _try_parse_dt(scan.time_datetime or "")
+    if dt:
+        return dt
+    for key in META_DATE_KEYS:
+        dt = _try_parse_dt(scan.metas.get(key, ""))
+        if dt:
+            return dt
+    return _date_from_jsonld_strings(scan.jsonld) or _date_from_text(scan.text)
+
+
+def discover_plone_news_events(
+    listing_html: str,
+    base_url: str,
+    backend: Optional[str] = None,
+) -> List[DiscoveredLink]:
     out: List[DiscoveredLink] = []
 
-    for a in soup.select("a[href]"):
-        href = (a.get("href") or "").strip()
+    for href, text in scan_links(listing_html, backend):
+        href = (href or "").strip()
         if not href:
             continue
         abs_url = urljoin(base_url, href)
@@ -200,7 +213,7 @@ def discover_plone_news_events(listing_html: str, base_url: str) -> List[Discove
 
         # links bajo news-and-events (evita la propia listing)
         if "/news-and-events" in abs_url and abs_url.rstrip("/") != base_url.rstrip("/"):
-            title = _clean_text(a.get_text(" ", strip=True))
+            title = text
             out.append(DiscoveredLink(url=abs_url, title=title if title else None))
 
     # dedupe
@@ -214,12 +227,15 @@ def discover_plone_news_events(listing_html: str, base_url: str) -> List[Discove
     return uniq
 
 
-def discover_plone_security(listing_html: str, base_url: str) -> List[DiscoveredLink]:
-    soup = bs4.BeautifulSoup(listing_html, "html.parser")
+def discover_plone_security(
+    listing_html: str,
+    base_url: str,
+    backend: Optional[str] = None,
+) -> List[DiscoveredLink]:
     out: List[DiscoveredLink] = []
 
-    for a in soup.select("a[href]"):
-        href = (a.get("href") or "").strip()
+    for href, text in scan_links(listing_html, backend):
+        href = (href or "").strip()
         if not href:
             continue
         abs_url = urljoin(base_url, href)
@@ -227,7 +243,7 @@ def discover_plone_security(listing_html: str, base_url: str) -> List[Discovered
             continue
 
         if "/security" in abs_url and abs_url.rstrip("/") != base_url.rstrip("/"):
-            title = _clean_text(a.get_text(" ", strip=True))
+            title = text
             out.append(DiscoveredLink(url=abs_url, title=title if title else None))
 
     seen = set()
@@ -240,7 +256,25 @@ def discover_plone_security(listing_html: str, base_url: str) -> List[Discovered
     return uniq
 
 
-def extract_plone_article(article_html: str, url: str) -> Tuple[str, Optional[datetime], str]:
+def extract_plone_article(
+    article_html: str,
+    url: str,
+    backend: Optional[str] = None,
+) -> Tuple[str, Optional[datetime], str]:
+    """
+    Título, fecha de publicación y texto en una sola pasada de parseo
+    (ver scrape/html_backend.py). Mismas reglas que extract_plone_article_soup.
+    """
+    scan = scan_article(article_html, backend)
+    title = scan.h1 or scan.title or url
+    return title, _published_at_from_scan(scan), scan.text
+
+
+def extract_plone_article_soup(article_html: str, url: str) -> Tuple[str, Optional[datetime], str]:
+    """
+    Versión original con BeautifulSoup("html.parser") y varias pasadas sobre
+    el árbol. Se mantiene como referencia para bench_plone_parsers.py.
+    """
     soup = bs4.BeautifulSoup(article_html, "html.parser")
 
     h1 = soup.select_one("h1")
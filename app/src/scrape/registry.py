@@ -0,0 +1,126 @@
+"""
+Registro de parsers de scrape: el campo `parser` de cada fuente en
+sources.yaml elige aquí cómo se descubren y extraen sus contenidos.
+
+Cada parser declara su estrategia de descubrimiento y las funciones que usa
+como "modulo:funcion"; los módulos se importan la primera vez que se usan
+(un topic sin fuentes plone_restapi no carga plone_restapi, etc.).
+
+Estrategias:
+  listing  GET condicional de `url` y discover(html, base_url, html_parser) -> [DiscoveredLink]
+  sitemap  discover(session, src, timeouts, limiter, since) -> [DiscoveredLink]
+  api      search(session, src, timeouts, limiter, since, max_items, html_parser) -> [RestApiItem],
+           sin descargar artículos
+
+listing y sitemap descargan luego cada artículo y lo pasan a
+extract(html, url, html_parser) -> (title, published_at, text).
+
+Para el backfill (ingest_scrape.py --backfill) listing pagina con b_start y
+sitemap recorre el sitemap entero; los parsers api declaran además
+  pages(src, since, until, b_size, max_pages) -> [url]
+  load_page(session, url, timeouts, limiter, html_parser) -> ([RestApiItem], hay_más)
+
+Para añadir un parser (p.ej. para fuentes django/ai) basta con
+register_parser(...) en este módulo y una entrada `parser:` en sources.yaml.
+"""
+import importlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+
+STRATEGIES = ("listing", "sitemap", "api")
+
+
+@dataclass(frozen=True)
+class ParserSpec:
+    strategy: str
+    discover: Optional[str] = None
+    extract: Optional[str] = None
+    search: Optional[str] = None
+    pages: Optional[str] = None
+    load_page: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ScrapeParser:
+    name: str
+    strategy: str
+    discover: Optional[Callable[..., Any]] = None
+    extract: Optional[Callable[..., Any]] = None
+    search: Optional[Callable[..., Any]] = None
+    pages: Optional[Callable[..., Any]] = None
+    load_page: Optional[Callable[..., Any]] = None
+
+
+PARSERS: Dict[str, ParserSpec] = {}
+_loaded: Dict[str, ScrapeParser] = {}
+
+
+def register_parser(name: str, spec: ParserSpec) -> None:
+    if spec.strategy not in STRATEGIES:
+        raise ValueError(f"parser '{name}': unknown strategy '{spec.strategy}'")
+    if spec.strategy == "api" and not spec.search:
+        raise ValueError(f"parser '{name}': strategy 'api' needs `search`")
+    if spec.strategy != "api" and not (spec.discover and spec.extract):
+        raise ValueError(f"parser '{name}': strategy '{spec.strategy}' needs `discover` and `extract`")
+    PARSERS[name] = spec
+    _loaded.pop(name, None)
+
+
+def _resolve(ref: Optional[str]) -> Optional[Callable[..., Any]]:
+    if not ref:
+        return None
+    module, _, attr = ref.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def get_parser(name: Optional[str]) -> ScrapeParser:
+    """Lanza KeyError si el parser no está registrado."""
+    if name not in _loaded:
+        spec = PARSERS[name]
+        _loaded[name] = ScrapeParser(
+            name=name,
+            strategy=spec.strategy,
+            discover=_resolve(spec.discover),
+            extract=_resolve(spec.extract),
+            search=_resolve(spec.search),
+            pages=_resolve(spec.pages),
+            load_page=_resolve(spec.load_page),
+        )
+    return _loaded[name]
+
+
+register_parser(
+    "plone_news_events",
+    ParserSpec(
+        "listing",
+        discover="scrape.plone:discover_plone_news_events",
+        extract="scrape.plone:extract_plone_article",
+    ),
+)
+register_parser(
+    "plone_security",
+    ParserSpec(
+        "listing",
+        discover="scrape.plone:discover_plone_security",
+        extract="scrape.plone:extract_plone_article",
+    ),
+)
+register_parser(
+    "plone_restapi",
+    ParserSpec(
+        "api",
+        search="scrape.plone_restapi:search_plone_restapi",
+        pages="scrape.plone_restapi:backfill_page_urls",
+        load_page="scrape.plone_restapi:load_search_page",
+    ),
+)
+# Genérico: sitemap.xml + extracción h1 / time / meta / JSON-LD (no es específica de Plone)
+register_parser(
+    "sitemap",
+    ParserSpec(
+        "sitemap",
+        discover="scrape.sitemap:discover_sitemap",
+        extract="scrape.plone:extract_plone_article",
+    ),
+)
@@ -7,6 +7,8 @@ from typing import Any, Dict, List, Optional
 import psycopg
 import yaml
 
+from pipeline_metrics import count, pipeline_stage
+
 
 def utcnow() -> datetime:
     return datetime.now(timezone.utc)
@@ -75,6 +77,7 @@ def select_items_for_topic(
         cur.execute(query, params)
         cols = [d[0] for d in cur.description]
         rows = cur.fetchall()
+    count("rows_read", len(rows))
 
     out = []
     for r in rows:
@@ -124,7 +127,7 @@ def main() -> None:
         "topics": {}
     }
 
-    with psycopg.connect(args.db) as conn:
+    with pipeline_stage("select_week", args.db) as metrics, metrics.connect(args.db) as conn:
         conn.execute("SET TIME ZONE 'UTC'")
         conn.commit()
 
@@ -0,0 +1,122 @@
+"""
+Backoff por fuente y circuit breaker, persistidos en `sources` junto a etag/last_modified.
+
+Estados:
+  - closed:    normal, se consulta siempre que toque.
+  - open:      tras `open_after_failures` fallos seguidos. No se consulta hasta
+               next_attempt_at (backoff exponencial con techo).
+  - half_open: pasado next_attempt_at se permite un único intento de prueba;
+               si va bien vuelve a closed, si falla vuelve a open con más backoff.
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+import psycopg
+
+
+DEFAULT_CIRCUIT = {
+    "open_after_failures": 3,
+    "base_backoff_minutes": 60,
+    "max_backoff_hours": 168,
+}
+
+
+def get_circuit_cfg(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(DEFAULT_CIRCUIT)
+    out.update(cfg.get("defaults", {}).get("ingest", {}).get("circuit", {}) or {})
+    return out
+
+
+def ensure_health_columns(conn: psycopg.Connection) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            ALTER TABLE sources
+              ADD COLUMN IF NOT EXISTS failure_count integer NOT NULL DEFAULT 0,
+              ADD COLUMN IF NOT EXISTS circuit_state text NOT NULL DEFAULT 'closed',
+              ADD COLUMN IF NOT EXISTS next_attempt_at timestamptz,
+              ADD COLUMN IF NOT EXISTS last_error text
+            """
+        )
+
+
+def split_allowed(
+    sources: Iterable[Dict[str, Any]],
+    now: datetime,
+) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], datetime]]]:
+    """
+    Separa en (allowed, blocked). Las fuentes con el circuito abierto cuyo
+    next_attempt_at ya ha pasado entran como intento half-open.
+    """
+    allowed: List[Dict[str, Any]] = []
+    blocked: List[Tuple[Dict[str, Any], datetime]] = []
+    for src in sources:
+        state = src.get("circuit_state") or "closed"
+        next_at = src.get("next_attempt_at")
+        if state == "closed" or next_at is None or now >= next_at:
+            if state != "closed":
+                src = dict(src, circuit_state="half_open")
+            allowed.append(src)
+        else:
+            blocked.append((src, next_at))
+    return allowed, blocked
+
+
+def mark_half_open(conn: psycopg.Connection, source_ids: List[str]) -> None:
+    if not source_ids:
+        return
+    with conn.cursor() as cur:
+        cur.execute(
+            "UPDATE sources SET circuit_state='half_open' WHERE id = ANY(%s) AND circuit_state='open'",
+            (source_ids,),
+        )
+
+
+def record_success(conn: psycopg.Connection, source_id: str) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE sources
+            SET failure_count=0,
+                circuit_state='closed',
+                next_attempt_at=NULL,
+                last_error=NULL
+            WHERE id=%s AND (failure_count <> 0 OR circuit_state <> 'closed')
+            """,
+            (source_id,),
+        )
+
+
+def record_failure(
+    conn: psycopg.Connection,
+    source_id: str,
+    error: Any,
+    circuit: Dict[str, Any],
+) -> None:
+    """
+    Cuenta el fallo. A partir de open_after_failures abre el circuito con
+    backoff = base * 2^(fallos - open_after_failures), limitado a max_backoff_hours.
+    """
+    open_after = int(circuit["open_after_failures"])
+    base_secs = float(circuit["base_backoff_minutes"]) * 60.0
+    max_secs = float(circuit["max_backoff_hours"]) * 3600.0
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE sources
+            SET failure_count = failure_count + 1,
+                last_error = left(%(error)s, 500),
+                circuit_state = CASE WHEN failure_count + 1 >= %(open_after)s THEN 'open' ELSE 'closed' END,
+                next_attempt_at = CASE
+                  WHEN failure_count + 1 >= %(open_after)s
+                  THEN now() + make_interval(secs => least(
+                         %(base)s * power(2, failure_count + 1 - %(open_after)s), %(max)s))
+                  ELSE NULL
+                END,
+                last_fetched_at = now(),
+                updated_at = now()
+            WHERE id = %(id)s
+            """,
+            {"error": str(error), "open_after": open_after, "base": base_secs, "max": max_secs, "id": source_id},
+        )
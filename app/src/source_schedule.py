@@ -0,0 +1,150 @@
+"""
+Planificación de fuentes: decide qué fuentes toca consultar en esta pasada.
+
+Intervalo de sondeo = cadence declarada (sources.yaml), alargado según la
+frecuencia real de publicación del feed:
+
+    estimate = max(post_interval_hours (EMA), horas desde last_published_at)
+    interval = clamp(estimate * POLL_FRACTION, cadence, max_poll_interval)
+
+Así un feed que publica una vez al mes (CMFPlone releases, blogs) se consulta
+como mucho cada `max_poll_interval`, mientras que los activos siguen en su cadence.
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import psycopg
+
+
+CADENCES = {
+    "hourly": timedelta(hours=1),
+    "daily": timedelta(days=1),
+    "weekly": timedelta(days=7),
+    "monthly": timedelta(days=30),
+}
+POLL_FRACTION = 0.5     # sondear al doble de la frecuencia observada
+EMA_ALPHA = 0.3
+DUE_TOLERANCE = 0.1     # el cron no cae siempre a la misma hora: 10% de margen
+DEFAULT_MAX_POLL_INTERVAL = timedelta(days=7)
+
+
+def parse_interval(value: Any, default: timedelta) -> timedelta:
+    """
+    Acepta "hourly"/"daily"/"weekly"/"monthly" o "<n>h" / "<n>d".
+    """
+    if value is None:
+        return default
+    s = str(value).strip().lower()
+    if s in CADENCES:
+        return CADENCES[s]
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([hd])", s)
+    if m:
+        n = float(m.group(1))
+        return timedelta(hours=n) if m.group(2) == "h" else timedelta(days=n)
+    return default
+
+
+def ensure_schedule_columns(conn: psycopg.Connection) -> None:
+    with conn.cursor() as cur:
+        cur.execute("ALTER TABLE sources ADD COLUMN IF NOT EXISTS post_interval_hours double precision")
+
+
+def poll_interval(
+    cadence: timedelta,
+    max_interval: timedelta,
+    post_interval_hours: Optional[float],
+    last_published_at: Optional[datetime],
+    now: datetime,
+) -> timedelta:
+    estimates = []
+    if post_interval_hours:
+        estimates.append(timedelta(hours=float(post_interval_hours)))
+    if last_published_at:
+        estimates.append(now - last_published_at)
+    if not estimates:
+        return cadence
+
+    adaptive = max(estimates) * POLL_FRACTION
+    return max(cadence, min(adaptive, max(max_interval, cadence)))
+
+
+def next_due_at(
+    src: Dict[str, Any],
+    cadence: timedelta,
+    max_interval: timedelta,
+    now: datetime,
+) -> Optional[datetime]:
+    """
+    Momento a partir del cual la fuente vuelve a tocar (None = nunca consultada).
+    """
+    last_fetched = src.get("last_fetched_at")
+    if not last_fetched:
+        return None
+    interval = poll_interval(
+        cadence,
+        max_interval,
+        src.get("post_interval_hours"),
+        src.get("last_published_at"),
+        now,
+    )
+    return last_fetched + interval * (1 - DUE_TOLERANCE)
+
+
+def split_due(
+    sources: Iterable[Dict[str, Any]],
+    cadence_by_id: Dict[str, Any],
+    default_cadence: Any,
+    max_poll_interval: Any,
+    now: datetime,
+    adaptive: bool = True,
+) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], datetime]]]:
+    """
+    Separa las fuentes en (due, skipped). skipped lleva la fecha del próximo turno.
+    Con adaptive=False solo cuenta la cadence declarada.
+    """
+    default = parse_interval(default_cadence, CADENCES["daily"])
+    max_interval = parse_interval(max_poll_interval, DEFAULT_MAX_POLL_INTERVAL)
+
+    due: List[Dict[str, Any]] = []
+    skipped: List[Tuple[Dict[str, Any], datetime]] = []
+    for src in sources:
+        cadence = parse_interval(cadence_by_id.get(src["id"]), default)
+        next_at = next_due_at(src if adaptive else {"last_fetched_at": src.get("last_fetched_at")}, cadence, max_interval, now)
+        if next_at is None or now >= next_at:
+            due.append(src)
+        else:
+            skipped.append((src, next_at))
+    return due, skipped
+
+
+def update_post_interval(
+    previous_hours: Optional[float],
+    last_published_at: Optional[datetime],
+    new_published: Iterable[datetime],
+) -> Optional[float]:
+    """
+    Actualiza la media móvil exponencial del intervalo entre publicaciones
+    con las fechas de los items recién insertados.
+    """
+    points = sorted(d for d in new_published if d)
+    if last_published_at:
+        points = [last_published_at] + [d for d in points if d > last_published_at]
+
+    ema = previous_hours
+    for a, b in zip(points, points[1:]):
+        gap = (b - a).total_seconds() / 3600.0
+        if gap <= 0:
+            continue
+        ema = gap if ema is None else EMA_ALPHA * gap + (1 - EMA_ALPHA) * ema
+    return ema
+
+
+def save_post_interval(conn: psycopg.Connection, source_id: str, hours: Optional[float]) -> None:
+    if hours is None:
+        return
+    with conn.cursor() as cur:
+        cur.execute(
+            "UPDATE sources SET post_interval_hours=%s WHERE id=%s",
+            (hours, source_id),
+        )
@@ -0,0 +1,31 @@
+"""
+Lectura de sources.yaml, sin dependencias de base de datos: la usan ingest.py
+y herramientas que no tocan la BD (check_rss.py).
+"""
+from typing import Any, Dict, List
+
+import yaml
+
+
+def load_sources_yaml(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def get_ingest_setting(cfg: Dict[str, Any], topic: str, key: str, default: Any) -> Any:
+    """
+    Valor de ingest para un topic: topics.<topic>.ingest > defaults.ingest > default.
+    """
+    topic_val = cfg.get("topics", {}).get(topic, {}).get("ingest", {}).get(key)
+    if topic_val is not None:
+        return topic_val
+    default_val = cfg.get("defaults", {}).get("ingest", {}).get(key)
+    if default_val is not None:
+        return default_val
+    return default
+
+
+def resolve_topics(cfg: Dict[str, Any], requested: List[str]) -> List[str]:
+    if "all" in requested:
+        return list((cfg.get("topics") or {}).keys())
+    return list(dict.fromkeys(requested))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# los módulos de app/src se importan como en los scripts (python app/src/<x>.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
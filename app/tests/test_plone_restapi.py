@@ -0,0 +1,146 @@
+"""
+scrape/plone_restapi.py contra un servidor local que sirve respuestas
+`@search` grabadas (fixtures/plone_restapi/search_b<b_start>.json).
+"""
+import os
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+
+from scrape.html_backend import available_backends
+from scrape.plone_restapi import search_plone_restapi
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "plone_restapi")
+
+
+class RecordedSearch:
+    """Sirve el JSON grabado del lote b_start, con {base} apuntando al propio servidor."""
+
+    def __init__(self):
+        self.requests: List[str] = []
+        recorded = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                pass
+
+            def do_GET(self):
+                recorded.requests.append(self.path)
+                parts = urlsplit(self.path)
+                b_start = parse_qs(parts.query).get("b_start", ["0"])[0]
+                path = os.path.join(FIXTURES, f"search_b{b_start}.json")
+                if not parts.path.endswith("/@search") or not os.path.exists(path):
+                    self.send_error(404)
+                    return
+                with open(path, "r", encoding="utf-8") as f:
+                    body = f.read().replace("{base}", recorded.base).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def query(self, n: int):
+        return parse_qs(urlsplit(self.requests[n]).query)
+
+
+@pytest.fixture
+def recorded():
+    server = RecordedSearch()
+    server.thread.start()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+
+@pytest.fixture
+def src(recorded):
+    return {
+        "id": "plone_news_api",
+        "url": f"{recorded.base}/news-and-events",
+        "api_url": f"{recorded.base}/++api++/news-and-events",
+        "portal_types": ["News Item", "Event"],
+        "b_size": 2,
+    }
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_parses_title_effective_and_text(recorded, src, backend):
+    with requests.Session() as session:
+        items = search_plone_restapi(session, src, html_parser=backend)
+
+    assert [it.url for it in items] == [
+        f"{recorded.base}/news-and-events/news/2025/plone-6-1-final",
+        f"{recorded.base}/news-and-events/events/ploneconf-2025",
+        f"{recorded.base}/news-and-events/news/draft-announcement",
+    ]
+    news, event, draft = items
+
+    assert news.title == "Plone 6.1 final released"
+    assert news.published_at == datetime(2025, 3, 4, 9, 30, tzinfo=timezone.utc)
+    assert news.text == "Café & résumé: Plone’s 6.1 is final. Volto 18 Python 3.13"
+    assert news.raw["portal_type"] == "News Item"
+    assert news.raw["subjects"] == ["release", "plone-6"]
+
+    # sin text (fullobjects de un Event) se usa la descripción
+    assert event.title == "Plone Conference 2025"
+    assert event.published_at == datetime(2025, 3, 10, 12, 0, tzinfo=timezone.utc)
+    assert event.text == "Join us in Jyväskylä."
+
+    # effective 1969 = sin publicar en Zope
+    assert draft.published_at is None
+    assert draft.text == "Line one line two"
+
+
+def test_incremental_query_parameters(recorded, src):
+    since = datetime(2025, 3, 1, 0, 0, tzinfo=timezone.utc)
+    with requests.Session() as session:
+        search_plone_restapi(session, src, since=since)
+
+    q = recorded.query(0)
+    assert urlsplit(recorded.requests[0]).path == "/++api++/news-and-events/@search"
+    assert q["effective.query"] == [since.isoformat()]
+    assert q["effective.range"] == ["min"]
+    assert q["sort_on"] == ["effective"]
+    assert q["sort_order"] == ["ascending"]
+    assert q["portal_type"] == ["News Item", "Event"]
+    assert q["b_size"] == ["2"]
+    assert q["fullobjects"] == ["1"]
+
+
+def test_first_run_without_watermark_asks_for_newest(recorded, src):
+    with requests.Session() as session:
+        search_plone_restapi(session, src)
+
+    q = recorded.query(0)
+    assert "effective.query" not in q and "effective.range" not in q
+    assert q["sort_order"] == ["descending"]
+
+
+def test_follows_batching_next(recorded, src):
+    with requests.Session() as session:
+        items = search_plone_restapi(session, src, max_items=10)
+
+    assert len(items) == 3
+    assert len(recorded.requests) == 2
+    assert recorded.query(1)["b_start"] == ["2"]
+
+
+@pytest.mark.parametrize("max_items, expected_items, expected_requests", [(1, 1, 1), (2, 2, 1), (3, 3, 2)])
+def test_stops_at_max_items(recorded, src, max_items, expected_items, expected_requests):
+    with requests.Session() as session:
+        items = search_plone_restapi(session, src, max_items=max_items)
+
+    assert len(items) == expected_items
+    # no pide el lote siguiente si ya tiene max_items
+    assert len(recorded.requests) == expected_requests
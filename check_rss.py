@@ -1,42 +1,240 @@
-import feedparser
-import requests
-from pprint import pprint
+"""
+Health-check de las fuentes de sources.yaml (también las deshabilitadas).
 
-RSS_FEEDS = {
-   "django fundation" : "https://www.djangoproject.com/rss/foundation/",
+Descarga todas en paralelo con la capa HTTP de ingest (http_fetch) (mismos timeouts y
+límite por host) y muestra por fuente: estado, latencia, bytes, nº de
+entradas, fecha de la entrada más reciente y si el servidor permite GET
+condicional (ETag / Last-Modified). Ordenado de más lento a más rápido,
+para ver qué feeds dominan el tiempo de ingest.
+
+    python check_rss.py                       # todas las fuentes, tabla
+    python check_rss.py --topic django --json
+    python check_rss.py --verify-conditional  # repite con los validadores y espera un 304
+    python check_rss.py https://example.org/feed/   # URLs sueltas
+
+Sale con código 1 si alguna fuente falla.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "src"))
+
+# solo módulos sin BD: el health-check no necesita psycopg
+from http_fetch import (  # noqa: E402
+    HostLimiter,
+    Timeouts,
+    fetch,
+    get_timeouts,
+    make_session,
+    parse_feed,
+    safe_get_entry_published,
+)
+from sources_config import get_ingest_setting, load_sources_yaml, resolve_topics  # noqa: E402
+
+# Cabeceras de un navegador real (algunos hosts bloquean UAs de bot)
+BROWSER_UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
+BROWSER_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
 }
 
-def check_feed(name, url):
-    print(f"\n🔍 Checking: {name}")
-    print(f"URL: {url}")
 
-    # Definimos cabeceras de un navegador real
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-    }
+def collect_sources(cfg: Dict[str, Any], topics: List[str]) -> List[Dict[str, Any]]:
+    out = []
+    for topic in topics:
+        for src in cfg.get("topics", {}).get(topic, {}).get("sources", []) or []:
+            out.append(
+                {
+                    "topic": topic,
+                    "id": src["id"],
+                    "type": src.get("type", "rss"),
+                    "url": src["url"],
+                    "enabled": bool(src.get("enabled", True)),
+                }
+            )
+    return out
+
 
+def check_source(
+    session,
+    src: Dict[str, Any],
+    timeouts: Timeouts,
+    limiter: HostLimiter,
+    headers: Optional[Dict[str, str]] = None,
+    verify_conditional: bool = False,
+) -> Dict[str, Any]:
+    report: Dict[str, Any] = dict(
+        src,
+        ok=False,
+        status=None,
+        latency_ms=None,
+        bytes=None,
+        entries=None,
+        newest=None,
+        etag=False,
+        last_modified=False,
+        conditional_304=None,
+        error=None,
+    )
+    t0 = time.monotonic()
     try:
-        # Primero descargamos el contenido con requests
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status() # Lanza error si hay bloqueo (403, 404, etc)
-        
-        # Luego se lo pasamos a feedparser desde el contenido ya descargado
-        feed = feedparser.parse(response.content)
+        result = fetch(session, src["url"], timeouts, headers=headers, limiter=limiter)
+    except Exception as e:
+        report["latency_ms"] = round((time.monotonic() - t0) * 1000)
+        report["error"] = f"{type(e).__name__}: {e}"[:200]
+        return report
 
+    report.update(
+        status=result.status,
+        latency_ms=round(result.elapsed * 1000),
+        bytes=len(result.content),
+        etag=bool(result.etag),
+        last_modified=bool(result.last_modified),
+    )
+
+    if src["type"] == "rss":
+        feed = parse_feed(result)
+        report["entries"] = len(feed.entries)
+        dates = [d for d in (safe_get_entry_published(e) for e in feed.entries) if d]
+        report["newest"] = max(dates).isoformat() if dates else None
+        if getattr(feed, "bozo", False) and not feed.entries:
+            report["error"] = f"parse error: {getattr(feed, 'bozo_exception', 'unknown')}"[:200]
+            return report
         if not feed.entries:
-            print("⚠️ Parsed but no entries found (Possible empty feed)")
-            return
+            report["error"] = "no entries"
+            return report
 
-        print(f"✅ VALID RSS")
-        print(f"Entries found: {len(feed.entries)}")
-        first = feed.entries[0]
-        print(f"  - title: {first.get('title')}")
+    if verify_conditional and (result.etag or result.last_modified):
+        try:
+            again = fetch(
+                session,
+                src["url"],
+                timeouts,
+                etag=result.etag,
+                last_modified=result.last_modified,
+                headers=headers,
+                limiter=limiter,
+            )
+            report["conditional_304"] = again.not_modified
+        except Exception as e:
+            report["conditional_304"] = False
+            report["error"] = f"conditional GET: {type(e).__name__}: {e}"[:200]
+            return report
+
+    report["ok"] = True
+    return report
+
+
+def check_all(
+    sources: List[Dict[str, Any]],
+    session,
+    timeouts: Timeouts,
+    max_workers: int,
+    max_per_host: int,
+    headers: Optional[Dict[str, str]] = None,
+    verify_conditional: bool = False,
+) -> List[Dict[str, Any]]:
+    limiter = HostLimiter(max_per_host)
+    reports = []
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as pool:
+        futures = [
+            pool.submit(check_source, session, src, timeouts, limiter, headers, verify_conditional)
+            for src in sources
+        ]
+        for fut in as_completed(futures):
+            reports.append(fut.result())
+    reports.sort(key=lambda r: r["latency_ms"] or 0, reverse=True)
+    return reports
+
+
+def _conditional_label(r: Dict[str, Any]) -> str:
+    parts = [name for name, present in (("etag", r["etag"]), ("lm", r["last_modified"])) if present]
+    label = "+".join(parts) or "no"
+    if r["conditional_304"] is not None:
+        label += " (304)" if r["conditional_304"] else " (no 304)"
+    return label
+
+
+def print_table(reports: List[Dict[str, Any]]) -> None:
+    print(
+        f"{'':2} {'source':<32} {'type':<6} {'status':>6} {'ms':>7} {'KiB':>8} "
+        f"{'entries':>7} {'newest':<10} {'conditional':<16} error"
+    )
+    for r in reports:
+        mark = "✅" if r["ok"] else "❌"
+        source = r["id"] if r["enabled"] else f"{r['id']} (off)"
+        kib = f"{r['bytes'] / 1024:.1f}" if r["bytes"] is not None else "-"
+        print(
+            f"{mark} {source[:32]:<32} {r['type']:<6} {r['status'] or '-':>6} {r['latency_ms'] or 0:>7} {kib:>8} "
+            f"{'-' if r['entries'] is None else r['entries']:>7} {(r['newest'] or '-')[:10]:<10} "
+            f"{_conditional_label(r):<16} {r['error'] or ''}"
+        )
+
+    failed = sum(1 for r in reports if not r["ok"])
+    total_ms = sum(r["latency_ms"] or 0 for r in reports)
+    print(f"\nSources: {len(reports)} | failed: {failed} | sum of latencies: {total_ms / 1000:.1f}s")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Health-check concurrente de las fuentes de sources.yaml")
+    ap.add_argument("urls", nargs="*", help="URLs de feeds sueltas en lugar de sources.yaml")
+    ap.add_argument("--sources", default=os.environ.get("SOURCES_YAML", "sources.yaml"))
+    ap.add_argument("--topic", nargs="+", default=["all"], help="Uno o varios topics, o 'all' (defecto)")
+    ap.add_argument("--type", choices=["rss", "scrape"], default=None, help="Solo fuentes de este tipo")
+    ap.add_argument("--concurrency", type=int, default=None, help="Descargas en paralelo (defecto: max_concurrency)")
+    ap.add_argument("--timeout", type=float, default=None, help="Tope total por fuente en segundos")
+    ap.add_argument("--browser", action="store_true", help="User-Agent y cabeceras de navegador en vez del del bot")
+    ap.add_argument("--verify-conditional", action="store_true", help="Repite con ETag/Last-Modified y comprueba el 304")
+    ap.add_argument("--json", action="store_true", help="Salida JSON en lugar de tabla")
+    args = ap.parse_args()
+
+    cfg = load_sources_yaml(args.sources)
+    if args.urls:
+        topic = None
+        sources = [
+            {"topic": None, "id": url, "type": "rss", "url": url, "enabled": True}
+            for url in args.urls
+        ]
+    else:
+        topics = resolve_topics(cfg, args.topic)
+        topic = topics[0] if len(topics) == 1 else None
+        sources = [s for s in collect_sources(cfg, topics) if args.type is None or s["type"] == args.type]
+
+    timeouts = get_timeouts(cfg, topic)
+    if args.timeout:
+        timeouts = Timeouts(connect=min(timeouts.connect, args.timeout), read=min(timeouts.read, args.timeout), total=args.timeout)
+    concurrency = args.concurrency or int(get_ingest_setting(cfg, topic or "", "max_concurrency", 8))
+    max_per_host = int(get_ingest_setting(cfg, topic or "", "max_per_host", 2))
+
+    if args.browser:
+        user_agent, headers = BROWSER_UA, BROWSER_HEADERS
+    else:
+        user_agent, headers = cfg.get("defaults", {}).get("ingest", {}).get("user_agent") or "TechWatchBot/1.0", None
+
+    with make_session(user_agent, concurrency) as session:
+        reports = check_all(
+            sources,
+            session,
+            timeouts,
+            concurrency,
+            max_per_host,
+            headers,
+            args.verify_conditional,
+        )
+
+    if args.json:
+        print(json.dumps(reports, indent=2, ensure_ascii=False))
+    else:
+        print_table(reports)
+
+    if any(not r["ok"] for r in reports):
+        sys.exit(1)
 
-    except Exception as e:
-        print(f"❌ ERROR: {e}")
 
 if __name__ == "__main__":
-    for name, url in RSS_FEEDS.items():
-        check_feed(name, url)
+    main()
@@ -1,16 +1,23 @@
 #!/bin/bash
 echo "🚀 Iniciando pipeline de TechWatch..."
 
+# Todas las etapas de esta ejecución comparten run en pipeline_runs (docker-compose lo pasa al contenedor)
+export PIPELINE_RUN_ID="${PIPELINE_RUN_ID:-$(date -u +%Y%m%dT%H%M%SZ)-$RANDOM}"
+
 # 1. Ingesta de fuentes RSS (Extrae lo nuevo de las webs)
-docker compose run --rm app python app/src/ingest.py --topic plone
-docker compose run --rm app python app/src/ingest.py --topic django
-docker compose run --rm app python app/src/ingest.py --topic ai
+#    Un único proceso para todos los topics: una carga de config, una conexión y una sesión HTTP
+docker compose run --rm app python app/src/ingest.py --topic all
 
 # 2. Ingesta de fuentes Scraping (Noticias oficiales sin RSS)
-docker compose run --rm app python app/src/ingest_scrape.py --topic plone
-# (Añadirías aquí django o ai si tuvieran scraping en el sources.yaml)
+#    Los topics sin fuentes 'scrape' en sources.yaml simplemente no hacen nada.
+#    Cada fuente elige su `parser` (scrape/registry.py): listings de Plone, plone_restapi o sitemap
+docker compose run --rm app python app/src/ingest_scrape.py --topic all
+
+# 2b. Normalización HTML -> texto limpio (una vez por content_hash; enrich, embed y el LLM usan clean_text)
+docker compose run --rm app python app/src/normalize.py
 
 # 3. Enriquecimiento Básico (Asigna tags, limpia, da prioridad inicial)
+#    Tras un backfill: -e ENRICH_DRAIN=1 vacía todo lo pendiente con un pool de procesos (ENRICH_WORKERS)
 docker compose run --rm app python app/src/enrich.py
 
 # 4. Deduplicación Semántica con Qdrant (Limpia el ruido)